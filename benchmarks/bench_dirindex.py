@@ -0,0 +1,96 @@
+"""
+Microbenchmark for the background folder index (dirindex.py).
+
+Creates a synthetic tree of folders and files in a temporary directory,
+builds the index, then times exact and fuzzy spoken-name lookups, one
+mtime refresh pass, and how long a newly created folder takes to become
+resolvable. Lookups should stay well under a millisecond.
+
+    python benchmarks/bench_dirindex.py [--folders 5000] [--files 4] [--repeat 2000]
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dirindex import DirectoryIndex  # noqa: E402
+
+WORDS = ['project', 'report', 'photos', 'music', 'invoice', 'backup', 'notes', 'drafts',
+         'archive', 'client', 'budget', 'travel', 'school', 'recipes', 'scans', 'videos']
+
+
+def build_tree(root, folders, files, seed=3):
+    rnd = random.Random(seed)
+    dirs = [root]
+    names = []
+    for n in range(folders):
+        parent = rnd.choice(dirs[-200:])
+        name = f"{rnd.choice(WORDS)}_{rnd.choice(WORDS)}_{n}"
+        path = os.path.join(parent, name)
+        os.mkdir(path)
+        dirs.append(path)
+        names.append(name)
+        for f in range(files):
+            open(os.path.join(path, f"{rnd.choice(WORDS)}{f}.txt"), 'w').close()
+    return names
+
+
+def per_op_us(fn, queries, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for q in queries:
+            fn(q)
+    return (time.perf_counter() - t0) / (repeat * len(queries)) * 1e6
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument('--folders', type=int, default=5000)
+    ap.add_argument('--files', type=int, default=4)
+    ap.add_argument('--repeat', type=int, default=2000)
+    args = ap.parse_args(argv)
+
+    root = tempfile.mkdtemp(prefix='speakshell-index-')
+    try:
+        names = build_tree(root, args.folders, args.files)
+        index = DirectoryIndex([root], max_depth=64, interval=0.05).start()
+        index.ready.wait()
+        print(f"indexed {len(index)} names in {len(index._dirs)} folders: {index.build_seconds * 1e3:.1f} ms")
+
+        rnd = random.Random(5)
+        exact = [n.replace('_', ' ') for n in rnd.sample(names, 20)]
+        # drop a letter from the first word: "projct report 12"
+        fuzzy = []
+        for n in rnd.sample(names, 20):
+            first, rest = n.split('_', 1)
+            fuzzy.append(first[:2] + first[3:] + ' ' + rest.replace('_', ' '))
+        missing = ['nothing like this', 'zebra crossing']
+
+        for label, queries in (('exact', exact), ('fuzzy', fuzzy), ('no match', missing)):
+            us = per_op_us(lambda q: index.resolve(q, near=root), queries, max(1, args.repeat // 10))
+            print(f"  {label:<9} lookup {us:8.1f} us/op")
+        hits = sum(index.resolve(q) is not None for q in fuzzy)
+        print(f"  fuzzy hits {hits}/{len(fuzzy)}")
+
+        t0 = time.perf_counter()
+        index.refresh()
+        print(f"  refresh pass (stat every folder) {(time.perf_counter() - t0) * 1e3:.1f} ms")
+
+        new = os.path.join(root, 'freshly_made_folder')
+        os.mkdir(new)
+        t0 = time.perf_counter()
+        while index.resolve('freshly made folder') != new and time.perf_counter() - t0 < 10:
+            time.sleep(0.005)
+        print(f"  new folder resolvable after {(time.perf_counter() - t0) * 1e3:.1f} ms (interval 50 ms)")
+        index.stop()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Constrained vs. unconstrained offline decoding benchmark.
+
+Decodes recorded fixtures with pocketsphinx twice - once against the full
+en-US language model and once against the grammar generated from the
+command table - and reports decode time, exact-transcript accuracy and
+intent accuracy (does the hypothesis dispatch to the same intent as the
+reference?).
+
+Fixtures are 16 kHz mono 16-bit WAV files, each with a sibling .txt file
+holding the reference transcript:
+
+    fixtures/list_files.wav   fixtures/list_files.txt  ("list files")
+
+    python benchmarks/bench_grammar.py --fixtures path/to/fixtures
+"""
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engines import make_pocketsphinx_decoder  # noqa: E402
+from grammar import CommandGrammar  # noqa: E402
+from intents import compile_commands  # noqa: E402
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def load_fixtures(directory):
+    fixtures = []
+    for wav_path in sorted(glob.glob(os.path.join(directory, '*.wav'))):
+        txt_path = os.path.splitext(wav_path)[0] + '.txt'
+        if not os.path.exists(txt_path):
+            continue
+        with wave.open(wav_path, 'rb') as wf:
+            if wf.getframerate() != 16000 or wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+                print(f"skip {os.path.basename(wav_path)}: needs 16 kHz mono 16-bit")
+                continue
+            pcm = wf.readframes(wf.getnframes())
+        with open(txt_path, encoding='utf-8') as f:
+            fixtures.append((os.path.basename(wav_path), pcm, f.read().strip().lower()))
+    return fixtures
+
+
+def decode(decoder, pcm):
+    decoder.start_utt()
+    decoder.process_raw(pcm, False, True)
+    decoder.end_utt()
+    hyp = decoder.hyp()
+    return hyp.hypstr.strip().lower() if hyp is not None else ''
+
+
+def run(label, decoder, fixtures, index):
+    total = 0.0
+    exact = intent_ok = 0
+    for name, pcm, ref in fixtures:
+        t0 = time.perf_counter()
+        hyp = decode(decoder, pcm)
+        total += time.perf_counter() - t0
+        exact += hyp == ref
+        ref_m, hyp_m = index.match(ref), index.match(hyp) if hyp else None
+        intent_ok += (ref_m is not None and hyp_m is not None and ref_m.intent.name == hyp_m.intent.name)
+    n = len(fixtures)
+    print(f"{label:<14} {total / n * 1e3:>10.1f} {exact / n:>8.0%} {intent_ok / n:>8.0%}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument('--fixtures', default=DEFAULT_FIXTURES)
+    args = ap.parse_args(argv)
+
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        print(f"No fixtures found in {args.fixtures} (expected NAME.wav + NAME.txt pairs)")
+        return 1
+    try:
+        full = make_pocketsphinx_decoder()
+    except Exception as e:
+        print(f"pocketsphinx unavailable: {e}")
+        return 1
+
+    grammar = CommandGrammar(tempfile.mkdtemp(prefix='speakshell-grammar-'))
+    # fixture transcripts may name files; make their words available to <name> slots
+    grammar.set_slot_names([ref for _, _, ref in fixtures])
+    constrained = make_pocketsphinx_decoder(jsgf=grammar.ensure())
+
+    index = compile_commands()
+    print(f"{len(fixtures)} fixtures")
+    print(f"{'mode':<14} {'ms/phrase':>10} {'exact':>8} {'intent':>8}")
+    run('unconstrained', full, fixtures, index)
+    run('grammar', constrained, fixtures, index)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+Microbenchmark for the persistent command history (history.py).
+
+Writes a synthetic history of --entries distinct commands to a temporary
+SQLite database, then times loading it (including the prefix
+precomputation), prefix completion for typed prefixes of every length,
+fetching a screenful of rows for the history list and recording a
+command. Completion should stay under a millisecond at the worst
+percentile.
+
+    python benchmarks/bench_history.py [--entries 200000] [--queries 5000]
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history import CommandHistory, normalize  # noqa: E402
+
+VERBS = ['git commit -m', 'git checkout', 'cd', 'open file', 'go to', 'dir', 'ping', 'copy',
+         'move', 'delete file', 'python', 'echo', 'type', 'run macro', 'create file', 'find']
+WORDS = ['project', 'report', 'photos', 'music', 'invoice', 'backup', 'notes', 'drafts',
+         'archive', 'client', 'budget', 'travel', 'school', 'recipes', 'scans', 'videos']
+
+
+def build_db(path, entries, seed=5):
+    rnd = random.Random(seed)
+    now = time.time()
+    rows = {}
+    while len(rows) < entries:
+        command = f"{rnd.choice(VERBS)} {rnd.choice(WORDS)}_{rnd.randrange(entries)}"
+        rows[normalize(command)] = (command, int(rnd.paretovariate(1.2)), now - rnd.random() * 3e7)
+    db = sqlite3.connect(path)
+    db.execute('CREATE TABLE history (key TEXT PRIMARY KEY, command TEXT NOT NULL, '
+               'count INTEGER NOT NULL, last_used REAL NOT NULL)')
+    db.executemany('INSERT INTO history VALUES (?, ?, ?, ?)',
+                   ((key, c, n, t) for key, (c, n, t) in rows.items()))
+    db.commit()
+    db.close()
+    return [c for c, _, _ in rows.values()]
+
+
+def pct(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument('--entries', type=int, default=200000)
+    ap.add_argument('--queries', type=int, default=5000)
+    args = ap.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix='speakshell-history-')
+    try:
+        path = os.path.join(tmp, 'history.sqlite3')
+        commands = build_db(path, args.entries)
+
+        t0 = time.perf_counter()
+        history = CommandHistory(path)
+        history.loaded.wait()
+        print(f"load {len(history)} entries + precompute: {(time.perf_counter() - t0) * 1e3:.0f} ms")
+
+        # what someone typing would ask for: every prefix of a random command
+        rnd = random.Random(7)
+        prefixes = []
+        while len(prefixes) < args.queries:
+            command = rnd.choice(commands)
+            prefixes.extend(command[:n] for n in range(1, len(command) + 1))
+        times = []
+        for prefix in prefixes[:args.queries]:
+            t = time.perf_counter()
+            history.complete(prefix)
+            times.append((time.perf_counter() - t) * 1e6)
+        print(f"complete (first lookup of each prefix)  p50 {pct(times, 0.5):7.1f} us  "
+              f"p99 {pct(times, 0.99):7.1f} us  max {max(times):8.1f} us")
+        times = []
+        for prefix in prefixes[:args.queries]:
+            t = time.perf_counter()
+            history.complete(prefix)
+            times.append((time.perf_counter() - t) * 1e6)
+        print(f"complete (repeated)                     p50 {pct(times, 0.5):7.1f} us  "
+              f"p99 {pct(times, 0.99):7.1f} us  max {max(times):8.1f} us")
+
+        for offset in (0, len(history) // 2, len(history) - 10):
+            t = time.perf_counter()
+            history.rows(offset, 10)
+            print(f"rows({offset}, 10): {(time.perf_counter() - t) * 1e3:.2f} ms")
+
+        t = time.perf_counter()
+        for command in commands[:2000]:
+            history.add(command)
+        print(f"add: {(time.perf_counter() - t) / 2000 * 1e6:.1f} us/op")
+        t = time.perf_counter()
+        history.flush()
+        print(f"flush 2000 queued writes: {(time.perf_counter() - t) * 1e3:.0f} ms")
+        history.close()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
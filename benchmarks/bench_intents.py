@@ -0,0 +1,81 @@
+"""
+Microbenchmark for the compiled intent index.
+
+Grows the command table with synthetic phrases and times lookups against
+the compiled trie and against a linear substring scan (the old
+map_to_cmd strategy). The compiled lookup should stay flat as the table
+grows; the linear scan grows with it.
+
+    python benchmarks/bench_intents.py [--sizes 10,100,1000,5000] [--repeat 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intents import COMMANDS, CONTAINS, compile_commands, intent  # noqa: E402
+
+UTTERANCES = [
+    'create file notes dot txt',
+    'what time is it',
+    'show me the disk space',
+    'go to downloads',
+    'rename report.txt to final.txt',
+    'kill process notepad',
+    'echo nothing matches this one',
+]
+
+WORDS = ['alpha', 'bravo', 'charlie', 'delta', 'echo', 'foxtrot', 'golf', 'hotel',
+         'india', 'juliet', 'kilo', 'lima', 'mike', 'november', 'oscar', 'papa']
+
+
+def synthetic_table(size, seed=7):
+    rnd = random.Random(seed)
+    table = list(COMMANDS)
+    n = len(table)
+    while n < size:
+        phrase = ' '.join(rnd.choice(WORDS) for _ in range(rnd.randint(2, 4))) + f' {n}'
+        table.append(intent(f'synthetic_{n}', phrase, CONTAINS, command=('echo', True)))
+        n += 1
+    return table
+
+
+def linear_match(table, text):
+    v = text.lower().strip()
+    for it in table:
+        for phrase in it.phrases:
+            if phrase in v:
+                return it
+    return None
+
+
+def bench(fn, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for u in UTTERANCES:
+            fn(u)
+    return (time.perf_counter() - t0) / (repeat * len(UTTERANCES)) * 1e6
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument('--sizes', default='10,100,1000,5000')
+    ap.add_argument('--repeat', type=int, default=2000)
+    args = ap.parse_args(argv)
+
+    print(f"{'phrases':>8} {'compile ms':>11} {'trie us/op':>11} {'linear us/op':>13}")
+    for size in (int(s) for s in args.sizes.split(',')):
+        table = synthetic_table(size)
+        t0 = time.perf_counter()
+        index = compile_commands(table)
+        compile_ms = (time.perf_counter() - t0) * 1e3
+        trie_us = bench(index.match, args.repeat)
+        linear_us = bench(lambda u: linear_match(table, u), max(1, args.repeat // 10))
+        print(f"{index.size:>8} {compile_ms:>11.2f} {trie_us:>11.2f} {linear_us:>13.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Audio preprocessing benchmark.
+
+Runs AudioPreprocessor over synthetic phrases (speech-band tones plus
+noise) and reports median and p95 milliseconds per phrase. The budget is
+5 ms per phrase; the script exits non-zero if the p95 exceeds it. The
+default length is the app's phrase time limit (the longest phrase it
+records); pass --seconds 3 for a typical VAD-trimmed command.
+
+    python benchmarks/bench_preprocess.py [--seconds 7] [--repeat 50]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from deps import np  # noqa: E402
+from helpers import PHRASE_TIME_LIMIT  # noqa: E402
+from preprocess import AudioPreprocessor  # noqa: E402
+
+BUDGET_MS = 5.0
+
+
+def synthetic_pcm(seconds, rate, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * rate)) / float(rate)
+    envelope = (np.sin(2 * np.pi * 3 * t) > 0).astype(np.float32)
+    speech = 0.3 * envelope * (np.sin(2 * np.pi * 220 * t) + 0.5 * np.sin(2 * np.pi * 1250 * t))
+    noise = 0.02 * rng.standard_normal(t.size) + 0.01
+    return (np.clip(speech + noise, -1, 1) * 32767).astype('<i2').tobytes()
+
+
+def bench(pre, pcm, rate, repeat):
+    pre.process(pcm, rate)  # warm caches
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        pre.process(pcm, rate)
+        times.append((time.perf_counter() - t0) * 1e3)
+    times.sort()
+    return times[len(times) // 2], times[int(len(times) * 0.95) - 1]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument('--seconds', type=float, default=float(PHRASE_TIME_LIMIT))
+    ap.add_argument('--repeat', type=int, default=50)
+    args = ap.parse_args(argv)
+    if not np:
+        print("numpy is not installed")
+        return 1
+
+    worst = 0.0
+    print(f"{'case':<28} {'median ms':>10} {'p95 ms':>8}")
+    for label, rate, gate in [('16 kHz, no noise profile', 16000, False),
+                              ('16 kHz, noise gate', 16000, True),
+                              ('44.1 kHz -> 16 kHz, gate', 44100, True)]:
+        pre = AudioPreprocessor()
+        if gate:
+            pre.set_noise_profile(synthetic_pcm(1.0, rate, seed=1), rate)
+        median, p95 = bench(pre, synthetic_pcm(args.seconds, rate), rate, args.repeat)
+        worst = max(worst, p95)
+        print(f"{label:<28} {median:>10.2f} {p95:>8.2f}")
+    ok = worst <= BUDGET_MS
+    print(f"{'PASS' if ok else 'FAIL'}: worst p95 {worst:.2f} ms (budget {BUDGET_MS} ms for a {args.seconds:g}s phrase)")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
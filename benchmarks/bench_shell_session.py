@@ -0,0 +1,67 @@
+"""
+Latency of a command run in the persistent shell session versus a new
+shell per command (the old run_cmd behaviour).
+
+Both paths go through CommandExecutor, so the numbers include the worker
+hand-off and line streaming that SpeakShell pays for every command.
+
+    python benchmarks/bench_shell_session.py [--runs 200] [--command "echo hello"]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from executor import CommandExecutor  # noqa: E402
+from shellsession import ShellSession  # noqa: E402
+
+
+def measure(executor, command, runs, cwd):
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        job = executor.submit(command, cwd=cwd, shell=True, timeout=30)
+        job.wait()
+        times.append((time.perf_counter() - t0) * 1e3)
+        if job.returncode != 0 or job.error is not None:
+            raise SystemExit(f"command failed: rc={job.returncode} error={job.error}")
+    return times
+
+
+def row(label, times):
+    times = sorted(times)
+    p95 = times[min(len(times) - 1, int(len(times) * 0.95))]
+    return f"{label:<22} {statistics.mean(times):8.2f} {statistics.median(times):8.2f} {p95:8.2f}"
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument('--runs', type=int, default=200)
+    ap.add_argument('--command', default='echo hello')
+    args = ap.parse_args(argv)
+    cwd = os.getcwd()
+
+    spawn = CommandExecutor(max_workers=1)
+    session = ShellSession(cwd=cwd)
+    persistent = CommandExecutor(max_workers=1, session=session)
+    # start the session (and warm both paths) before timing
+    measure(spawn, args.command, 3, cwd)
+    measure(persistent, args.command, 3, cwd)
+
+    spawn_times = measure(spawn, args.command, args.runs, cwd)
+    session_times = measure(persistent, args.command, args.runs, cwd)
+    print(f"{args.runs} x {args.command!r} (ms)")
+    print(f"{'':<22} {'mean':>8} {'p50':>8} {'p95':>8}")
+    print(row('new shell per command', spawn_times))
+    print(row('persistent session', session_times))
+    print(f"speed-up (median) x{statistics.median(spawn_times) / statistics.median(session_times):.1f}, "
+          f"session shell started {session.starts} time(s)")
+    spawn.shutdown()
+    persistent.shutdown()
+
+
+if __name__ == '__main__':
+    main()
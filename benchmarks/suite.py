@@ -0,0 +1,410 @@
+"""
+Benchmark suite for the command pipeline.
+
+Runs without a microphone, and without a display except for the output
+pane case (skipped when Tk cannot open one; use ``xvfb-run``):
+
+    intent_match      IntentIndex.match over the utterance corpus
+    map_to_cmd        ShellCore.map_to_cmd over the corpus (handlers included)
+    extract_param     ShellCore.extract_param
+    sanitize_filename ShellCore.sanitize_filename
+    rerank            CommandRanker.choose on N-best lists
+    output_pane       OutputPane write + flush throughput (Tk)
+    voice_e2e         recorded WAV -> capture/endpointing -> VAD ->
+                      preprocessing -> stub recognizer -> re-ranking ->
+                      command dispatch, timed from the end of the phrase
+
+Results are written as JSON (``--output``) and compared against a stored
+baseline (``--baseline``); a case slower than the baseline by more than
+``--tolerance`` is a regression and the exit status is 1. Refresh the
+baseline with ``--save-baseline`` after an intended change, on the
+machine the baseline describes.
+
+    python benchmarks/suite.py [--cases map_to_cmd,voice_e2e] [--quick]
+    xvfb-run python benchmarks/suite.py --save-baseline
+
+voice_e2e uses the WAV fixtures in benchmarks/fixtures (16 kHz mono
+16-bit, each with a .txt transcript; see bench_grammar.py). Without
+fixtures it synthesizes a tone-burst phrase labelled "list files".
+"""
+import argparse
+import glob
+import json
+import math
+import os
+import platform
+import shutil
+import statistics
+import struct
+import sys
+import tempfile
+import threading
+import time
+import wave
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from history import CommandHistory  # noqa: E402
+from intents import compile_commands  # noqa: E402
+from recognition import stream_phrase  # noqa: E402
+from rerank import CommandRanker  # noqa: E402
+from shell_core import ShellCore  # noqa: E402
+
+CORPUS = os.path.join(HERE, 'utterances.txt')
+FIXTURES = os.path.join(HERE, 'fixtures')
+BASELINE = os.path.join(HERE, 'baseline.json')
+OUTPUT = os.path.join(HERE, 'results.json')
+
+
+def load_corpus(path=CORPUS):
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+class BenchShell(ShellCore):
+    """ShellCore with a silent front end that records dispatches instead of running them."""
+    def __init__(self, cwd):
+        super().__init__(voice_feedback=False)
+        self.cwd = cwd
+        # keep benchmark utterances out of the user's saved history
+        self.history.close()
+        self.history = CommandHistory(os.path.join(cwd, 'history.sqlite3'))
+        self.dispatched = []
+        self.on_dispatch = None
+
+    def print_output(self, text, newline=True):
+        pass
+
+    def update_cwd(self, new_path=None):
+        pass   # keep every run in the scratch folder
+
+    def toast(self, title, msg, duration=4):
+        pass
+
+    def run_cmd(self, cmd, is_shell=True):
+        self.dispatched.append(cmd)
+        if self.on_dispatch:
+            self.on_dispatch(cmd)
+        return None
+
+
+def timed(fn, items, repeat, batches=7):
+    """
+    Fastest of ``batches`` mean microseconds per item: scheduler noise only
+    ever adds time, so the minimum is the most repeatable estimate.
+    """
+    per_batch = max(1, repeat // batches)
+    means = []
+    for _ in range(batches):
+        t0 = time.perf_counter()
+        for _ in range(per_batch):
+            for item in items:
+                fn(item)
+        means.append((time.perf_counter() - t0) / (per_batch * len(items)) * 1e6)
+    return {'value': min(means), 'unit': 'us/op', 'median': statistics.median(means),
+            'ops': per_batch * batches * len(items)}
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(math.ceil(q * len(ordered))) - 1)]
+    return {'p50': pick(0.50), 'p95': pick(0.95), 'p99': pick(0.99)}
+
+
+# --- cases ---
+def case_intent_match(ctx):
+    index = compile_commands()
+    return timed(index.match, [u.lower() for u in ctx.corpus], ctx.repeat)
+
+
+def case_map_to_cmd(ctx):
+    return timed(ctx.shell.map_to_cmd, ctx.corpus, ctx.repeat // 4)
+
+
+def case_extract_param(ctx):
+    phrases = ['create file', 'make file', 'open file', 'delete file', 'remove file']
+    texts = ['create file called meeting notes dot txt', 'open file report.docx',
+             'please delete file old draft dot md', 'make file named todo', 'list files']
+    return timed(lambda t: ctx.shell.extract_param(t, phrases), texts, ctx.repeat)
+
+
+def case_sanitize_filename(ctx):
+    names = ['"quarterly report.xlsx"', "notes.txt", 'evil; rm -rf | cat > x', 'a&b<c>d`e', 'plain']
+    return timed(ctx.shell.sanitize_filename, names, ctx.repeat * 4)
+
+
+def case_rerank(ctx):
+    ranker = CommandRanker(names=['Downloads', 'Documents', 'projects', 'notes.txt', 'report_2024.docx'])
+    lists = [
+        [('least files', 0.82), ('list files', 0.80), ('lease files', 0.4)],
+        [('go to down loads', 0.9), ('go to downloads', 0.85)],
+        [('what tim is it', 0.7), ('what time is it', 0.65)],
+        [('open file notes dot text', 0.8)],
+        [('please do the thing', 0.5)],
+    ]
+    return timed(ranker.choose, lists, ctx.repeat // 4)
+
+
+def case_output_pane(ctx):
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception as e:
+        return {'skipped': f"no display ({e.__class__.__name__}); run under xvfb-run"}
+    from output_pane import OutputPane
+    try:
+        root.withdraw()
+        text = tk.Text(root)
+        pane = OutputPane(text, max_lines=5000)
+        line = "Directory of C:\\Users\\someone\\Documents  12/01/2024  10:42 AM    <DIR>  project"
+        lines = 20000 if not ctx.quick else 4000
+        samples = []
+        for _ in range(3):
+            pane.clear()
+            t0 = time.perf_counter()
+            for i in range(lines):
+                pane.write(line)
+                if i % 500 == 499:
+                    pane.flush()   # what the frame timer would do
+            pane.flush()
+            root.update_idletasks()
+            samples.append((time.perf_counter() - t0) / lines * 1e6)
+        return {'value': statistics.median(samples), 'unit': 'us/line', 'ops': 3 * lines,
+                'lines_per_s': round(1e6 / statistics.median(samples))}
+    finally:
+        root.destroy()
+
+
+class WavSource:
+    """File-backed stand-in for sr.Microphone (the parts stream_phrase uses)."""
+    CHUNK = 480   # 30 ms at 16 kHz, one VAD frame
+
+    def __init__(self, path):
+        with wave.open(path, 'rb') as wf:
+            self.SAMPLE_RATE = wf.getframerate()
+            self.SAMPLE_WIDTH = wf.getsampwidth()
+            self.pcm = wf.readframes(wf.getnframes())
+        self.stream = self
+        self.pos = 0
+
+    def rewind(self):
+        self.pos = 0
+
+    def read(self, frames):
+        n = frames * self.SAMPLE_WIDTH
+        chunk = self.pcm[self.pos:self.pos + n]
+        self.pos += len(chunk)
+        return chunk
+
+
+class StubStream:
+    def __init__(self, backend):
+        self.backend = backend
+        self.chunks = []
+
+    def feed(self, pcm):
+        self.chunks.append(pcm)
+
+    def finish(self):
+        # end of phrase: run the stages the batch path applies before decoding
+        self.backend.phrase_end = time.perf_counter()
+        shell, source = self.backend.shell, self.backend.source
+        pcm = b''.join(self.chunks)
+        for segment in shell.vad.split(pcm, source.SAMPLE_RATE, source.SAMPLE_WIDTH):
+            shell.preprocessor.process(segment, source.SAMPLE_RATE, source.SAMPLE_WIDTH)
+        return self.backend.transcript
+
+    def alternatives(self, n=5):
+        return [(self.backend.transcript, 0.9)][:n]
+
+
+class StubBackend:
+    """Recognizer that 'hears' the fixture's transcript, so only SpeakShell's own work is timed."""
+    def __init__(self, shell, source, transcript):
+        self.shell = shell
+        self.source = source
+        self.transcript = transcript
+        self.phrase_end = None
+
+    def start_stream(self, on_partial=None):
+        return StubStream(self)
+
+
+def synthesize_wav(path, rate=16000):
+    """0.5 s silence, 1.2 s of syllable-like tone bursts, 1 s silence."""
+    samples = []
+    for i in range(int(0.5 * rate)):
+        samples.append(0)
+    for i in range(int(1.2 * rate)):
+        t = i / float(rate)
+        envelope = 1.0 if math.sin(2 * math.pi * 4 * t) > -0.3 else 0.2
+        samples.append(int(9000 * envelope * (math.sin(2 * math.pi * 220 * t) + 0.4 * math.sin(2 * math.pi * 1100 * t))))
+    samples.extend([0] * rate)
+    with wave.open(path, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(struct.pack(f'<{len(samples)}h', *samples))
+
+
+def case_voice_e2e(ctx):
+    fixtures = []
+    for wav_path in sorted(glob.glob(os.path.join(FIXTURES, '*.wav'))):
+        txt = os.path.splitext(wav_path)[0] + '.txt'
+        if os.path.exists(txt):
+            with open(txt, encoding='utf-8') as f:
+                fixtures.append((wav_path, f.read().strip()))
+    if not fixtures:
+        path = os.path.join(ctx.scratch, 'synthetic_list_files.wav')
+        synthesize_wav(path)
+        fixtures.append((path, 'list files'))
+
+    shell = ctx.shell
+    latencies = []
+    capture = []
+    dispatched = threading.Event()
+    shell.on_dispatch = lambda cmd: dispatched.set()
+    runs = 20 if ctx.quick else 100
+    try:
+        for wav_path, transcript in fixtures:
+            source = WavSource(wav_path)
+            backend = StubBackend(shell, source, transcript)
+            # the first pass pays one-off imports and caches; not counted
+            for run in range(runs + 1):
+                source.rewind()
+                dispatched.clear()
+                t0 = time.perf_counter()
+                hypotheses = stream_phrase(
+                    source, backend, energy_threshold=shell.energy_threshold, pause_threshold=0.8,
+                    listen_timeout=10, phrase_time_limit=7,
+                    is_speech=lambda chunk: shell.vad.is_speech(chunk, source.SAMPLE_RATE, source.SAMPLE_WIDTH),
+                    nbest=shell.nbest)
+                if hypotheses:
+                    shell._on_recognition_result(None, 'ok', hypotheses)
+                done = time.perf_counter()
+                if run == 0:
+                    continue
+                capture.append((backend.phrase_end - t0) * 1e3 if backend.phrase_end else 0.0)
+                if dispatched.is_set():
+                    latencies.append((done - backend.phrase_end) * 1e3)
+    finally:
+        shell.on_dispatch = None
+    if not latencies:
+        return {'skipped': 'no fixture was dispatched as a command'}
+    result = {'value': statistics.median(latencies), 'unit': 'ms', 'ops': len(latencies),
+              'fixtures': len(fixtures), 'capture_ms_p50': round(statistics.median(capture), 3)}
+    result.update({k: round(v, 4) for k, v in percentiles(latencies).items()})
+    return result
+
+
+CASES = {
+    'intent_match': case_intent_match,
+    'map_to_cmd': case_map_to_cmd,
+    'extract_param': case_extract_param,
+    'sanitize_filename': case_sanitize_filename,
+    'rerank': case_rerank,
+    'output_pane': case_output_pane,
+    'voice_e2e': case_voice_e2e,
+}
+
+
+class Context:
+    def __init__(self, repeat, quick):
+        self.repeat = repeat
+        self.quick = quick
+        self.corpus = load_corpus()
+        self.scratch = tempfile.mkdtemp(prefix='speakshell-bench-')
+        open(os.path.join(self.scratch, 'notes.txt'), 'w').close()
+        os.mkdir(os.path.join(self.scratch, 'projects'))
+        self.shell = BenchShell(self.scratch)
+
+    def close(self):
+        self.shell.shutdown()
+        shutil.rmtree(self.scratch, ignore_errors=True)
+
+
+def machine():
+    return {'python': platform.python_version(), 'platform': platform.platform(),
+            'machine': platform.machine(), 'cpus': os.cpu_count()}
+
+
+def compare(results, baseline, tolerance):
+    """Return report lines and the names of regressed cases."""
+    lines = []
+    regressions = []
+    for name, result in results.items():
+        if 'skipped' in result:
+            lines.append(f"  {name:<18} skipped: {result['skipped']}")
+            continue
+        old = baseline.get('cases', {}).get(name, {})
+        text = f"  {name:<18} {result['value']:10.3f} {result['unit']:<8}"
+        if 'value' in old and old.get('unit') == result['unit'] and old['value'] > 0:
+            change = result['value'] / old['value'] - 1.0
+            text += f" baseline {old['value']:10.3f} ({change:+.0%})"
+            if change > tolerance:
+                text += "  REGRESSION"
+                regressions.append(name)
+        else:
+            text += " (no baseline)"
+        lines.append(text)
+    return lines, regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument('--cases', default=','.join(CASES), help="comma-separated subset of: " + ', '.join(CASES))
+    ap.add_argument('--repeat', type=int, default=2000, help="passes over each case's inputs")
+    ap.add_argument('--quick', action='store_true', help="fewer repetitions (smoke test)")
+    ap.add_argument('--output', default=OUTPUT, help="where to write this run's results")
+    ap.add_argument('--baseline', default=BASELINE)
+    ap.add_argument('--tolerance', type=float, default=0.35,
+                    help="allowed slowdown before failing (0.35 = 35%%)")
+    ap.add_argument('--save-baseline', action='store_true', help="store this run as the new baseline")
+    args = ap.parse_args(argv)
+
+    names = [n.strip() for n in args.cases.split(',') if n.strip()]
+    unknown = [n for n in names if n not in CASES]
+    if unknown:
+        ap.error(f"unknown case(s): {', '.join(unknown)}")
+    ctx = Context(args.repeat // 10 if args.quick else args.repeat, args.quick)
+    results = {}
+    try:
+        for name in names:
+            try:
+                results[name] = CASES[name](ctx)
+            except Exception as e:
+                results[name] = {'skipped': f"error: {e}"}
+    finally:
+        ctx.close()
+
+    run = {'created': datetime.now().isoformat(timespec='seconds'), 'machine': machine(),
+           'quick': args.quick, 'cases': results}
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(run, f, indent=2)
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    lines, regressions = compare(results, baseline, args.tolerance)
+    print(f"SpeakShell benchmarks ({run['machine']['platform']}, Python {run['machine']['python']})")
+    print('\n'.join(lines))
+    print(f"results: {args.output}")
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(run, f, indent=2)
+        print(f"baseline saved: {args.baseline}")
+    elif baseline and baseline.get('machine') != run['machine']:
+        print("note: the baseline was recorded on a different machine")
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
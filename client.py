@@ -0,0 +1,403 @@
+"""
+Client side of the daemon API (daemon.py) and a terminal front end on it.
+
+``DaemonClient`` connects to the running daemon (starting one if asked),
+sends requests and hands events to ``on_event`` on its reader thread:
+
+    client = DaemonClient(on_event=print).connect(spawn=True)
+    client.subscribe(['output', 'done'])
+    client.submit("list files")
+
+``on_event`` runs on the reader thread, so it must not wait for a reply
+itself; ``post`` sends a request without waiting. ``RemoteHistory`` reads
+the daemon's command history for completion and the history list.
+
+The terminal front end is the headless REPL/pipe mode over the socket:
+
+    python speak_shell.py --client                      # REPL on session 0
+    python speak_shell.py --client --new-session        # own session, here
+    python speak_shell.py --client -c "disk space"      # one-shot
+    python speak_shell.py --client --listen             # start the daemon's mic
+    python speak_shell.py --client --stop-daemon
+"""
+import argparse
+import itertools
+import json
+import os
+import queue
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from helpers import DAEMON_INFO, LOG_DIR
+
+try:
+    import readline
+except Exception:
+    readline = None
+
+PROTOCOL = 1
+
+
+class DaemonError(Exception):
+    pass
+
+
+def read_info(info_path=DAEMON_INFO):
+    try:
+        with open(info_path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def open_socket(info, timeout=5):
+    """A socket connected to the daemon described by ``info``."""
+    if 'unix' in info:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        address = info['unix']
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        address = tuple(info['tcp'])
+    sock.settimeout(timeout)
+    try:
+        sock.connect(address)
+    except OSError:
+        sock.close()
+        raise
+    sock.settimeout(None)
+    return sock
+
+
+def running_info(info_path=DAEMON_INFO):
+    """DAEMON_INFO of a daemon that accepts connections, or None."""
+    info = read_info(info_path)
+    if info is None:
+        return None
+    try:
+        open_socket(info, timeout=1).close()
+    except OSError:
+        return None
+    return info
+
+
+def spawn_daemon(args=(), timeout=15, info_path=DAEMON_INFO):
+    """Start ``speak_shell.py --daemon`` in the background and wait until it accepts connections."""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'speak_shell.py')
+    os.makedirs(LOG_DIR, exist_ok=True)
+    if os.name == 'nt':
+        detach = {'creationflags': subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP}
+    else:
+        detach = {'start_new_session': True}
+    with open(os.path.join(LOG_DIR, 'daemon.out'), 'ab') as log:
+        proc = subprocess.Popen([sys.executable, script, '--daemon', *args], stdin=subprocess.DEVNULL,
+                                stdout=log, stderr=subprocess.STDOUT, close_fds=True, **detach)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        info = running_info(info_path)
+        if info is not None:
+            return info
+        if proc.poll() is not None:
+            raise DaemonError(f"daemon exited with status {proc.returncode} (see {LOG_DIR}/daemon.out)")
+        time.sleep(0.1)
+    raise DaemonError("daemon did not start in time")
+
+
+class DaemonClient:
+    def __init__(self, name='client', on_event=None, info_path=DAEMON_INFO):
+        self.name = name
+        self.on_event = on_event
+        self.info_path = info_path
+        self.sock = None
+        self.state = None
+        self.connected = False
+        self._ids = itertools.count(1)
+        self._pending = {}       # request id -> [Event, reply]
+        self._send_lock = threading.Lock()
+        self._reader_thread = None
+
+    def connect(self, spawn=False, daemon_args=()):
+        info = running_info(self.info_path)
+        if info is None:
+            if not spawn:
+                raise DaemonError("no daemon running (start one with: speak_shell.py --daemon)")
+            info = spawn_daemon(daemon_args, info_path=self.info_path)
+        self.sock = open_socket(info)
+        self.connected = True
+        self._reader_thread = threading.Thread(target=self._reader, name='speakshell-client-reader', daemon=True)
+        self._reader_thread.start()
+        self.state = self.request('hello', token=info['token'], name=self.name)
+        return self
+
+    def close(self):
+        self.connected = False
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+
+    # --- requests ---
+    def _send(self, message):
+        data = (json.dumps(message) + '\n').encode('utf-8')
+        with self._send_lock:
+            try:
+                self.sock.sendall(data)
+            except OSError as e:
+                raise DaemonError(f"connection lost: {e}") from None
+
+    def post(self, op, **fields):
+        """Send a request without waiting for its reply (safe inside on_event)."""
+        self._send(dict(fields, op=op, id=None))
+
+    def request(self, op, timeout=30, **fields):
+        if not self.connected:
+            raise DaemonError("not connected")
+        request_id = next(self._ids)
+        box = self._pending[request_id] = [threading.Event(), None]
+        try:
+            self._send(dict(fields, op=op, id=request_id))
+            if not box[0].wait(timeout):
+                raise DaemonError(f"no reply to {op}")
+        finally:
+            self._pending.pop(request_id, None)
+        reply = box[1]
+        if reply is None:
+            raise DaemonError("connection lost")
+        if not reply.get('ok'):
+            raise DaemonError(reply.get('error') or 'request failed')
+        return reply.get('result')
+
+    def subscribe(self, events=None, sessions=None):
+        return self.request('subscribe', events=events, sessions=sessions)
+
+    def submit(self, command, session=0, source='manual'):
+        """Queue ``command`` in ``session``; returns the request id its "done" event carries."""
+        return self.request('submit', command=command, session=session, source=source)['request']
+
+    # --- reader thread ---
+    def _reader(self):
+        try:
+            for line in self.sock.makefile('r', encoding='utf-8'):
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    continue
+                if 'event' in message:
+                    if self.on_event:
+                        try:
+                            self.on_event(message)
+                        except Exception:
+                            pass
+                    continue
+                box = self._pending.get(message.get('id'))
+                if box is not None:
+                    box[1] = message
+                    box[0].set()
+        except (OSError, ValueError):
+            pass
+        self.connected = False
+        for box in list(self._pending.values()):
+            box[0].set()
+        if self.on_event:
+            try:
+                self.on_event({'event': 'disconnected'})
+            except Exception:
+                pass
+
+
+class RemoteHistory:
+    """
+    The daemon's command history with the calls a front end makes on
+    history.CommandHistory; the daemon records commands itself.
+    """
+    def __init__(self, client):
+        self.client = client
+        self.loaded = threading.Event()
+        self.loaded.set()
+
+    def _request(self, op, default, **fields):
+        try:
+            return self.client.request(op, timeout=2, **fields)
+        except DaemonError:
+            return default
+
+    def __len__(self):
+        return self._request('history', {'size': 0})['size']
+
+    def rows(self, start, count):
+        return self._request('history', {'rows': []}, start=start, count=count)['rows']
+
+    def recent(self, count):
+        return self.rows(0, count)
+
+    def complete(self, prefix, limit=None):
+        return self._request('complete', [], prefix=prefix, limit=limit)
+
+    def add(self, command, when=None):
+        return None
+
+    def close(self, timeout=5):
+        pass
+
+
+class TerminalClient:
+    """The headless REPL and pipe mode, running commands in a daemon session."""
+    def __init__(self, assume_yes=False, interactive=None, out=None):
+        self.out = out or sys.stdout
+        self.interactive = sys.stdin.isatty() if interactive is None else interactive
+        self.assume_yes = assume_yes
+        self.session = 0
+        self.running = True
+        self.failures = 0
+        self._done = {}           # request id -> ok
+        self._cond = threading.Condition()
+        self._confirms = queue.Queue()
+        self.client = DaemonClient(name=f'terminal {os.getpid()}', on_event=self._on_event)
+
+    def _write(self, text):
+        self.out.write(text)
+        self.out.flush()
+
+    def _on_event(self, event):
+        kind = event['event']
+        if kind == 'output' and event.get('session') == self.session:
+            self._write(event['text'] + ('\n' if event.get('newline', True) else ''))
+        elif kind == 'confirm' and event.get('session') == self.session and not event.get('answered'):
+            self._confirms.put(event)
+        elif kind in ('done', 'exit', 'disconnected'):
+            with self._cond:
+                if kind == 'done':
+                    self._done[event['request']] = event.get('ok', True)
+                elif kind == 'disconnected' or event.get('session') == self.session:
+                    self.running = False
+                self._cond.notify_all()
+
+    def _answer(self, event):
+        if self.assume_yes:
+            answer = True
+        else:
+            try:
+                answer = input(f"{event['message']} [y/N] ").strip().lower() in ('y', 'yes')
+            except EOFError:
+                answer = False
+        self.client.post('confirm_reply', confirm=event['confirm'], answer=answer)
+
+    def execute(self, line):
+        """Run one command in the session and wait until it is done; Ctrl+C cancels its jobs."""
+        line = line.strip()
+        if not line or line.startswith('#'):
+            return
+        request = self.client.submit(line, self.session)
+        while True:
+            try:
+                with self._cond:
+                    while request not in self._done and self.running and self._confirms.empty():
+                        self._cond.wait(0.2)
+                    if request in self._done:
+                        if not self._done.pop(request):
+                            self.failures += 1
+                        return
+                    if not self.running and self._confirms.empty():
+                        return
+                self._answer(self._confirms.get())
+            except KeyboardInterrupt:
+                self._write("\n")
+                self.client.request('cancel', session=self.session, which='all')
+
+    def _setup_readline(self):
+        if readline is None:
+            return
+
+        def _complete(text, state):
+            try:
+                matches = self.client.request('complete', prefix=text, timeout=2) if text.strip() else []
+            except DaemonError:
+                matches = []
+            return matches[state] if state < len(matches) else None
+        readline.set_completer_delims('')
+        readline.set_completer(_complete)
+        readline.parse_and_bind('tab: complete')
+
+    def repl(self):
+        self._write(f"Speak Shell (daemon {self.client.state['pid']}, session {self.session}) - "
+                    "type 'help' for commands, 'exit' to leave.\n")
+        self._setup_readline()
+        while self.running:
+            try:
+                line = input('> ')
+            except EOFError:
+                break
+            except KeyboardInterrupt:
+                self._write("\n")
+                continue
+            self.execute(line)
+
+    def run_stream(self, stream):
+        for line in stream:
+            if not self.running:
+                break
+            self.execute(line)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog='speak_shell.py --client',
+                                 description="Run SpeakShell commands in the background daemon.")
+    ap.add_argument('-c', '--command', action='append', default=[],
+                    help="run this command and exit (repeatable)")
+    ap.add_argument('--script', metavar='FILE', help="run FILE as a batch and exit")
+    ap.add_argument('--session', type=int, default=0, help="daemon session to use (default 0)")
+    ap.add_argument('--new-session', action='store_true',
+                    help="open a session in the current folder and close it on exit")
+    ap.add_argument('--listen', action='store_true', help="start the daemon's microphone, speech going to this session")
+    ap.add_argument('-y', '--yes', action='store_true', help="answer yes to confirmations")
+    ap.add_argument('--no-spawn', action='store_true', help="fail instead of starting a daemon")
+    ap.add_argument('--status', action='store_true', help="print the daemon's state and exit")
+    ap.add_argument('--stop-daemon', action='store_true', help="shut the daemon down and exit")
+    args = ap.parse_args(argv)
+
+    term = TerminalClient(assume_yes=args.yes)
+    try:
+        term.client.connect(spawn=not (args.no_spawn or args.stop_daemon or args.status))
+    except (DaemonError, OSError) as e:
+        print(f"speakshell: {e}", file=sys.stderr)
+        return 1
+    client = term.client
+    try:
+        if args.status:
+            print(json.dumps(client.state, indent=2))
+            return 0
+        if args.stop_daemon:
+            client.request('shutdown')
+            return 0
+        term.session = client.request('open_session', cwd=os.getcwd())['session'] if args.new_session else args.session
+        events = ['output', 'done', 'exit']
+        if term.interactive or args.yes:
+            events.append('confirm')
+        client.subscribe(events)
+        if args.listen:
+            client.request('focus', session=term.session)
+            client.request('listen', on=True)
+        if args.script:
+            term.execute(f"run script {os.path.abspath(args.script)}")
+        elif args.command:
+            for command in args.command:
+                term.execute(command)
+        elif term.interactive or args.listen:
+            term.repl()
+        else:
+            term.run_stream(sys.stdin)
+        if args.new_session and client.connected:
+            client.request('close_session', session=term.session)
+    except DaemonError as e:
+        print(f"speakshell: {e}", file=sys.stderr)
+        return 1
+    finally:
+        client.close()
+    return 1 if term.failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,686 @@
+"""
+Background daemon that owns the microphone, recognizer, shell sessions and logs.
+
+Front ends attach to it over a local socket: the terminal client
+(client.py, ``speak_shell.py --client``) and the window
+(``speak_shell.py --connect``). Audio capture and decoding then never
+share a GIL or an event loop with a window, and closing or restarting a
+window keeps the calibration, loaded engines, folder index and running
+jobs.
+
+    python speak_shell.py --daemon [--voice] [--engine NAME]
+
+The socket is ~/.speakshell/daemon.sock, or a localhost TCP port where
+there are no Unix sockets. Its address, the daemon's pid and a random
+token are written to ~/.speakshell/daemon.json (readable by the user
+only); a client must present the token before anything else.
+
+Each direction carries one JSON object per line:
+
+    request  {"id": 1, "op": "submit", "command": "list files", "session": 0}
+    reply    {"id": 1, "ok": true, "result": {"request": 7}}
+             {"id": 1, "ok": false, "error": "no session 3"}
+    event    {"event": "output", "session": 0, "text": "...", "newline": true}
+
+Requests (op):
+    hello          token, name       -> state (must come first)
+    subscribe      events, sessions  which events to receive (null = all)
+    submit         command, session  -> request; a "done" event follows
+    complete       prefix            -> completions from the saved history
+    history        start, count      -> rows (newest first) and size of the history
+    open_session   cwd               -> session, cwd
+    close_session  session
+    focus          session           where recognized speech goes
+    listen         on                start or stop the microphone
+    calibrate
+    cancel         session, which    "all" or a job id
+    set            name, value       one of SETTINGS
+    state                            -> sessions, focus, listening, settings, stats
+    confirm_reply  confirm, answer
+    shutdown
+
+Events: output, clear, status, cwd, listening, history, activity, stats,
+confirm, done, session, and exit (only to the client whose command was
+"exit"). Commands of one session run in order; a command is "done" once
+the jobs and macros it started have finished.
+Sessions run independently of each other and share the stores listed in
+ShellCore.SHARED, as the window's tabs do.
+"""
+import argparse
+import json
+import os
+import queue
+import secrets
+import signal
+import socket
+import socketserver
+import sys
+import threading
+
+from client import PROTOCOL, DaemonError, running_info
+from engines import available_backends
+from headless import HeadlessShell
+from helpers import DAEMON_INFO, DAEMON_SOCKET
+from startup import PROFILE
+
+_STOP = object()
+# a client that falls this many events behind is disconnected
+MAX_PENDING = 10000
+CONFIRM_TIMEOUT = 120
+# name -> type of the options a client may change with "set"
+SETTINGS = {
+    'energy_threshold': int,
+    'phrase_time_limit': int,
+    'recognizer_pool_size': int,
+    'vad_level': int,
+    'min_speech_ms': int,
+    'wake_word': str,
+    'wake_threshold': float,
+    'engine': str,
+    'constrained_decoding': bool,
+    'clean_audio': bool,
+    'voice_feedback': bool,
+}
+
+
+class DaemonSession(HeadlessShell):
+    """One shell session of the daemon; its output and state changes become events."""
+    def __init__(self, daemon, sid, shared=None, voice_feedback=False):
+        self.daemon = daemon
+        self.sid = sid
+        self._commands = queue.Queue()
+        self._client = None      # whose command is running (gets the "exit")
+        self._is_listening = False
+        super().__init__(voice_feedback=voice_feedback, interactive=False, shared=shared, lock=daemon.lock)
+        self._worker = threading.Thread(target=self._run_commands, name=f'speakshell-session-{sid}', daemon=True)
+        self._worker.start()
+
+    @property
+    def main(self):
+        return self.daemon.main or self
+
+    # the first session owns the voice side; the others defer to it
+    @property
+    def is_listening(self):
+        return self._is_listening if self.main is self else self.main.is_listening
+
+    @is_listening.setter
+    def is_listening(self, value):
+        self._is_listening = value
+
+    def start_listening(self):
+        if self.main is self:
+            super().start_listening()
+        else:
+            self.main.start_listening()
+
+    def stop_listening(self):
+        if self.main is self:
+            super().stop_listening()
+        else:
+            self.main.stop_listening()
+
+    def calibrate_mic(self):
+        if self.main is self:
+            super().calibrate_mic()
+        else:
+            self.main.calibrate_mic()
+
+    def speak(self, text, interrupt=False):
+        if self.main is self:
+            super().speak(text, interrupt)
+        else:
+            self.main.speak(text, interrupt)
+
+    def toast(self, title, msg, duration=4):
+        pass   # the front ends show notifications
+
+    # speech goes to the focused session
+    def _run_hypotheses(self, hypotheses, trace=None):
+        target = self.daemon.focused()
+        if target is not self:
+            return target._run_hypotheses(hypotheses, trace)
+        return super()._run_hypotheses(hypotheses, trace)
+
+    def cwd_names(self):
+        target = self.daemon.focused()
+        if target is not self:
+            return target.cwd_names()
+        return super().cwd_names()
+
+    # --- ShellCore hooks ---
+    def print_output(self, text, newline=True):
+        self.daemon.publish('output', session=self.sid, text=text, newline=newline)
+
+    def voice_output(self, text):
+        self.daemon.focused().print_output(text)
+
+    def clear_output(self):
+        self.daemon.publish('clear', session=self.sid)
+
+    def set_status(self, text, fg=None):
+        self.status = text
+        self.daemon.publish('status', session=self.sid, text=text, color=fg)
+
+    def confirm(self, title, message):
+        return self.daemon.ask(self.sid, title, message)
+
+    def update_cwd(self, new_path=None):
+        super().update_cwd(new_path)
+        self.main._grammar_dirty = True
+        self.daemon.publish('cwd', session=self.sid, cwd=self.cwd)
+
+    def exit_session(self):
+        # 'exit' detaches the client that sent it; the session and its jobs stay
+        self.print_output("Exiting...")
+        if self._client is not None:
+            self._client.send({'event': 'exit', 'session': self.sid})
+
+    def log_activity(self, activity_type, message):
+        super().log_activity(activity_type, message)
+        self.daemon.publish('activity', session=self.sid, type=activity_type, message=message)
+
+    def _on_listening_changed(self):
+        self.daemon.publish('listening', on=self.is_listening)
+
+    def _on_history_added(self, command):
+        self.daemon.publish('history', session=self.sid, command=command)
+
+    def _on_history_loaded(self):
+        self.daemon.publish('history', session=self.sid, reload=True)
+
+    def _on_calibrated(self):
+        self.daemon.publish('stats', kind='energy', value=self.energy_threshold)
+
+    def _update_vad_stats(self):
+        self.daemon.publish('stats', kind='vad', text=self.vad.stats_text())
+
+    def _update_wake_stats(self):
+        self.daemon.publish('stats', kind='wake', text=self.wake.stats_text(), on=self.wake.enabled)
+
+    def _update_latency_stats(self):
+        self.daemon.publish('stats', kind='latency', text=self.latency.status_text())
+
+    def _update_cache_stats(self):
+        self.daemon.publish('stats', kind='cache', text=self.results.stats_text())
+
+    # --- commands ---
+    def submit(self, request, command, source='manual', client=None):
+        self._commands.put((request, command, source, client))
+
+    def _run_commands(self):
+        while True:
+            item = self._commands.get()
+            if item is _STOP:
+                return
+            request, command, source, self._client = item
+            failures = self.failures
+            try:
+                if command.strip() and not command.strip().startswith('#'):
+                    with self._lock:
+                        self.process_command(command, source)
+                    self.wait_for_jobs()
+            except Exception as e:
+                self.print_output(f"ERROR: {e}")
+                self.failures += 1
+            self._client = None
+            self.daemon.publish('done', session=self.sid, request=request, ok=self.failures == failures)
+
+    def close_session(self):
+        self._commands.put(_STOP)
+        super().close_session()
+
+    # --- settings ---
+    def settings(self):
+        return {
+            'energy_threshold': self.energy_threshold,
+            'phrase_time_limit': self.phrase_time_limit,
+            'recognizer_pool_size': self.recognizer_pool_size,
+            'vad_level': self.vad.level,
+            'min_speech_ms': self.vad.min_speech_ms,
+            'wake_word': self.wake.phrase if self.wake.enabled else '',
+            'wake_threshold': self.wake.threshold or 0.0,
+            'engine': self.recognition_engine,
+            'constrained_decoding': self.constrained_decoding,
+            'clean_audio': self.preprocessor.enabled,
+            'voice_feedback': self.voice_feedback,
+        }
+
+    def apply_setting(self, name, value):
+        if name == 'energy_threshold':
+            self.energy_threshold = self.vad.energy_threshold = value
+            if self.recognizer:
+                self.recognizer.energy_threshold = value
+        elif name == 'vad_level':
+            self.vad.set_level(value)
+        elif name == 'min_speech_ms':
+            self.vad.min_speech_ms = value
+        elif name == 'wake_word':
+            # '' turns the gate off
+            if value and not self.set_wake_word(True, value):
+                raise DaemonError(f"cannot use wake word {value!r} (needs pocketsphinx and dictionary words)")
+            if not value:
+                self.set_wake_word(False)
+        elif name == 'wake_threshold':
+            # 0 goes back to the phrase's default
+            try:
+                self.set_wake_threshold(value or None)
+            except ValueError as e:
+                raise DaemonError(str(e)) from None
+        elif name == 'engine':
+            if value not in (available_backends() or ['google']):
+                raise DaemonError(f"unknown engine {value!r}")
+            self._on_engine_change(value)
+        elif name == 'clean_audio':
+            self.preprocessor.enabled = value and self.preprocessor.available
+        elif name == 'voice_feedback':
+            self.voice_feedback = value and self.tts is not None
+            if not self.voice_feedback and self.tts:
+                self.tts.interrupt()
+        else:
+            setattr(self, name, value)
+
+
+class ClientConnection:
+    """One attached front end: events are queued and written by its own thread."""
+    def __init__(self, daemon, sock, name='client'):
+        self.daemon = daemon
+        self.sock = sock
+        self.name = name
+        self.authed = False
+        self.events = set()      # empty until "subscribe"; None = all
+        self.sessions = None     # None = all
+        self._queue = queue.Queue(MAX_PENDING)
+        self._thread = threading.Thread(target=self._writer, name='speakshell-client', daemon=True)
+        self._thread.start()
+
+    def wants(self, event, session=None):
+        if not self.authed or (self.events is not None and event not in self.events):
+            return False
+        return session is None or self.sessions is None or session in self.sessions
+
+    def send(self, message):
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            # too slow to keep up; it can reconnect and ask for "state"
+            self.close()
+
+    def close(self, timeout=None):
+        """Send what is queued, then hang up (at once if the queue is full)."""
+        try:
+            self._queue.put_nowait(_STOP)
+        except queue.Full:
+            self._hang_up()
+        if timeout:
+            self._thread.join(timeout)
+
+    def _hang_up(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def _writer(self):
+        while True:
+            batch = [self._queue.get()]
+            while batch[-1] is not _STOP:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            data = ''.join(json.dumps(m) + '\n' for m in batch if m is not _STOP)
+            try:
+                if data:
+                    self.sock.sendall(data.encode('utf-8'))
+            except OSError:
+                return
+            if batch[-1] is _STOP:
+                self._hang_up()
+                return
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.server.daemon.serve_client(self.connection, self.rfile)
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if hasattr(socketserver, 'ThreadingUnixStreamServer'):
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+else:
+    _UnixServer = None
+
+
+class SpeakShellDaemon:
+    def __init__(self, voice_feedback=False, info_path=DAEMON_INFO, socket_path=DAEMON_SOCKET):
+        self.info_path = info_path
+        self.socket_path = socket_path
+        self.token = secrets.token_hex(16)
+        # the daemon's "UI thread": every shell callback runs under it
+        self.lock = threading.RLock()
+        self.clients = set()
+        self._clients_lock = threading.Lock()
+        self.sessions = {}
+        self.focus = 0
+        self._ids = 0
+        self._confirms = {}      # confirm id -> [answered, answer]
+        # waiting on it releases the lock, so other sessions and requests
+        # go on while a front end decides
+        self._confirmed = threading.Condition(self.lock)
+        self.stopped = threading.Event()
+        self.server = None
+        self.main = None
+        self.main = self.open_session(voice_feedback=voice_feedback)
+
+    def _next_id(self):
+        with self._clients_lock:
+            self._ids += 1
+            return self._ids
+
+    # --- sessions ---
+    def open_session(self, cwd=None, voice_feedback=False):
+        with self.lock:
+            sid = max(self.sessions, default=-1) + 1
+            session = DaemonSession(self, sid, shared=self.main, voice_feedback=voice_feedback)
+            if cwd and os.path.isdir(cwd):
+                session.cwd = session.shell_session.cwd = os.path.abspath(cwd)
+            self.sessions[sid] = session
+        self.publish('session', session=sid, cwd=session.cwd, opened=True)
+        return session
+
+    def close_session(self, sid):
+        with self.lock:
+            session = self.get_session(sid)
+            if session is self.main:
+                raise DaemonError("session 0 cannot be closed")
+            del self.sessions[sid]
+            if self.focus == sid:
+                self.focus = 0
+        session.close_session()
+        self.publish('session', session=sid, closed=True)
+
+    def get_session(self, sid):
+        session = self.sessions.get(0 if sid is None else sid)
+        if session is None:
+            raise DaemonError(f"no session {sid}")
+        return session
+
+    def focused(self):
+        return self.sessions.get(self.focus) or self.main
+
+    # --- events ---
+    def publish(self, event, **fields):
+        message = dict(fields, event=event)
+        session = fields.get('session')
+        with self._clients_lock:
+            clients = [c for c in self.clients if c.wants(event, session)]
+        for client in clients:
+            client.send(message)
+
+    def ask(self, sid, title, message):
+        """Ask the attached front ends to confirm; False if none answers."""
+        with self._clients_lock:
+            asked = [c for c in self.clients if c.wants('confirm', sid)]
+        if not asked:
+            self.sessions[sid].print_output(f"{title}: refused, no front end to confirm it")
+            return False
+        cid = self._next_id()
+        box = [False, False]
+        with self._confirmed:
+            self._confirms[cid] = box
+            self.publish('confirm', session=sid, confirm=cid, title=title, message=message)
+            try:
+                if not self._confirmed.wait_for(lambda: box[0], CONFIRM_TIMEOUT):
+                    self.sessions[sid].print_output(f"{title}: no answer, cancelled")
+                return box[1]
+            finally:
+                self._confirms.pop(cid, None)
+                self.publish('confirm', session=sid, confirm=cid, answered=True)
+
+    # --- requests ---
+    def state(self):
+        main = self.main
+        return {
+            'protocol': PROTOCOL,
+            'pid': os.getpid(),
+            'sessions': [{'session': sid, 'cwd': s.cwd} for sid, s in sorted(self.sessions.items())],
+            'focus': self.focus,
+            'listening': main.is_listening,
+            'voice_enabled': bool(main.voice_enabled),
+            'engines': available_backends() or ['google'],
+            'settings': main.settings(),
+            'stats': {'vad': main.vad.stats_text(), 'wake': main.wake.stats_text(), 'latency': main.latency.status_text(),
+                      'cache': main.results.stats_text()},
+        }
+
+    def handle(self, client, message):
+        op = message.get('op')
+        if not client.authed:
+            if op != 'hello' or not secrets.compare_digest(str(message.get('token', '')), self.token):
+                raise DaemonError("bad token")
+            client.authed = True
+            client.name = str(message.get('name') or client.name)
+            self.main.log_activity("DAEMON", f"{client.name} attached")
+            return self.state()
+        if op == 'subscribe':
+            events, sessions = message.get('events'), message.get('sessions')
+            client.events = None if events is None else set(events)
+            client.sessions = None if sessions is None else set(sessions)
+            return None
+        if op == 'submit':
+            session = self.get_session(message.get('session'))
+            request = self._next_id()
+            session.submit(request, str(message.get('command', '')), message.get('source', 'manual'), client)
+            return {'request': request}
+        if op == 'complete':
+            return self.main.history.complete(str(message.get('prefix', '')), message.get('limit'))
+        if op == 'history':
+            history = self.main.history
+            return {'rows': history.rows(int(message.get('start', 0)), int(message.get('count', 0))),
+                    'size': len(history)}
+        if op == 'open_session':
+            session = self.open_session(message.get('cwd'))
+            return {'session': session.sid, 'cwd': session.cwd}
+        if op == 'close_session':
+            self.close_session(message.get('session'))
+            return None
+        if op == 'focus':
+            self.focus = self.get_session(message.get('session')).sid
+            with self.lock:
+                self.main._grammar_dirty = True
+            return None
+        if op == 'listen':
+            with self.lock:
+                if message.get('on', True):
+                    if not self.main.voice_enabled:
+                        raise DaemonError("SpeechRecognition/PyAudio not available to the daemon")
+                    self.main.start_listening()
+                else:
+                    self.main.stop_listening()
+            return None
+        if op == 'calibrate':
+            with self.lock:
+                self.main.calibrate_mic()
+            return None
+        if op == 'cancel':
+            session = self.get_session(message.get('session'))
+            with self.lock:
+                session.cancel_jobs(message.get('which') or 'all')
+            return None
+        if op == 'set':
+            name = message.get('name')
+            if name not in SETTINGS:
+                raise DaemonError(f"unknown setting {name!r}")
+            try:
+                value = SETTINGS[name](message.get('value'))
+            except (TypeError, ValueError):
+                raise DaemonError(f"bad value for {name}") from None
+            with self.lock:
+                self.main.apply_setting(name, value)
+            return None
+        if op == 'state':
+            with self.lock:
+                return self.state()
+        if op == 'confirm_reply':
+            with self._confirmed:
+                box = self._confirms.get(message.get('confirm'))
+                if box is not None and not box[0]:
+                    box[1] = bool(message.get('answer'))
+                    box[0] = True
+                    self._confirmed.notify_all()
+            return None
+        if op == 'shutdown':
+            self.main.log_activity("DAEMON", f"shutdown requested by {client.name}")
+            self.stopped.set()
+            return None
+        raise DaemonError(f"unknown op {op!r}")
+
+    def serve_client(self, sock, rfile):
+        client = ClientConnection(self, sock)
+        with self._clients_lock:
+            self.clients.add(client)
+        try:
+            for raw in rfile:
+                try:
+                    message = json.loads(raw)
+                    if not isinstance(message, dict):
+                        raise ValueError("expected an object")
+                except ValueError as e:
+                    client.send({'id': None, 'ok': False, 'error': f"bad request: {e}"})
+                    continue
+                try:
+                    client.send({'id': message.get('id'), 'ok': True, 'result': self.handle(client, message)})
+                except DaemonError as e:
+                    client.send({'id': message.get('id'), 'ok': False, 'error': str(e)})
+                    if not client.authed:
+                        break
+                except Exception as e:
+                    client.send({'id': message.get('id'), 'ok': False, 'error': f"{type(e).__name__}: {e}"})
+        except OSError:
+            pass
+        finally:
+            with self._clients_lock:
+                self.clients.discard(client)
+            client.close(timeout=2)
+            if client.authed:
+                self.main.log_activity("DAEMON", f"{client.name} detached")
+
+    # --- lifetime ---
+    def bind(self):
+        """Listen on the Unix socket (or localhost TCP) and publish the address in DAEMON_INFO."""
+        if running_info(self.info_path) is not None:
+            raise DaemonError(f"a daemon is already running (see {self.info_path})")
+        os.makedirs(os.path.dirname(self.info_path), exist_ok=True)
+        if _UnixServer is not None:
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)   # left behind by a daemon that died
+            umask = os.umask(0o077)
+            try:
+                self.server = _UnixServer(self.socket_path, _Handler)
+            finally:
+                os.umask(umask)
+            address = {'unix': self.socket_path}
+        else:
+            self.server = _TCPServer(('127.0.0.1', 0), _Handler)
+            address = {'tcp': list(self.server.server_address[:2])}
+        self.server.daemon = self
+        info = dict(address, token=self.token, pid=os.getpid(), protocol=PROTOCOL)
+        tmp = f"{self.info_path}.{os.getpid()}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(info, f)
+        os.replace(tmp, self.info_path)
+        return info
+
+    def serve(self):
+        """Serve until a client sends "shutdown" or the process is interrupted."""
+        thread = threading.Thread(target=self.server.serve_forever, name='speakshell-server', daemon=True)
+        thread.start()
+        try:
+            while not self.stopped.wait(0.5):
+                pass
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self):
+        self.stopped.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        with self._clients_lock:
+            clients, self.clients = list(self.clients), set()
+        for client in clients:
+            client.close()
+        for path in (self.info_path, self.socket_path if _UnixServer is not None else None):
+            if path:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+        with self.lock:
+            for sid, session in list(self.sessions.items()):
+                if session is not self.main:
+                    session.close_session()
+            if self.main.is_listening:
+                self.main.stop_listening()
+        self.main.shutdown()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog='speak_shell.py --daemon',
+                                 description="Run the SpeakShell backend for --client and --connect front ends.")
+    ap.add_argument('--voice', action='store_true', help="start listening on the microphone")
+    ap.add_argument('--engine', choices=available_backends() or None, help="recognition engine")
+    ap.add_argument('--speak', action='store_true', help="enable spoken feedback")
+    ap.add_argument('--wake-word', nargs='?', const='shell', metavar='PHRASE',
+                    help="only decode phrases that start with PHRASE (default 'shell'; needs pocketsphinx)")
+    ap.add_argument('--wake-threshold', type=float, metavar='N',
+                    help="keyword-spotting threshold for the wake word (default: by phrase length, 1e-5 for 'shell')")
+    ap.add_argument('--index-root', action='append', default=[], metavar='DIR',
+                    help="also index DIR for 'go to <name>' (repeatable)")
+    args = ap.parse_args(argv)
+    if args.wake_threshold is not None and not 0 <= args.wake_threshold < 1:
+        ap.error("--wake-threshold must be between 0 and 1")
+
+    daemon = SpeakShellDaemon(voice_feedback=args.speak)
+    try:
+        info = daemon.bind()
+    except (DaemonError, OSError) as e:
+        print(f"speakshell daemon: {e}", file=sys.stderr)
+        daemon.main.shutdown()
+        return 1
+    PROFILE.mark('daemon bound')
+    main_session = daemon.main
+    for root in args.index_root:
+        main_session.dir_index.add_root(root)
+    if args.engine:
+        main_session._on_engine_change(args.engine)
+    if args.wake_threshold is not None:
+        main_session.set_wake_threshold(args.wake_threshold)
+    if args.wake_word:
+        main_session.set_wake_word(True, args.wake_word)
+    if hasattr(signal, 'SIGTERM'):
+        signal.signal(signal.SIGTERM, lambda signum, frame: daemon.stopped.set())
+    main_session.warm_up()
+    if args.voice:
+        with daemon.lock:
+            main_session.start_listening()
+    where = info.get('unix') or '%s:%s' % tuple(info['tcp'])
+    print(f"speakshell daemon {os.getpid()} listening on {where}", flush=True)
+    PROFILE.ready()
+    PROFILE.print_report()
+    daemon.serve()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
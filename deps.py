@@ -4,48 +4,116 @@ Dependency detection shim.
 This module centralizes optional imports and exposes flags and modules
 so the main application can remain unchanged in logic while moving
 the import/availability checks to one place.
+
+Nothing heavy is imported here. The *_AVAILABLE flags only check that a
+package is installed (``importlib.util.find_spec``), and each module name
+is a ``LazyModule`` proxy that imports on first attribute access. A proxy
+is falsy when its package is missing or failed to import, so callers test
+``if not sr`` instead of ``if sr is None``. ``start_warmup`` loads the
+proxies on a background thread once the front end is up, and every load
+is timed for the --startup-profile report.
 """
-SPEECH_RECOGNITION_AVAILABLE = False
-PYAUDIO_AVAILABLE = False
-TTS_AVAILABLE = False
-TOAST_AVAILABLE = False
-
-sr = None
-pyaudio = None
-pyttsx3 = None
-ToastNotifier = None
-psutil = None
-
-try:
-    import pyaudio as _pyaudio
-    pyaudio = _pyaudio
-    PYAUDIO_AVAILABLE = True
-except Exception:
-    pyaudio = None
-
-try:
-    import speech_recognition as _sr
-    sr = _sr
-    SPEECH_RECOGNITION_AVAILABLE = True
-except Exception:
-    sr = None
-
-try:
-    import pyttsx3 as _pyttsx3
-    pyttsx3 = _pyttsx3
-    TTS_AVAILABLE = True
-except Exception:
-    pyttsx3 = None
-
-try:
-    from win10toast import ToastNotifier as _ToastNotifier
-    ToastNotifier = _ToastNotifier
-    TOAST_AVAILABLE = True
-except Exception:
-    ToastNotifier = None
-
-try:
-    import psutil as _psutil
-    psutil = _psutil
-except Exception:
-    psutil = None
+import importlib
+import importlib.util
+import threading
+import time
+
+
+class LazyModule:
+    """
+    Stand-in for an optional module (or one attribute of it, e.g. a
+    class) that is imported the first time it is used.
+    """
+    def __init__(self, module, attr=None):
+        self._module = module
+        self._attr = attr
+        self._target = None
+        self._failed = False
+        self._installed = None
+        self._lock = threading.Lock()
+
+    # underscore names so they cannot shadow attributes of the real module
+    def _is_installed(self):
+        if self._installed is None:
+            try:
+                self._installed = importlib.util.find_spec(self._module) is not None
+            except Exception:
+                self._installed = False
+        return self._installed
+
+    def _load(self):
+        """Import now (once); returns the module/attribute or None."""
+        if self._target is not None or self._failed:
+            return self._target
+        with self._lock:
+            if self._target is None and not self._failed:
+                t0 = time.perf_counter()
+                try:
+                    target = importlib.import_module(self._module)
+                    if self._attr:
+                        target = getattr(target, self._attr)
+                    self._target = target
+                except Exception:
+                    self._failed = True
+                LOAD_TIMES.append((self._module, time.perf_counter() - t0, threading.current_thread().name))
+        return self._target
+
+    def __bool__(self):
+        if self._target is not None:
+            return True
+        return not self._failed and self._is_installed()
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        target = self._load()
+        if target is None:
+            raise ImportError(f"optional dependency '{self._module}' is not available")
+        return getattr(target, name)
+
+    def __call__(self, *args, **kwargs):
+        target = self._load()
+        if target is None:
+            raise ImportError(f"optional dependency '{self._module}' is not available")
+        return target(*args, **kwargs)
+
+    def __repr__(self):
+        state = 'loaded' if self._target is not None else ('missing' if not self else 'not loaded')
+        return f"<LazyModule {self._module}{'.' + self._attr if self._attr else ''} ({state})>"
+
+
+# (module, seconds, thread name) for every proxy import, in load order
+LOAD_TIMES = []
+
+pyaudio = LazyModule('pyaudio')
+sr = LazyModule('speech_recognition')
+pyttsx3 = LazyModule('pyttsx3')
+ToastNotifier = LazyModule('win10toast', 'ToastNotifier')
+psutil = LazyModule('psutil')
+webrtcvad = LazyModule('webrtcvad')
+np = LazyModule('numpy')
+
+PYAUDIO_AVAILABLE = pyaudio._is_installed()
+SPEECH_RECOGNITION_AVAILABLE = sr._is_installed()
+TTS_AVAILABLE = pyttsx3._is_installed()
+TOAST_AVAILABLE = ToastNotifier._is_installed()
+
+ALL = (sr, pyaudio, np, webrtcvad, pyttsx3, ToastNotifier, psutil)
+
+
+def load(module):
+    """Import a proxy's target now; returns it, or None if unavailable."""
+    return module._load()
+
+
+def start_warmup(modules=ALL, on_done=None):
+    """Import ``modules`` on a daemon thread; on_done() runs on that thread afterwards."""
+    def _warm():
+        for module in modules:
+            if module:
+                load(module)
+        if on_done:
+            on_done()
+    thread = threading.Thread(target=_warm, name='deps-warmup', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,313 @@
+"""
+Background index of folder and file names.
+
+``go to <name>`` used to work only when the spoken name was an exact
+path under the current folder. ``DirectoryIndex`` walks a set of roots
+on its own thread and keeps every folder and file name keyed by its
+spoken form ('my_notes.txt' -> 'my notes txt'), with secondary keys by
+Soundex and leading/trailing letters for near misses. Lookups are
+dictionary probes plus a few bounded edit-distance comparisons and never
+touch the disk.
+
+The index is kept current by polling: every ``interval`` seconds each
+indexed folder is stat()ed and only folders whose mtime changed (an
+entry was added, removed or renamed) are rescanned; new subfolders are
+walked, vanished ones dropped with their subtree. ``note_changed(path)``
+rescans a folder right away after SpeakShell itself changed it.
+"""
+import os
+import threading
+import time
+from collections import namedtuple
+
+from grammar import spoken_words
+from rerank import soundex
+
+# never descended into (but still indexed by name)
+SKIP_DIRS = frozenset({
+    '.git', '.hg', '.svn', '__pycache__', 'node_modules', '.venv', 'venv',
+    '.tox', '.cache', 'site-packages', '$recycle.bin', 'system volume information',
+    'appdata', 'windows', 'program files', 'program files (x86)', 'programdata',
+})
+
+Match = namedtuple('Match', 'path is_dir score')
+
+
+def _key(name):
+    return ' '.join(spoken_words(name))
+
+
+def bounded_distance(a, b, limit):
+    """Levenshtein distance of a and b if it is at most ``limit``, else None."""
+    if abs(len(a) - len(b)) > limit:
+        return None
+    if a == b:
+        return 0
+    # only the diagonal band |i - j| <= limit can stay within the limit
+    big = limit + 1
+    prev = [j if j <= limit else big for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        ca = a[i - 1]
+        lo, hi = max(1, i - limit), min(len(b), i + limit)
+        cur = [big] * (len(b) + 1)
+        cur[0] = i if i <= limit else big
+        best = cur[0]
+        for j in range(lo, hi + 1):
+            d = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != b[j - 1]))
+            cur[j] = d
+            if d < best:
+                best = d
+        if best > limit:
+            return None
+        prev = cur
+    return prev[-1] if prev[-1] <= limit else None
+
+
+class DirectoryIndex:
+    """
+    roots: folders to index. max_depth limits how far below a root the
+    walk goes and max_entries caps the total number of names kept.
+    """
+    def __init__(self, roots, max_depth=6, max_entries=200000, interval=5.0,
+                 include_hidden=False, skip=SKIP_DIRS):
+        self.roots = []
+        for root in roots:
+            root = os.path.abspath(os.path.expanduser(os.path.expandvars(root)))
+            if root not in self.roots:
+                self.roots.append(root)
+        self.max_depth = max_depth
+        self.max_entries = max_entries
+        self.interval = interval
+        self.include_hidden = include_hidden
+        self.skip = skip
+        self.ready = threading.Event()
+        self.scans = 0
+        self.build_seconds = None
+        self.truncated = False
+        # folder -> (mtime, depth, {child name: is_dir})
+        self._dirs = {}
+        # spoken key -> {path: is_dir}
+        self._by_key = {}
+        # squashed key (no spaces) -> spoken keys; Soundex / 3-letter prefix -> spoken keys
+        self._by_squashed = {}
+        self._by_sound = {}
+        self._entries = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._pending = set()
+        self._thread = None
+
+    # --- lifecycle ---
+    def start(self):
+        if self._thread is None and self.roots:
+            self._thread = threading.Thread(target=self._run, name='speakshell-dirindex', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def note_changed(self, path):
+        """Ask for ``path`` (a folder SpeakShell just modified) to be rescanned soon."""
+        with self._lock:
+            self._pending.add(os.path.abspath(path))
+        self._wake.set()
+
+    def add_root(self, root):
+        root = os.path.abspath(os.path.expanduser(root))
+        if root not in self.roots:
+            self.roots.append(root)
+            self.note_changed(root)
+
+    # --- queries (any thread, no I/O) ---
+    def __len__(self):
+        return self._entries
+
+    def names_in(self, directory):
+        """Child names of an indexed folder, or None if it is not indexed."""
+        entry = self._dirs.get(os.path.abspath(directory))
+        return None if entry is None else list(entry[2])
+
+    def lookup(self, spoken, dirs_only=False, near=None, limit=5, threshold=0.75):
+        """
+        Return up to ``limit`` Matches for a spoken name, best first.
+        Exact spoken-form matches score 1.0; others are ranked by edit
+        similarity of the names without spaces. Ties prefer paths under
+        ``near`` and then shallower paths.
+        """
+        key = _key(spoken)
+        if not key:
+            return []
+        squashed = key.replace(' ', '')
+        scored = {}
+        # the index thread mutates these sets; tuple() copies them atomically
+        for k in tuple(self._by_squashed.get(squashed, ())):
+            scored[k] = 1.0
+        if not scored:
+            candidates = set()
+            for probe in self._probes(key):
+                candidates.update(tuple(self._by_sound.get(probe, ())))
+            for k in candidates:
+                other = k.replace(' ', '')
+                longest = max(len(squashed), len(other))
+                distance = bounded_distance(squashed, other, int((1.0 - threshold) * longest))
+                if distance is not None:
+                    scored[k] = 1.0 - distance / float(longest)
+        matches = []
+        for k, score in scored.items():
+            for path, is_dir in tuple(self._by_key.get(k, {}).items()):
+                if not dirs_only or is_dir:
+                    matches.append(Match(path, is_dir, score))
+        near = os.path.abspath(near) + os.sep if near else None
+        matches.sort(key=lambda m: (-m.score,
+                                    0 if near and m.path.startswith(near) else 1,
+                                    m.path.count(os.sep), len(m.path)))
+        return matches[:limit]
+
+    def resolve(self, spoken, dirs_only=True, near=None, threshold=0.75):
+        """Best path for a spoken name, or None."""
+        found = self.lookup(spoken, dirs_only=dirs_only, near=near, limit=1, threshold=threshold)
+        return found[0].path if found else None
+
+    @staticmethod
+    def _probes(key):
+        # sound-alike names and names sharing the first letters or the
+        # last letters (catches a misheard first sound: 'fotos'/'photos')
+        squashed = key.replace(' ', '')
+        return {'s:' + soundex(squashed), 'p:' + squashed[:3], 'e:' + squashed[-4:]}
+
+    # --- index thread ---
+    def _run(self):
+        started = time.perf_counter()
+        for root in list(self.roots):
+            if self._stop.is_set():
+                return
+            self._walk(root, 0)
+        self.build_seconds = time.perf_counter() - started
+        self.ready.set()
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            with self._lock:
+                pending, self._pending = self._pending, set()
+            for path in pending:
+                if path in self._dirs or path in self.roots:
+                    self._rescan(path)
+            self.refresh()
+
+    def refresh(self):
+        """Rescan folders whose mtime changed since they were indexed."""
+        for path, (mtime, depth, _) in list(self._dirs.items()):
+            if self._stop.is_set():
+                return
+            try:
+                current = os.stat(path).st_mtime
+            except OSError:
+                self._drop(path)
+                continue
+            if current != mtime:
+                self._rescan(path)
+        self.scans += 1
+
+    def _rescan(self, path):
+        entry = self._dirs.get(path)
+        if entry is None:
+            if path in self.roots:
+                self._walk(path, 0)
+            return
+        _, depth, old = entry
+        new = self._scan(path, depth)
+        if new is None:
+            self._drop(path)
+            return
+        for name, is_dir in old.items():
+            if new.get(name) != is_dir:
+                child = os.path.join(path, name)
+                if is_dir:
+                    self._drop(child)
+                self._remove_name(child, name)
+        for name, is_dir in new.items():
+            if old.get(name) != is_dir:
+                child = os.path.join(path, name)
+                self._add_name(child, name, is_dir)
+                if is_dir and self._descend(name, depth + 1):
+                    self._walk(child, depth + 1)
+
+    def _walk(self, top, depth):
+        stack = [(top, depth)]
+        while stack and not self._stop.is_set():
+            path, d = stack.pop()
+            children = self._scan(path, d)
+            if children is None:
+                continue
+            for name, is_dir in children.items():
+                self._add_name(os.path.join(path, name), name, is_dir)
+                if is_dir and self._descend(name, d + 1):
+                    stack.append((os.path.join(path, name), d + 1))
+
+    def _scan(self, path, depth):
+        """List ``path`` and record it as indexed; returns {name: is_dir} or None."""
+        try:
+            mtime = os.stat(path).st_mtime
+            children = {}
+            with os.scandir(path) as it:
+                for entry in it:
+                    if not self.include_hidden and entry.name.startswith('.'):
+                        continue
+                    try:
+                        children[entry.name] = entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        continue
+        except OSError:
+            return None
+        self._dirs[path] = (mtime, depth, children)
+        return children
+
+    def _descend(self, name, depth):
+        return depth <= self.max_depth and name.lower() not in self.skip
+
+    def _add_name(self, path, name, is_dir):
+        key = _key(name)
+        if not key:
+            return
+        paths = self._by_key.get(key)
+        if paths is None:
+            if self._entries >= self.max_entries:
+                self.truncated = True
+                return
+            paths = self._by_key[key] = {}
+            self._by_squashed.setdefault(key.replace(' ', ''), set()).add(key)
+            for probe in self._probes(key):
+                self._by_sound.setdefault(probe, set()).add(key)
+        if path not in paths:
+            self._entries += 1
+        paths[path] = is_dir
+
+    def _remove_name(self, path, name):
+        key = _key(name)
+        paths = self._by_key.get(key)
+        if paths is None or paths.pop(path, None) is None:
+            return
+        self._entries -= 1
+        if not paths:
+            del self._by_key[key]
+            squashed = key.replace(' ', '')
+            self._by_squashed.get(squashed, set()).discard(key)
+            if not self._by_squashed.get(squashed):
+                self._by_squashed.pop(squashed, None)
+            for probe in self._probes(key):
+                self._by_sound.get(probe, set()).discard(key)
+
+    def _drop(self, path):
+        """Forget an indexed folder and everything below it."""
+        prefix = path + os.sep
+        for d in [d for d in self._dirs if d == path or d.startswith(prefix)]:
+            entry = self._dirs.pop(d, None)
+            if entry is None:
+                continue
+            for name in entry[2]:
+                self._remove_name(os.path.join(d, name), name)
@@ -0,0 +1,292 @@
+"""
+Pluggable speech-recognition backends.
+
+A backend wraps one recognition engine behind a small interface:
+capability flags, ``warm_up``/``shutdown``, batch ``recognize`` (and
+``recognize_nbest`` for alternative transcripts) and, for
+streaming engines, ``start_stream`` which accepts PCM as it is captured
+and reports partial hypotheses while the user is still speaking.
+
+Backends register themselves with ``@register``; availability is checked
+with ``importlib.util.find_spec`` so nothing heavy is imported just to
+fill the engine dropdown.
+"""
+import importlib.util
+import os
+
+_REGISTRY = {}
+
+
+class RecognitionError(Exception):
+    """The engine failed or is unreachable (network, missing model, ...)."""
+
+
+def register(cls):
+    _REGISTRY[cls.name] = cls
+    return cls
+
+
+def backend_names():
+    return list(_REGISTRY)
+
+
+def available_backends():
+    """Names of registered backends whose dependencies are installed."""
+    return [name for name, cls in _REGISTRY.items() if cls.available()]
+
+
+def get_backend_class(name):
+    return _REGISTRY.get(name)
+
+
+def create(name, **kwargs):
+    cls = _REGISTRY.get(name)
+    if cls is None:
+        raise KeyError(f"Unknown recognition engine: {name}")
+    return cls(**kwargs)
+
+
+def _have(*modules):
+    try:
+        return all(importlib.util.find_spec(m) is not None for m in modules)
+    except Exception:
+        return False
+
+
+class RecognizerBackend:
+    name = ''
+    offline = False       # works without network access
+    streaming = False     # supports start_stream()
+    partial_results = False
+    sample_rate = 16000
+
+    def __init__(self, language='en-US'):
+        self.language = language
+
+    @classmethod
+    def available(cls):
+        return False
+
+    def warm_up(self):
+        """Load models / open sessions ahead of the first phrase."""
+
+    def shutdown(self):
+        """Release whatever warm_up acquired."""
+
+    def recognize(self, audio):
+        """Decode an sr.AudioData. Returns text, or None if nothing was understood."""
+        raise NotImplementedError
+
+    def recognize_nbest(self, audio, n=5):
+        """
+        Up to ``n`` alternative transcripts as [(text, confidence), ...],
+        best first; confidence is None when the engine does not report one.
+        """
+        text = self.recognize(audio)
+        return [(text, None)] if text else []
+
+    def start_stream(self, on_partial=None):
+        """Begin an utterance; returns an object with feed(pcm) and finish() -> text or None."""
+        raise NotImplementedError(f"{self.name} does not stream")
+
+
+@register
+class GoogleBackend(RecognizerBackend):
+    name = 'google'
+
+    @classmethod
+    def available(cls):
+        return _have('speech_recognition')
+
+    def warm_up(self):
+        import speech_recognition as sr
+        self._recognizer = sr.Recognizer()
+
+    def recognize(self, audio):
+        import speech_recognition as sr
+        if getattr(self, '_recognizer', None) is None:
+            self.warm_up()
+        try:
+            return self._recognizer.recognize_google(audio, language=self.language, show_all=False) or None
+        except sr.UnknownValueError:
+            return None
+        except sr.RequestError as e:
+            raise RecognitionError(f"Google API error - {e}")
+
+    def recognize_nbest(self, audio, n=5):
+        import speech_recognition as sr
+        if getattr(self, '_recognizer', None) is None:
+            self.warm_up()
+        try:
+            result = self._recognizer.recognize_google(audio, language=self.language, show_all=True)
+        except sr.UnknownValueError:
+            return []
+        except sr.RequestError as e:
+            raise RecognitionError(f"Google API error - {e}")
+        alternatives = result.get('alternative', []) if isinstance(result, dict) else []
+        return [(a['transcript'], a.get('confidence')) for a in alternatives[:n] if a.get('transcript')]
+
+
+@register
+class SphinxBackend(RecognizerBackend):
+    """SpeechRecognition's batch pocketsphinx path, optionally limited to a JSGF grammar."""
+    name = 'sphinx'
+    offline = True
+
+    def __init__(self, language='en-US', grammar=None):
+        super().__init__(language)
+        # optional JSGF file restricting the search (see grammar.py)
+        self.grammar = grammar
+
+    @classmethod
+    def available(cls):
+        return _have('speech_recognition', 'pocketsphinx')
+
+    def warm_up(self):
+        import speech_recognition as sr
+        self._recognizer = sr.Recognizer()
+
+    def recognize(self, audio):
+        import speech_recognition as sr
+        if getattr(self, '_recognizer', None) is None:
+            self.warm_up()
+        try:
+            if self.grammar:
+                return self._recognizer.recognize_sphinx(audio, grammar=self.grammar) or None
+            return self._recognizer.recognize_sphinx(audio) or None
+        except sr.UnknownValueError:
+            return None
+        except sr.RequestError as e:
+            raise RecognitionError(f"Sphinx error - {e}")
+
+    def recognize_nbest(self, audio, n=5):
+        import speech_recognition as sr
+        if getattr(self, '_recognizer', None) is None:
+            self.warm_up()
+        kwargs = {'grammar': self.grammar} if self.grammar else {}
+        try:
+            decoder = self._recognizer.recognize_sphinx(audio, show_all=True, **kwargs)
+        except sr.UnknownValueError:
+            return []
+        except sr.RequestError as e:
+            raise RecognitionError(f"Sphinx error - {e}")
+        return decoder_nbest(decoder, n)
+
+
+def make_pocketsphinx_decoder(sample_rate=16000, **options):
+    """
+    Build a pocketsphinx Decoder with the bundled en-US model. Supports
+    both the 5.x keyword API and the older 0.1.x Config API. ``options``
+    are decoder settings without the leading dash (e.g. jsgf=path).
+    """
+    import pocketsphinx
+    try:
+        return pocketsphinx.Decoder(samprate=sample_rate, logfn=os.devnull, **options)
+    except TypeError:
+        pass
+    from pocketsphinx.pocketsphinx import Decoder
+    model = pocketsphinx.get_model_path()
+    config = Decoder.default_config()
+    config.set_string('-hmm', os.path.join(model, 'en-us'))
+    config.set_string('-dict', os.path.join(model, 'cmudict-en-us.dict'))
+    if not any(k in options for k in ('jsgf', 'kws', 'keyphrase', 'lm')):
+        config.set_string('-lm', os.path.join(model, 'en-us.lm.bin'))
+    config.set_string('-logfn', os.devnull)
+    config.set_float('-samprate', float(sample_rate))
+    for key, value in options.items():
+        if isinstance(value, float):
+            config.set_float(f'-{key}', value)
+        else:
+            config.set_string(f'-{key}', str(value))
+    return Decoder(config)
+
+
+def decoder_nbest(decoder, n=5):
+    """[(text, None), ...] from a pocketsphinx decoder after end_utt(), best first."""
+    texts = []
+    hyp = decoder.hyp()
+    if hyp is not None and hyp.hypstr.strip():
+        texts.append(hyp.hypstr.strip())
+    try:
+        for item in decoder.nbest():
+            if len(texts) >= n:
+                break
+            text = (getattr(item, 'hypstr', None) or '').strip()
+            if text and text not in texts:
+                texts.append(text)
+    except Exception:
+        pass  # nbest needs an n-gram search; grammars may not support it
+    return [(t, None) for t in texts[:n]]
+
+
+class _DecoderStream:
+    def __init__(self, decoder, on_partial):
+        self.decoder = decoder
+        self.on_partial = on_partial
+        self._last = ''
+        decoder.start_utt()
+
+    def feed(self, pcm):
+        self.decoder.process_raw(pcm, False, False)
+        hyp = self.decoder.hyp()
+        text = hyp.hypstr if hyp is not None else ''
+        if text and text != self._last:
+            self._last = text
+            if self.on_partial:
+                self.on_partial(text)
+
+    def finish(self):
+        self.decoder.end_utt()
+        hyp = self.decoder.hyp()
+        text = hyp.hypstr.strip() if hyp is not None else ''
+        return text or None
+
+    def alternatives(self, n=5):
+        """N-best list for the utterance just finished."""
+        return decoder_nbest(self.decoder, n)
+
+
+@register
+class PocketSphinxStreamingBackend(RecognizerBackend):
+    """
+    Offline decoder fed frame by frame during capture, so the final result
+    is ready a few milliseconds after the end of speech.
+    """
+    name = 'sphinx-stream'
+    offline = True
+    streaming = True
+    partial_results = True
+
+    def __init__(self, language='en-US', decoder_options=None):
+        super().__init__(language)
+        self.decoder_options = dict(decoder_options or {})
+        self._decoder = None
+
+    @classmethod
+    def available(cls):
+        return _have('pocketsphinx')
+
+    def warm_up(self):
+        if self._decoder is None:
+            try:
+                self._decoder = make_pocketsphinx_decoder(self.sample_rate, **self.decoder_options)
+            except Exception as e:
+                raise RecognitionError(f"Could not load pocketsphinx model - {e}")
+
+    def shutdown(self):
+        self._decoder = None
+
+    def start_stream(self, on_partial=None):
+        self.warm_up()
+        return _DecoderStream(self._decoder, on_partial)
+
+    def recognize(self, audio):
+        stream = self.start_stream()
+        stream.feed(audio.get_raw_data(convert_rate=self.sample_rate, convert_width=2))
+        return stream.finish()
+
+    def recognize_nbest(self, audio, n=5):
+        stream = self.start_stream()
+        stream.feed(audio.get_raw_data(convert_rate=self.sample_rate, convert_width=2))
+        stream.finish()
+        return stream.alternatives(n)
@@ -0,0 +1,237 @@
+"""
+Background command executor.
+
+Commands run on a small worker pool instead of the Tk main thread. Each
+submitted command becomes a ``Job``; stdout/stderr are read line by line
+and handed to the caller's ``on_output`` callback as they arrive, and
+``on_exit`` fires once the process has finished, timed out, been
+cancelled or failed to start. Callbacks run on worker threads, so GUI
+callers should marshal them with ``root.after``.
+
+With a ``ShellSession`` (shellsession.py) shell commands run in that
+long-lived shell when it is free; commands submitted while it is busy,
+and argument-list commands, get a process of their own as before.
+
+``submit_call`` runs a Python function the same way (the in-process
+system reports of sysinfo.py), so slow work stays off the UI thread and
+still shows up in 'jobs'.
+"""
+import itertools
+import os
+import signal
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from shellsession import ShellExited
+
+
+class Job:
+    """A single submitted command and its outcome."""
+    def __init__(self, job_id, cmd, cwd, shell, timeout):
+        self.id = job_id
+        self.cmd = cmd
+        self.cwd = cwd
+        self.shell = shell
+        self.timeout = timeout
+        self.process = None
+        self.returncode = None
+        self.error = None
+        self.timed_out = False
+        self.cancelled = False
+        self.started = None
+        self.finished = None
+        # set when the command ran in the persistent session
+        self.in_session = False
+        self.final_cwd = None
+        # return value of a submit_call function
+        self.result = None
+        self.done = threading.Event()
+
+    @property
+    def running(self):
+        return not self.done.is_set()
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+    def __repr__(self):
+        state = 'running' if self.running else f'rc={self.returncode}'
+        return f"<Job {self.id} {state} {self.cmd!r}>"
+
+
+def kill_process_tree(proc):
+    """Kill a shell process together with whatever it spawned."""
+    if proc is None or proc.poll() is not None:
+        return
+    try:
+        if os.name == 'nt':
+            subprocess.run(['taskkill', '/F', '/T', '/PID', str(proc.pid)], capture_output=True)
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)
+    except Exception:
+        try:
+            proc.kill()
+        except Exception:
+            pass
+
+
+class CommandExecutor:
+    """Runs shell commands on a worker pool and streams their output."""
+    def __init__(self, max_workers=4, session=None):
+        self.session = session
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='speakshell-job')
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.jobs = {}
+
+    def submit(self, cmd, cwd=None, shell=True, timeout=60, on_output=None, on_exit=None):
+        """
+        Queue ``cmd`` and return its Job immediately.
+        on_output(job, stream, line) is called per line ('stdout'/'stderr');
+        on_exit(job) is called exactly once when the job is over.
+        """
+        job = Job(self.new_id(), cmd, cwd, shell, timeout)
+        with self._lock:
+            self.jobs[job.id] = job
+        self._pool.submit(self._run, job, on_output, on_exit)
+        return job
+
+    def submit_call(self, fn, label, on_exit=None):
+        """
+        Queue the callable ``fn`` as a Job named ``label`` and return it.
+        Its return value becomes job.result and an exception job.error;
+        on_exit(job) is called before job.done is set, so whatever it
+        queues is in place once a waiter wakes up.
+        """
+        job = Job(self.new_id(), label, None, False, None)
+        with self._lock:
+            self.jobs[job.id] = job
+        self._pool.submit(self._run_call, job, fn, on_exit)
+        return job
+
+    def new_id(self):
+        """Next job id (also handed out to other kinds of background work)."""
+        return next(self._ids)
+
+    def running_jobs(self):
+        with self._lock:
+            return [j for j in self.jobs.values() if j.running]
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self.jobs.get(job_id)
+        if job is None or not job.running:
+            return False
+        job.cancelled = True
+        kill_process_tree(job.process)
+        return True
+
+    def cancel_all(self):
+        return [j.id for j in self.running_jobs() if self.cancel(j.id)]
+
+    def shutdown(self, cancel=True):
+        if cancel:
+            self.cancel_all()
+        self._pool.shutdown(wait=False)
+        if self.session is not None:
+            self.session.close()
+
+    # --- worker side ---
+    def _run(self, job, on_output, on_exit):
+        job.started = time.time()
+        timer = None
+        session = None
+        try:
+            if job.cancelled:
+                return
+            if job.timeout:
+                timer = threading.Timer(job.timeout, self._expire, (job,))
+                timer.daemon = True
+                timer.start()
+            if (self.session is not None and job.shell and self.session.accepts(job.cmd)
+                    and self.session.acquire()):
+                session = self.session
+                job.in_session = True
+                job.returncode, job.final_cwd = session.run(
+                    job, lambda stream, line: self._emit(job, on_output, stream, line))
+                return
+            kwargs = {}
+            if os.name == 'nt':
+                kwargs['creationflags'] = getattr(subprocess, 'CREATE_NEW_PROCESS_GROUP', 0)
+            else:
+                kwargs['start_new_session'] = True
+            job.process = subprocess.Popen(
+                job.cmd, shell=job.shell, cwd=job.cwd,
+                stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                text=True, errors='replace', bufsize=1, **kwargs
+            )
+            if job.cancelled or job.timed_out:
+                kill_process_tree(job.process)
+            err_reader = threading.Thread(target=self._pump, args=(job, job.process.stderr, 'stderr', on_output), daemon=True)
+            err_reader.start()
+            self._pump(job, job.process.stdout, 'stdout', on_output)
+            err_reader.join()
+            job.returncode = job.process.wait()
+        except ShellExited as e:
+            # a cancel or timeout kills the session's shell on purpose
+            if not (job.cancelled or job.timed_out):
+                job.error = e
+        except Exception as e:
+            job.error = e
+        finally:
+            if timer is not None:
+                timer.cancel()
+            if session is not None:
+                session.release()
+            job.finished = time.time()
+            job.done.set()
+            if on_exit:
+                try:
+                    on_exit(job)
+                except Exception:
+                    pass
+
+    def _run_call(self, job, fn, on_exit):
+        job.started = time.time()
+        try:
+            # a cancelled call still finishes; its result is ignored
+            if not job.cancelled:
+                job.result = fn()
+                job.returncode = 0
+        except Exception as e:
+            job.error = e
+        finally:
+            job.finished = time.time()
+            if on_exit:
+                try:
+                    on_exit(job)
+                except Exception:
+                    pass
+            job.done.set()
+
+    def _expire(self, job):
+        if job.running:
+            job.timed_out = True
+            kill_process_tree(job.process)
+
+    @staticmethod
+    def _emit(job, on_output, stream, line):
+        if on_output:
+            try:
+                on_output(job, stream, line)
+            except Exception:
+                pass
+
+    def _pump(self, job, pipe, stream, on_output):
+        try:
+            for line in iter(pipe.readline, ''):
+                self._emit(job, on_output, stream, line.rstrip('\r\n'))
+        except Exception:
+            pass
+        finally:
+            try:
+                pipe.close()
+            except Exception:
+                pass
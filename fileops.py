@@ -0,0 +1,351 @@
+"""
+Background file operations: copy and move with progress and cancellation.
+
+``copy`` and ``move`` used to run shutil.copytree / os.replace on the UI
+thread, freezing the window for the whole copy. ``FileOpEngine`` runs
+each operation on its own coordinator thread: it scans the source to
+learn the total size, creates the folder structure, then copies the files
+on a shared worker pool so folders with many files are copied in
+parallel. Files are copied in chunks; between chunks the operation
+updates its byte counters (throughput and ETA come from them) and checks
+for cancellation. Each file is written to a ``.<name>.<id>.part`` file in
+its destination folder and moved over the target with os.replace once it
+is complete, so an existing file is never left half overwritten. A
+cancelled copy removes the part file it was writing and, if it created
+the destination, the destination itself.
+
+Copying a file onto itself, or a folder into itself, is refused before
+anything is opened. Symbolic links inside a folder are recreated as
+links (as ``shutil.move`` does); a link that cannot be created is
+reported, and a move that skipped anything keeps its source.
+
+Fast paths: a move on the same device is a single os.replace; on Linux
+file data is copied in the kernel with os.copy_file_range, falling back
+to os.sendfile and then to a plain read/write loop.
+"""
+import errno
+import itertools
+import os
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+
+from sysinfo import fmt_bytes, fmt_duration
+
+CHUNK = 8 * 1024 * 1024
+
+_FAST = []
+if sys.platform.startswith('linux'):
+    if hasattr(os, 'copy_file_range'):
+        _FAST.append('copy_file_range')
+    if hasattr(os, 'sendfile'):
+        _FAST.append('sendfile')
+
+
+class Cancelled(Exception):
+    pass
+
+
+class FileOp:
+    """One copy or move and its progress."""
+    def __init__(self, op_id, kind, src, dst):
+        self.id = op_id
+        self.kind = kind
+        self.src = src
+        self.dst = dst
+        self.total_bytes = 0
+        self.done_bytes = 0
+        self.total_files = 0
+        self.done_files = 0
+        self.fast_path = None
+        self.links = 0
+        self.skipped = []     # (path, reason) of entries that were not copied
+        self.error = None
+        self.cancelled = False
+        self.started = None
+        self.finished = None
+        self.done = threading.Event()
+        self._abort = False   # another file of this operation failed
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return not self.done.is_set()
+
+    @property
+    def ok(self):
+        return self.done.is_set() and not self.cancelled and self.error is None
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+    def _advance(self, nbytes=0, files=0):
+        with self._lock:
+            self.done_bytes += nbytes
+            self.done_files += files
+
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    def throughput(self):
+        """Bytes per second so far."""
+        elapsed = self.elapsed()
+        return self.done_bytes / elapsed if elapsed > 0 else 0.0
+
+    def eta(self):
+        rate = self.throughput()
+        if rate <= 0 or not self.total_bytes:
+            return None
+        return max(0.0, (self.total_bytes - self.done_bytes) / rate)
+
+    def percent(self):
+        if self.total_bytes:
+            return 100.0 * self.done_bytes / self.total_bytes
+        return 100.0 * self.done_files / self.total_files if self.total_files else (100.0 if self.done.is_set() else 0.0)
+
+    def describe(self):
+        """One-line progress for the status bar and 'jobs'."""
+        text = (f"{self.kind} {os.path.basename(self.src)}: {self.percent():.0f}% "
+                f"({fmt_bytes(self.done_bytes)} of {fmt_bytes(self.total_bytes)}, "
+                f"{self.done_files}/{self.total_files} files, {fmt_bytes(self.throughput())}/s")
+        eta = self.eta()
+        if self.running and eta is not None:
+            text += f", {int(eta)}s left" if eta < 60 else f", {fmt_duration(eta)} left"
+        return text + ')'
+
+    def __repr__(self):
+        state = 'running' if self.running else ('ok' if self.ok else 'failed')
+        return f"<FileOp {self.id} {self.kind} {state} {self.src!r} -> {self.dst!r}>"
+
+
+class FileOpEngine:
+    """
+    Runs FileOps in the background. ``new_id`` supplies operation ids (the
+    shell shares them with command jobs so 'cancel <id>' covers both).
+    """
+    def __init__(self, max_workers=4, new_id=None, progress_interval=0.5, chunk=CHUNK):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='speakshell-fileop')
+        self._new_id = new_id or itertools.count(1).__next__
+        self.progress_interval = progress_interval
+        self.chunk = chunk
+        self._lock = threading.Lock()
+        self.ops = {}
+
+    def submit(self, kind, src, dst, on_progress=None, on_exit=None):
+        """
+        Start copying or moving ``src`` to ``dst`` and return the FileOp.
+        If dst is an existing folder, src goes inside it. on_progress(op)
+        is called every progress_interval seconds while it runs and
+        on_exit(op) once at the end, both on the operation's thread.
+        """
+        if kind not in ('copy', 'move'):
+            raise ValueError(f"unknown file operation {kind!r}")
+        if os.path.isdir(dst) and not os.path.isdir(src):
+            dst = os.path.join(dst, os.path.basename(src))
+        self._check_paths(kind, src, dst)
+        op = FileOp(self._new_id(), kind, src, dst)
+        with self._lock:
+            self.ops[op.id] = op
+        threading.Thread(target=self._run, args=(op, on_progress, on_exit),
+                         name=f'speakshell-fileop-{op.id}', daemon=True).start()
+        return op
+
+    @staticmethod
+    def _check_paths(kind, src, dst):
+        """Refuse operations that would overwrite their own source."""
+        if os.path.exists(dst) and os.path.samefile(src, dst):
+            if kind == 'move' and os.path.normcase(os.path.abspath(src)) == os.path.normcase(os.path.abspath(dst)) \
+                    and os.path.abspath(src) != os.path.abspath(dst):
+                return   # case-only rename on a case-insensitive file system
+            raise shutil.SameFileError(f"'{src}' and '{dst}' are the same file")
+        if os.path.isdir(src) and not os.path.islink(src):
+            real_src = os.path.realpath(src)
+            real_dst = os.path.realpath(dst)
+            if real_dst == real_src or real_dst.startswith(real_src.rstrip(os.sep) + os.sep):
+                raise shutil.Error(f"cannot {kind} '{src}' into itself ('{dst}')")
+
+    def running(self):
+        with self._lock:
+            return [op for op in self.ops.values() if op.running]
+
+    def cancel(self, op_id):
+        with self._lock:
+            op = self.ops.get(op_id)
+        if op is None or not op.running:
+            return False
+        op.cancelled = True
+        return True
+
+    def cancel_all(self):
+        return [op.id for op in self.running() if self.cancel(op.id)]
+
+    def shutdown(self, cancel=True):
+        if cancel:
+            self.cancel_all()
+        self._pool.shutdown(wait=False)
+
+    # --- coordinator thread ---
+    def _run(self, op, on_progress, on_exit):
+        op.started = time.perf_counter()
+        try:
+            if op.kind == 'move' and self._rename(op):
+                return
+            self._copy_tree(op, on_progress)
+            if op.kind == 'move' and op.skipped:
+                raise shutil.Error(f"{len(op.skipped)} entries could not be copied "
+                                   f"(first: {op.skipped[0][0]}: {op.skipped[0][1]}); source kept")
+            if op.kind == 'move':
+                if os.path.isdir(op.src) and not os.path.islink(op.src):
+                    shutil.rmtree(op.src)
+                else:
+                    os.remove(op.src)
+        except Cancelled:
+            op.cancelled = True
+        except Exception as e:
+            op.error = e
+        finally:
+            op.finished = time.perf_counter()
+            op.done.set()
+            if on_exit:
+                try:
+                    on_exit(op)
+                except Exception:
+                    pass
+
+    def _rename(self, op):
+        """Same-device move: one os.replace. Returns False if a copy is needed."""
+        if os.path.isdir(op.src) and os.path.isdir(op.dst):
+            return False   # merging into an existing folder needs a copy
+        try:
+            os.replace(op.src, op.dst)
+        except OSError as e:
+            if e.errno in (errno.EXDEV, errno.ENOTEMPTY, errno.EEXIST, errno.EACCES, errno.EPERM):
+                return False
+            raise
+        op.fast_path = 'rename'
+        op.total_files = op.done_files = 1
+        return True
+
+    def _copy_tree(self, op, on_progress):
+        files = []   # (src, dst, size)
+        created_dst = not os.path.exists(op.dst)
+        if os.path.isdir(op.src):
+            for root, dirs, names in os.walk(op.src):
+                if op.cancelled:
+                    raise Cancelled()
+                target = os.path.join(op.dst, os.path.relpath(root, op.src))
+                os.makedirs(target, exist_ok=True)
+                # os.walk does not descend into linked folders: copy every link as a link
+                for name in [n for n in dirs if os.path.islink(os.path.join(root, n))] + \
+                        [n for n in names if os.path.islink(os.path.join(root, n))]:
+                    self._copy_link(op, os.path.join(root, name), os.path.join(target, name))
+                for name in names:
+                    path = os.path.join(root, name)
+                    if os.path.islink(path):
+                        continue
+                    try:
+                        size = os.path.getsize(path)
+                    except OSError:
+                        size = 0
+                    files.append((path, os.path.join(target, name), size))
+        else:
+            parent = os.path.dirname(op.dst)
+            if parent:
+                os.makedirs(parent, exist_ok=True)
+            files.append((op.src, op.dst, os.path.getsize(op.src)))
+        op.total_files = len(files)
+        op.total_bytes = sum(size for _, _, size in files)
+
+        # biggest first so one large file does not start last
+        files.sort(key=lambda f: -f[2])
+        futures = [self._pool.submit(self._copy_file, op, src, dst) for src, dst, _ in files]
+        try:
+            pending = set(futures)
+            while pending:
+                finished, pending = wait(pending, timeout=self.progress_interval, return_when=FIRST_EXCEPTION)
+                for f in finished:
+                    f.result()   # re-raise the first failure
+                if pending and on_progress:
+                    on_progress(op)
+        except BaseException:
+            # stop the copies still running, then clean up
+            op._abort = True
+            for f in futures:
+                f.cancel()
+            wait(futures)
+            if created_dst:
+                if os.path.isdir(op.dst):
+                    shutil.rmtree(op.dst, ignore_errors=True)
+                elif os.path.exists(op.dst):
+                    os.remove(op.dst)
+            raise
+
+    def _copy_link(self, op, src, dst):
+        try:
+            if os.path.lexists(dst):
+                os.remove(dst)
+            os.symlink(os.readlink(src), dst, target_is_directory=os.path.isdir(src))
+        except OSError as e:
+            op.skipped.append((src, e.strerror or str(e)))
+            return
+        op.links += 1
+
+    def _copy_file(self, op, src, dst):
+        if op.cancelled or op._abort:
+            raise Cancelled()
+        # write next to dst and swap it in when complete, so a file being
+        # overwritten survives a cancelled or failed copy
+        head, name = os.path.split(dst)
+        part = os.path.join(head, f".{name}.{op.id}.part")
+        try:
+            with open(src, 'rb') as fsrc, open(part, 'wb') as fdst:
+                self._copy_data(op, fsrc, fdst)
+            shutil.copystat(src, part)
+            os.replace(part, dst)
+        except BaseException:
+            try:
+                os.remove(part)
+            except OSError:
+                pass
+            raise
+        op._advance(files=1)
+
+    def _copy_data(self, op, fsrc, fdst):
+        in_fd, out_fd = fsrc.fileno(), fdst.fileno()
+        pos = 0
+        for method in _FAST:
+            try:
+                while True:
+                    if op.cancelled or op._abort:
+                        raise Cancelled()
+                    if method == 'copy_file_range':
+                        n = os.copy_file_range(in_fd, out_fd, self.chunk, pos, pos)
+                    else:
+                        os.lseek(out_fd, pos, os.SEEK_SET)
+                        n = os.sendfile(out_fd, in_fd, pos, self.chunk)
+                    if not n:
+                        op.fast_path = op.fast_path or method
+                        return
+                    pos += n
+                    op._advance(n)
+            except OSError as e:
+                # not supported for this pair of files: try the next method from pos
+                if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP,
+                                   errno.EBADF, errno.ENOTSUP, errno.EPERM):
+                    raise
+        fsrc.seek(pos)
+        fdst.seek(pos)
+        buf = bytearray(min(self.chunk, 1024 * 1024))
+        view = memoryview(buf)
+        while True:
+            if op.cancelled or op._abort:
+                raise Cancelled()
+            n = fsrc.readinto(buf)
+            if not n:
+                return
+            fdst.write(view[:n])
+            op._advance(n)
@@ -0,0 +1,163 @@
+"""
+Decoder grammars generated from the command table.
+
+SpeakShell understands a closed set of phrases, so offline decoding can
+be constrained to them instead of searching a full open-vocabulary
+language model. ``CommandGrammar`` writes a JSGF grammar (phrases plus
+<name> slots for parameters) and a pocketsphinx keyword list, and only
+rewrites them when the commands or the slot vocabulary change.
+
+SpeechRecognition's ``recognize_sphinx(grammar=path)`` compiles the rule
+``<stem>.<stem>`` of ``<stem>.jsgf`` into ``<stem>.fsg`` next to it and
+reuses that file while it exists, so the public rule is named after the
+file and the .fsg is deleted whenever the grammar is rewritten.
+"""
+import hashlib
+import os
+import re
+
+from intents import COMMANDS, PAIR, TAIL
+
+_WORD_RE = re.compile(r"[a-z][a-z']*")
+
+# Always available inside <name> slots: spelling helpers and small numbers
+SLOT_BASE_WORDS = (
+    'dot', 'dash', 'underscore', 'text', 'python', 'backup', 'new', 'old', 'my', 'test',
+    'one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine', 'ten',
+)
+
+
+def load_vocabulary(dict_path=None):
+    """
+    Words the decoder can pronounce. Defaults to pocketsphinx's bundled
+    cmudict; returns None (no filtering) when no dictionary is found.
+    """
+    if dict_path is None:
+        try:
+            import pocketsphinx
+            dict_path = os.path.join(pocketsphinx.get_model_path(), 'cmudict-en-us.dict')
+        except Exception:
+            return None
+    words = set()
+    try:
+        with open(dict_path, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                head = line.split(' ', 1)[0]
+                words.add(head.split('(', 1)[0].lower())
+    except OSError:
+        return None
+    return words
+
+
+def spoken_words(name):
+    """Split a file/folder name into words a user would say ('my_notes.txt' -> my, notes, txt)."""
+    return _WORD_RE.findall(name.lower())
+
+
+def _speakable(phrase, vocabulary):
+    words = phrase.split()
+    return all(_WORD_RE.fullmatch(w) for w in words) and (vocabulary is None or all(w in vocabulary for w in words))
+
+
+def grammar_entries(commands=None, vocabulary=None):
+    """Yield (phrase, slots) for every speakable phrase in the table."""
+    seen = set()
+    for it in (COMMANDS if commands is None else commands):
+        for phrase in it.phrases:
+            key = (phrase, it.slots)
+            if key in seen or not _speakable(phrase, vocabulary):
+                continue
+            seen.add(key)
+            yield phrase, it.slots
+
+
+def build_jsgf(commands=None, slot_words=(), vocabulary=None, name='commands'):
+    """JSGF text for grammar ``name`` whose public rule <name> lists every phrase."""
+    words = sorted({w for w in list(SLOT_BASE_WORDS) + list(slot_words)
+                    if _WORD_RE.fullmatch(w) and (vocabulary is None or w in vocabulary)})
+    alternatives = []
+    for phrase, slots in grammar_entries(commands, vocabulary):
+        if slots == TAIL and words:
+            alternatives.append(f'{phrase} <name>')
+        elif slots == PAIR and words:
+            alternatives.append(f'{phrase} <name> to <name>')
+        elif slots is None:
+            alternatives.append(phrase)
+    lines = [
+        '#JSGF V1.0;',
+        f'grammar {name};',
+        f'public <{name}> = ' + '\n    | '.join(alternatives) + ';',
+    ]
+    if words:
+        lines.append('<name> = <word>+;')
+        lines.append('<word> = ' + ' | '.join(words) + ';')
+    return '\n'.join(lines) + '\n'
+
+
+def build_keyword_list(commands=None, vocabulary=None, threshold='1e-20'):
+    """pocketsphinx keyword-spotting list: one trigger phrase per line."""
+    phrases = sorted({p for p, _ in grammar_entries(commands, vocabulary)})
+    return ''.join(f'{p} /{threshold}/\n' for p in phrases)
+
+
+class CommandGrammar:
+    """Keeps generated grammar files in ``directory`` in step with the table."""
+    def __init__(self, directory, commands=None, vocabulary=None):
+        self.directory = directory
+        self.commands = COMMANDS if commands is None else commands
+        self._vocabulary = vocabulary
+        self._vocabulary_loaded = vocabulary is not None
+        self.slot_words = set()
+        self.jsgf_path = os.path.join(directory, 'commands.jsgf')
+        self.kws_path = os.path.join(directory, 'commands.kws')
+        # compiled from the JSGF by SpeechRecognition on first use
+        self.fsg_path = os.path.join(directory, 'commands.fsg')
+        self._fingerprint = None
+        self.builds = 0
+
+    @property
+    def vocabulary(self):
+        if not self._vocabulary_loaded:
+            self._vocabulary = load_vocabulary()
+            self._vocabulary_loaded = True
+        return self._vocabulary
+
+    def set_commands(self, commands):
+        self.commands = commands
+
+    def set_slot_names(self, names):
+        """Use these file/folder names as the vocabulary of <name> slots."""
+        words = set()
+        for n in names:
+            words.update(spoken_words(n))
+        self.slot_words = words
+
+    def ensure(self):
+        """Write the grammar files if anything changed; returns the JSGF path."""
+        name = os.path.splitext(os.path.basename(self.jsgf_path))[0]
+        jsgf = build_jsgf(self.commands, self.slot_words, self.vocabulary, name=name)
+        kws = build_keyword_list(self.commands, self.vocabulary)
+        fingerprint = hashlib.sha1((jsgf + kws).encode('utf-8')).hexdigest()
+        if fingerprint != self._fingerprint or not os.path.exists(self.jsgf_path):
+            os.makedirs(self.directory, exist_ok=True)
+            for path, text in ((self.jsgf_path, jsgf), (self.kws_path, kws)):
+                tmp = path + '.tmp'
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    f.write(text)
+                os.replace(tmp, path)
+            try:
+                os.remove(self.fsg_path)
+            except FileNotFoundError:
+                pass
+            self._fingerprint = fingerprint
+            self.builds += 1
+        return self.jsgf_path
+
+    def decoder_options(self, engine):
+        """Backend constructor options that enable constrained decoding for ``engine``."""
+        path = self.ensure()
+        if engine == 'sphinx':
+            return {'grammar': path}
+        if engine == 'sphinx-stream':
+            return {'decoder_options': {'jsgf': path}}
+        return {}
@@ -0,0 +1,248 @@
+"""
+Headless front end: an interactive REPL and a stdin/pipe mode.
+
+Commands go through the same ShellCore logic as the GUI
+(process_command -> map_to_cmd -> run_cmd) but nothing here imports
+tkinter, so SpeakShell runs over SSH, in scripts and in CI, and starts
+without building a widget tree.
+
+    python speak_shell.py --headless                    # REPL
+    python speak_shell.py --headless --voice            # REPL plus voice loop
+    python speak_shell.py --headless -c "list files"    # one-shot
+    python speak_shell.py --headless --script steps.txt # batch (see macros.py)
+    type commands.txt | python speak_shell.py --headless
+
+Each command waits for the shell job (or macro) it started, so piped
+scripts run strictly in order; Ctrl+C cancels the running job instead of
+leaving the REPL. The exit status is 1 if any job or macro step failed.
+"""
+import argparse
+import sys
+import threading
+
+from engines import available_backends
+from shell_core import ShellCore
+from startup import PROFILE
+
+try:
+    import readline  # noqa: F401  (line editing and history for input())
+except Exception:
+    readline = None
+
+
+class HeadlessShell(ShellCore):
+    def __init__(self, voice_feedback=False, assume_yes=False, interactive=None, out=None, shared=None, lock=None):
+        self.out = out or sys.stdout
+        self.interactive = sys.stdin.isatty() if interactive is None else interactive
+        self.assume_yes = assume_yes
+        self.running = True
+        self.failures = 0
+        self.status = ''
+        # there is no event loop: callbacks from job, journal and voice
+        # threads run where they arrive, serialized by this lock (one lock
+        # for all sessions of a daemon, see daemon.py)
+        self._lock = lock or threading.RLock()
+        self._jobs_done = threading.Condition(self._lock)
+        self._open_jobs = set()
+        super().__init__(voice_feedback=voice_feedback, shared=shared)
+
+    # --- ShellCore hooks ---
+    def call_soon(self, fn, *args):
+        with self._lock:
+            fn(*args)
+
+    def print_output(self, text, newline=True):
+        with self._lock:
+            self.out.write(text + ('\n' if newline else ''))
+            self.out.flush()
+
+    def clear_output(self):
+        if self.interactive and self.out.isatty():
+            self.out.write('\x1b[2J\x1b[H')
+
+    def set_status(self, text, fg=None):
+        self.status = text
+
+    def confirm(self, title, message):
+        if self.assume_yes:
+            return True
+        if not self.interactive:
+            self.print_output(f"{title}: refused without a terminal (use --yes to allow)")
+            return False
+        try:
+            return input(f"{message} [y/N] ").strip().lower() in ('y', 'yes')
+        except EOFError:
+            return False
+
+    def quit(self):
+        self.running = False
+
+    # --- job tracking ---
+    def run_cmd(self, cmd, is_shell=True):
+        with self._lock:
+            job = super().run_cmd(cmd, is_shell=is_shell)
+            if job is not None:
+                self._open_jobs.add(job.id)
+            return job
+
+    def run_call(self, fn, label, on_done):
+        def done(job):
+            try:
+                on_done(job)
+            finally:
+                self._open_jobs.discard(job.id)
+                self._jobs_done.notify_all()
+        with self._lock:
+            job = super().run_call(fn, label, done)
+            self._open_jobs.add(job.id)
+            return job
+
+    def _on_job_exit(self, job):
+        super()._on_job_exit(job)
+        if job.cancelled or job.timed_out or job.error is not None or job.returncode != 0:
+            self.failures += 1
+        self._open_jobs.discard(job.id)
+        self._jobs_done.notify_all()
+
+    def _on_file_op_exit(self, op):
+        super()._on_file_op_exit(op)
+        if not op.ok:
+            self.failures += 1
+        self._jobs_done.notify_all()
+
+    def _busy(self):
+        return (self._open_jobs or self.fileops.running()
+                or any(run.running for run in self.macro_runs))
+
+    def _on_macro_done(self, run):
+        if not run.ok:
+            self.failures += 1
+
+    def start_macro(self, name, text):
+        run = super().start_macro(name, text)
+        if run is not None:
+            run.on_done = self._on_macro_done
+        return run
+
+    def wait_for_jobs(self):
+        """Block until every job and macro started so far has finished; Ctrl+C cancels them."""
+        try:
+            with self._jobs_done:
+                while self._busy():
+                    self._jobs_done.wait(0.2)
+        except KeyboardInterrupt:
+            self.cancel_jobs('all')
+            with self._jobs_done:
+                while self._busy():
+                    self._jobs_done.wait(0.2)
+
+    # --- front ends ---
+    def execute(self, line):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            return
+        with self._lock:
+            self.process_command(line, "manual")
+        self.wait_for_jobs()
+
+    def _setup_readline(self):
+        """Seed readline with the saved history and complete whole lines from it (Tab)."""
+        if readline is None:
+            return
+        self.history.loaded.wait(2)
+        for command in reversed(self.history.recent(1000)):
+            readline.add_history(command)
+
+        def _complete(text, state):
+            matches = self.history.complete(text) if text.strip() else []
+            return matches[state] if state < len(matches) else None
+        readline.set_completer_delims('')
+        readline.set_completer(_complete)
+        readline.parse_and_bind('tab: complete')
+
+    def repl(self):
+        self.print_output("Speak Shell (headless) - type 'help' for commands, 'exit' to quit.")
+        self._setup_readline()
+        while self.running:
+            try:
+                line = input('> ')
+            except EOFError:
+                break
+            except KeyboardInterrupt:
+                self.print_output("")
+                continue
+            self.execute(line)
+
+    def run_stream(self, stream):
+        for line in stream:
+            if not self.running:
+                break
+            self.execute(line)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog='speak_shell.py --headless',
+                                 description="Run SpeakShell without a window.")
+    ap.add_argument('-c', '--command', action='append', default=[],
+                    help="run this command and exit (repeatable)")
+    ap.add_argument('--script', metavar='FILE',
+                    help="run FILE as a batch (independent steps in parallel) and exit")
+    ap.add_argument('--voice', action='store_true', help="also listen on the microphone")
+    ap.add_argument('--engine', choices=available_backends() or None,
+                    help="recognition engine for --voice")
+    ap.add_argument('--wake-word', nargs='?', const='shell', metavar='PHRASE',
+                    help="with --voice, only decode phrases that start with PHRASE (default 'shell'; needs pocketsphinx)")
+    ap.add_argument('--wake-threshold', type=float, metavar='N',
+                    help="keyword-spotting threshold for the wake word (default: by phrase length, 1e-5 for 'shell')")
+    ap.add_argument('--speak', action='store_true', help="enable spoken feedback")
+    ap.add_argument('-y', '--yes', action='store_true', help="answer yes to confirmations")
+    ap.add_argument('--index-root', action='append', default=[], metavar='DIR',
+                    help="also index DIR for 'go to <name>' (repeatable)")
+    ap.add_argument('--metrics-dir', metavar='DIR',
+                    help="keep DIR/latency.prom and DIR/latency.jsonl up to date (see metrics.py)")
+    args = ap.parse_args(argv)
+    if args.wake_threshold is not None and not 0 <= args.wake_threshold < 1:
+        ap.error("--wake-threshold must be between 0 and 1")
+
+    shell = HeadlessShell(voice_feedback=args.speak, assume_yes=args.yes)
+    PROFILE.mark('core init')
+    for root in args.index_root:
+        shell.dir_index.add_root(root)
+    try:
+        if args.engine:
+            shell._on_engine_change(args.engine)
+        if args.wake_threshold is not None:
+            shell.set_wake_threshold(args.wake_threshold)
+        if args.wake_word:
+            shell.set_wake_word(True, args.wake_word)
+        if args.voice:
+            if not shell.voice_enabled:
+                shell.print_output("[Voice] SpeechRecognition/PyAudio not available")
+            else:
+                shell.start_listening()
+        # nothing optional is imported unless a command needs it
+        PROFILE.ready()
+        PROFILE.print_report()
+        if shell.interactive or args.voice:
+            shell.dir_index.start()
+        if args.metrics_dir:
+            shell.latency.start_export(args.metrics_dir, shell.metrics_interval)
+        if args.script:
+            shell.run_script(args.script)
+            shell.wait_for_jobs()
+        elif args.command:
+            for command in args.command:
+                shell.execute(command)
+        elif shell.interactive or args.voice:
+            shell.repl()
+        else:
+            shell.run_stream(sys.stdin)
+    finally:
+        if shell.is_listening:
+            shell.stop_listening()
+        shell.shutdown()
+    return 1 if shell.failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,6 +2,32 @@
 Small helpers and constants used by the split project.
 This keeps cosmetic/UI constants in one place for easier tweaks.
 """
+import os
+
+# Per-user data directory (journal, caches, history)
+APP_DIR = os.path.join(os.path.expanduser('~'), '.speakshell')
+LOG_DIR = os.path.join(APP_DIR, 'logs')
+TTS_CACHE_DIR = os.path.join(APP_DIR, 'tts_cache')
+GRAMMAR_DIR = os.path.join(APP_DIR, 'grammar')
+MACRO_DIR = os.path.join(APP_DIR, 'macros')
+# saved command history (history.py)
+HISTORY_DB = os.path.join(APP_DIR, 'history.sqlite3')
+# latency.prom / latency.jsonl written by metrics.py
+METRICS_DIR = os.path.join(APP_DIR, 'metrics')
+# address and token of the running daemon (daemon.py); the Unix socket
+# itself lives next to it where the platform has them
+DAEMON_INFO = os.path.join(APP_DIR, 'daemon.json')
+DAEMON_SOCKET = os.path.join(APP_DIR, 'daemon.sock')
+
+# Longest phrase recorded before it is cut off, in seconds (the "Phrase
+# limit" slider); also the phrase length benchmarks/bench_preprocess.py checks
+PHRASE_TIME_LIMIT = 7
+
+# Folders indexed in the background for "go to <name>" (dirindex.py);
+# SPEAKSHELL_INDEX_ROOTS overrides them (os.pathsep-separated)
+INDEX_ROOTS = [p for p in os.environ.get('SPEAKSHELL_INDEX_ROOTS', '').split(os.pathsep) if p] \
+    or [os.path.expanduser('~')]
+
 WELCOME_HEADER = """
 ================================================================================
                                 SPEAK SHELL
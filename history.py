@@ -0,0 +1,345 @@
+"""
+Persistent, de-duplicated command history with prefix completion.
+
+Every command is stored once in a SQLite database (``history.sqlite3`` in
+the app folder) with how often and when it was last run. The database is
+touched only by a background thread: it loads the table at start-up and
+then applies queued upserts in batches, so ``add`` never waits on the
+disk. Counts are written as increments, so commands added before the load
+finished are merged correctly.
+
+In memory the commands are kept three ways:
+
+    _keys     sorted keys; a prefix is a contiguous slice found by bisect
+    _recency  (last use, key) pairs in order, so the history list can
+              fetch any screenful of rows by index
+    _top      prefix -> best ``topk`` keys by (count, last use)
+
+A prefix matching at most CACHE_MIN commands is ranked on the spot. The
+top-k lists of the prefixes matching more are built once after loading,
+bottom-up: a prefix's list is merged from its children's lists, so the
+whole pass touches each command once. ``add`` then updates the lists of
+the new command's prefixes in place, so completion stays well under a
+millisecond with hundreds of thousands of entries.
+"""
+import bisect
+import heapq
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+_STOP = object()
+CACHE_MIN = 256
+_HIGH = '\U0010ffff'
+
+
+def normalize(command):
+    """Dedup key: case-insensitive, whitespace collapsed."""
+    return ' '.join(command.lower().split())
+
+
+class Entry:
+    __slots__ = ('command', 'count', 'last_used')
+
+    def __init__(self, command, count, last_used):
+        self.command = command
+        self.count = count
+        self.last_used = last_used
+
+    def rank(self):
+        return (self.count, self.last_used)
+
+
+class CommandHistory:
+    def __init__(self, path, max_entries=500000, topk=8, on_loaded=None, autostart=True):
+        self.path = path
+        self.max_entries = max_entries
+        self.topk = topk
+        self.on_loaded = on_loaded
+        self.loaded = threading.Event()
+        self._entries = {}
+        self._keys = []
+        self._recency = []
+        self._top = {}
+        self._added_meanwhile = None   # keys added while _precompute runs
+        self._lock = threading.RLock()
+        self._queue = queue.Queue()
+        self._thread = None
+        if autostart:
+            self.start()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._writer, name='speakshell-history', daemon=True)
+            self._thread.start()
+        return self
+
+    def __len__(self):
+        return len(self._entries)
+
+    # --- caller side ---
+    def add(self, command, when=None):
+        """Record one run of ``command``; returns its Entry."""
+        key = normalize(command)
+        if not key:
+            return None
+        when = time.time() if when is None else when
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = Entry(command.strip(), 1, when)
+                bisect.insort(self._keys, key)
+            else:
+                self._unlink_recency(key, entry)
+                entry.command = command.strip()
+                entry.count += 1
+                entry.last_used = max(entry.last_used, when)
+            bisect.insort(self._recency, (entry.last_used, key))
+            self._promote(key, entry)
+            if self._added_meanwhile is not None:
+                self._added_meanwhile.append(key)
+            evicted = self._evict()
+        self._queue.put(('add', key, entry.command, when))
+        for old in evicted:
+            self._queue.put(('delete', old))
+        return entry
+
+    def remove(self, command):
+        key = normalize(command)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return False
+            self._unlink_recency(key, entry)
+            self._drop_key(key)
+        self._queue.put(('delete', key))
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self._keys = []
+            self._recency = []
+            self._top = {}
+        self._queue.put(('clear',))
+
+    def complete(self, prefix, limit=None):
+        """Best commands starting with ``prefix`` (most used first, then most recent)."""
+        key = normalize(prefix)
+        if not key:
+            return []
+        if prefix[-1].isspace():
+            key += ' '
+        limit = limit or self.topk
+        with self._lock:
+            top = self._top.get(key)
+            if top is None:
+                lo = bisect.bisect_left(self._keys, key)
+                hi = bisect.bisect_right(self._keys, key + _HIGH, lo)
+                top = self._best(self._keys[lo:hi])
+                if hi - lo > CACHE_MIN:
+                    self._top[key] = top
+            return [self._entries[k].command for k in top[:limit]]
+
+    def rows(self, start, count):
+        """Commands ``start``..``start+count`` in most-recent-first order (for the history list)."""
+        with self._lock:
+            end = len(self._recency) - start
+            if end <= 0 or count <= 0:
+                return []
+            pairs = self._recency[max(0, end - count):end]
+            return [self._entries[key].command for _, key in reversed(pairs)]
+
+    def recent(self, count):
+        return self.rows(0, count)
+
+    def flush(self, timeout=5):
+        """Block until everything queued so far is in the database."""
+        done = threading.Event()
+        self._queue.put(('flush', done))
+        return done.wait(timeout)
+
+    def close(self, timeout=5):
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+            self._thread = None
+
+    # --- in-memory index (caller holds _lock) ---
+    def _best(self, keys):
+        entries = self._entries
+        return heapq.nlargest(self.topk, keys, key=lambda k: entries[k].rank())
+
+    def _unlink_recency(self, key, entry):
+        i = bisect.bisect_left(self._recency, (entry.last_used, key))
+        if i < len(self._recency) and self._recency[i][1] == key:
+            del self._recency[i]
+
+    def _promote(self, key, entry):
+        # the entry's rank only grew: it can enter or move up in each cached prefix list
+        rank = entry.rank()
+        entries = self._entries
+        for i in range(1, len(key) + 1):
+            top = self._top.get(key[:i])
+            if top is None:
+                continue
+            if key in top:
+                top.remove(key)
+            elif len(top) >= self.topk and entries[top[-1]].rank() >= rank:
+                continue
+            pos = 0
+            while pos < len(top) and entries[top[pos]].rank() >= rank:
+                pos += 1
+            top.insert(pos, key)
+            del top[self.topk:]
+
+    def _drop_key(self, key):
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            del self._keys[i]
+        # cached lists that held the key may now be missing their next-best entry
+        for j in range(1, len(key) + 1):
+            top = self._top.get(key[:j])
+            if top is not None and key in top:
+                del self._top[key[:j]]
+
+    def _evict(self):
+        evicted = []
+        while self.max_entries and len(self._entries) > self.max_entries:
+            _, key = self._recency.pop(0)
+            del self._entries[key]
+            self._drop_key(key)
+            evicted.append(key)
+        return evicted
+
+    def _precompute(self):
+        """Top-k lists of every prefix matching more than CACHE_MIN commands."""
+        with self._lock:
+            keys = list(self._keys)
+            entries = self._entries
+            self._added_meanwhile = []
+
+        def rank(k):
+            # runs without the lock: an entry may vanish meanwhile
+            entry = entries.get(k)
+            return entry.rank() if entry is not None else (-1, 0)
+        top = {}
+
+        def build(prefix, lo, hi):
+            # top-k of keys[lo:hi], which all start with prefix
+            if hi - lo <= CACHE_MIN:
+                return heapq.nlargest(self.topk, keys[lo:hi], key=rank)
+            n = len(prefix)
+            candidates = []
+            if keys[lo] == prefix:
+                candidates.append(prefix)
+                lo += 1
+            while lo < hi:
+                child = keys[lo][:n + 1]
+                end = bisect.bisect_right(keys, child + _HIGH, lo, hi)
+                candidates.extend(build(child, lo, end))
+                lo = end
+            best = heapq.nlargest(self.topk, candidates, key=rank)
+            if prefix:
+                top[prefix] = best
+            return best
+        build('', 0, len(keys))
+
+        with self._lock:
+            for best in top.values():
+                best[:] = [k for k in best if k in self._entries]
+            # lists cached meanwhile already include later adds
+            top.update(self._top)
+            self._top = top
+            added, self._added_meanwhile = self._added_meanwhile, None
+            for key in added:
+                if key in self._entries:
+                    self._promote(key, self._entries[key])
+
+    # --- writer thread ---
+    def _connect(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        db = sqlite3.connect(self.path)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=NORMAL')
+        db.execute('CREATE TABLE IF NOT EXISTS history ('
+                   'key TEXT PRIMARY KEY, command TEXT NOT NULL, '
+                   'count INTEGER NOT NULL, last_used REAL NOT NULL)')
+        return db
+
+    def _load(self, db):
+        rows = db.execute('SELECT key, command, count, last_used FROM history ORDER BY last_used').fetchall()
+        with self._lock:
+            merged = {key: Entry(command, count, last) for key, command, count, last in rows}
+            # commands run before the load finished are newer than anything on disk
+            for key, entry in self._entries.items():
+                old = merged.pop(key, None)
+                if old is not None:
+                    entry.count += old.count
+                merged[key] = entry
+            self._entries = merged
+            self._keys = sorted(merged)
+            self._recency = sorted((entry.last_used, key) for key, entry in merged.items())
+            self._top = {}
+            evicted = self._evict()
+        for old in evicted:
+            self._queue.put(('delete', old))
+
+    def _writer(self):
+        db = None
+        try:
+            db = self._connect()
+            self._load(db)
+        except Exception:
+            db = None   # history still works for this session, just not saved
+        self._precompute()
+        self.loaded.set()
+        if self.on_loaded:
+            try:
+                self.on_loaded()
+            except Exception:
+                pass
+        while True:
+            batch = [self._queue.get()]
+            # drain whatever else is ready so one transaction covers a burst
+            while batch[-1] is not _STOP:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            for item in batch:
+                if item is _STOP:
+                    break
+                if db is not None:
+                    try:
+                        self._apply(db, item)
+                    except sqlite3.Error:
+                        pass
+                if item[0] == 'flush':
+                    item[1].set()
+            if db is not None:
+                try:
+                    db.commit()
+                except sqlite3.Error:
+                    pass
+            if batch[-1] is _STOP:
+                if db is not None:
+                    db.close()
+                return
+
+    def _apply(self, db, item):
+        op = item[0]
+        if op == 'add':
+            _, key, command, when = item
+            db.execute('INSERT INTO history (key, command, count, last_used) VALUES (?, ?, 1, ?) '
+                       'ON CONFLICT(key) DO UPDATE SET command = excluded.command, '
+                       'count = count + 1, last_used = MAX(last_used, excluded.last_used)',
+                       (key, command, when))
+        elif op == 'delete':
+            db.execute('DELETE FROM history WHERE key = ?', (item[1],))
+        elif op == 'clear':
+            db.execute('DELETE FROM history')
+        elif op == 'flush':
+            db.commit()
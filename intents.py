@@ -0,0 +1,194 @@
+"""
+Declarative command table and compiled intent index.
+
+Every phrase SpeakShell understands is listed once in ``COMMANDS``. At
+startup the table is compiled into a token trie so an utterance is matched
+in a single left-to-right pass: the cost depends on the length of what was
+said, not on how many commands exist. Phrases match on whole words, so
+'storage' no longer fires inside 'storage_backup.txt' and 'close' no
+longer fires inside 'enclosed'.
+
+Ranking is leftmost-longest: an exact whole-utterance phrase wins, then
+the phrase that starts earliest, then the longest one at that position,
+then table order.
+"""
+import re
+from collections import namedtuple
+
+EXACT = 'exact'        # the whole utterance must equal the phrase
+PREFIX = 'prefix'      # the utterance must start with the phrase
+CONTAINS = 'contains'  # the phrase may appear anywhere (on word boundaries)
+
+# name      - intent id, also used for the default handler name
+# phrases   - trigger phrases (lower case)
+# kind      - EXACT / PREFIX / CONTAINS
+# handler   - app method name called as handler(v, match); None for static
+# command   - static (cmd, is_shell) result when handler is None
+# slots     - spoken parameters after the phrase: None, TAIL ('<name>')
+#             or PAIR ('<src> to <dst>'); used to build decoder grammars
+# parallel  - True if the command does not change shell state (cwd, files,
+#             processes); scripts may run neighbouring parallel steps concurrently
+# ttl       - seconds a result may be reused (resultcache.py); None = always run
+Intent = namedtuple('Intent', 'name phrases kind handler command slots parallel ttl')
+
+TAIL = 'tail'
+PAIR = 'pair'
+
+IntentMatch = namedtuple('IntentMatch', 'intent phrase start end param')
+IntentMatch.__doc__ = """Result of IntentIndex.match.
+
+start/end are character offsets of the trigger phrase in the matched text;
+param is the cleaned tail after the phrase (None if empty).
+"""
+
+
+def intent(name, phrases, kind=CONTAINS, handler=None, command=None, slots=None, parallel=False, ttl=None):
+    if isinstance(phrases, str):
+        phrases = [phrases]
+    return Intent(name, tuple(p.lower() for p in phrases), kind, handler, command, slots, parallel, ttl)
+
+
+COMMANDS = [
+    intent('help', 'help', EXACT, handler='_intent_help'),
+    intent('exit', ['exit', 'quit', 'close'], handler='_intent_exit'),
+
+    # Time/date
+    intent('time', ['what time is it'], EXACT, command=('time /t', True), parallel=True, ttl=5),
+    intent('time', ['what time', 'current time', 'show time'], command=('time /t', True), parallel=True, ttl=5),
+    intent('date', ['what date', 'current date', 'show date', 'what is the date'], command=('date /t', True), parallel=True, ttl=60),
+
+    # Directory navigation
+    intent('go_up', ['go up', 'cd ..', 'go back'], EXACT, handler='_intent_go_up'),
+    intent('cd', 'cd', PREFIX, handler='_intent_cd', slots=TAIL),
+    intent('go_to', 'go to', PREFIX, handler='_intent_go_to', slots=TAIL),
+    intent('go_desktop', 'go to desktop', handler='_intent_quick_jump'),
+    intent('go_downloads', 'go to downloads', handler='_intent_quick_jump'),
+    intent('go_documents', ['go to documents', 'go to docs'], handler='_intent_quick_jump'),
+
+    # File ops
+    intent('create_file', ['create file', 'make file'], handler='_intent_create_file', slots=TAIL),
+    intent('open_file', 'open file', handler='_intent_open_file', slots=TAIL, parallel=True),
+    intent('delete_file', ['delete file', 'remove file'], handler='_intent_delete_file', slots=TAIL),
+    intent('rename', 'rename', PREFIX, handler='_intent_rename', slots=PAIR),
+    intent('move', 'move', PREFIX, handler='_intent_move', slots=PAIR),
+    intent('copy', 'copy', PREFIX, handler='_intent_copy', slots=PAIR),
+
+    # Directory ops
+    intent('list_files', ['list files', 'show files', 'list directory'], command=('dir', True), parallel=True, ttl=5),
+    intent('create_directory', ['create directory', 'make folder'], handler='_intent_create_directory', slots=TAIL),
+    intent('create_directory', 'mkdir', PREFIX, handler='_intent_create_directory', slots=TAIL),
+
+    # System operations
+    intent('processes', ['show processes', 'list processes'], handler='_intent_system_report',
+           command=('tasklist', True), parallel=True, ttl=3),
+    intent('processes', 'tasklist', EXACT, handler='_intent_system_report',
+           command=('tasklist', True), parallel=True, ttl=3),
+    intent('kill_process', ['kill process', 'terminate process'], handler='_intent_kill_process', slots=TAIL),
+    intent('task_manager', 'task manager', command=('start taskmgr', True), parallel=True),
+    # answered in-process by sysinfo.py; the shell command is the fallback
+    intent('system_info', ['system information', 'system info'], handler='_intent_system_report',
+           command=('systeminfo | findstr /C:"Host Name" /C:"OS Name" /C:"System Type" /C:"Total Physical Memory"', True), parallel=True, ttl=300),
+    intent('memory', ['memory usage', 'ram usage'], handler='_intent_system_report',
+           command=('wmic OS get FreePhysicalMemory,TotalVisibleMemorySize /value', True), parallel=True, ttl=5),
+    intent('disk_space', ['disk space', 'storage'], handler='_intent_system_report',
+           command=('wmic logicaldisk get caption,freespace,size', True), parallel=True, ttl=30),
+    intent('battery', 'battery status', handler='_intent_system_report',
+           command=('wmic path Win32_Battery get EstimatedChargeRemaining,Status', True), parallel=True, ttl=30),
+    intent('network', 'network info', command=('ipconfig /all', True), parallel=True, ttl=30),
+    intent('network', 'ipconfig', EXACT, command=('ipconfig /all', True), parallel=True, ttl=30),
+
+    # Applications
+    intent('calculator', 'calculator', command=('start calc', True), parallel=True),
+    intent('calculator', 'calc', EXACT, command=('start calc', True), parallel=True),
+    intent('notepad', 'notepad', command=('start notepad', True), parallel=True),
+    intent('paint', ['paint', 'mspaint'], command=('start mspaint', True), parallel=True),
+
+    # Scripts and macros (see macros.py)
+    intent('run_script', 'run script', PREFIX, handler='_intent_run_script', slots=TAIL),
+    intent('run_macro', ['run macro', 'play macro'], PREFIX, handler='_intent_run_macro', slots=TAIL),
+    intent('record_macro', 'record macro', PREFIX, handler='_intent_record_macro', slots=TAIL),
+    intent('stop_recording', ['stop recording', 'end macro'], EXACT, handler='_intent_stop_recording'),
+    intent('list_macros', ['list macros', 'show macros'], EXACT, handler='_intent_list_macros'),
+]
+
+_TOKEN_RE = re.compile(r'\S+')
+_END = object()
+
+
+def tokenize(text):
+    """Return [(token, start, end), ...] for whitespace-separated words."""
+    return [(m.group(0), m.start(), m.end()) for m in _TOKEN_RE.finditer(text)]
+
+
+def clean_param(tail):
+    """Strip filler words from a spoken parameter ('called x dot txt' -> 'x.txt')."""
+    cleaned = tail.strip().replace('called', '').replace('named', '').strip()
+    cleaned = cleaned.replace(' dot ', '.').replace(' dot', '.').replace('dot ', '.').strip()
+    return cleaned if cleaned else None
+
+
+class IntentIndex:
+    """
+    Compiled form of a command table.
+
+    Exact phrases live in a dict; prefix and contains phrases share a trie
+    keyed by token. Each trie node stores the intents terminating there as
+    (order, kind, intent, phrase) tuples.
+    """
+    def __init__(self, commands):
+        self.commands = list(commands)
+        self._exact = {}
+        self._trie = {}
+        self.size = 0
+        for order, it in enumerate(self.commands):
+            for phrase in it.phrases:
+                self.add(order, it, phrase)
+
+    def add(self, order, it, phrase):
+        self.size += 1
+        if it.kind == EXACT:
+            key = ' '.join(phrase.split())
+            self._exact.setdefault(key, (order, it, phrase))
+            return
+        node = self._trie
+        for tok in phrase.split():
+            node = node.setdefault(tok, {})
+        node.setdefault(_END, []).append((order, it.kind, it, phrase))
+
+    def match(self, text):
+        """Return the best IntentMatch for ``text`` or None."""
+        text_l = text.lower().strip()
+        toks = tokenize(text_l)
+        if not toks:
+            return None
+
+        hit = self._exact.get(' '.join(t for t, _, _ in toks))
+        if hit is not None:
+            _, it, phrase = hit
+            return IntentMatch(it, phrase, 0, len(text_l), None)
+
+        for i in range(len(toks)):
+            node = self._trie
+            best = None
+            j = i
+            while j < len(toks):
+                node = node.get(toks[j][0])
+                if node is None:
+                    break
+                for order, kind, it, phrase in node.get(_END, ()):
+                    if kind == PREFIX and i != 0:
+                        continue
+                    # later (longer) terminals replace shorter ones;
+                    # at equal length the earliest table entry wins
+                    if best is None or best[0] < j or (best[0] == j and order < best[1]):
+                        best = (j, order, it, phrase)
+                j += 1
+            if best is not None:
+                j, _, it, phrase = best
+                start, end = toks[i][1], toks[j][2]
+                return IntentMatch(it, phrase, start, end, clean_param(text_l[end:]))
+        return None
+
+
+def compile_commands(commands=None):
+    return IntentIndex(COMMANDS if commands is None else commands)
@@ -0,0 +1,197 @@
+"""
+Append-only activity journal.
+
+Entries are JSON lines written continuously by a background thread, so
+logging never touches the disk on the caller's thread. The active file
+rotates by size or age; rotated files can be gzip-compressed and only the
+newest ``backup_count`` are kept. A bounded ``recent`` window stays in
+memory for the UI.
+"""
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+_STOP = object()
+
+
+class ActivityJournal:
+    def __init__(self, directory, name='activity', max_bytes=1024 * 1024, max_age=24 * 3600,
+                 backup_count=10, compress=True, recent=500):
+        self.directory = directory
+        self.name = name
+        self.path = os.path.join(directory, f'{name}.jsonl')
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.backup_count = backup_count
+        self.compress = compress
+        self.recent = deque(maxlen=recent)
+        self._queue = queue.Queue()
+        self._fh = None
+        self._opened_at = None
+        self._thread = threading.Thread(target=self._writer, name='speakshell-journal', daemon=True)
+        self._thread.start()
+
+    # --- caller side ---
+    def log(self, activity_type, message):
+        entry = {
+            'ts': datetime.now().isoformat(timespec='seconds'),
+            'type': activity_type,
+            'message': message,
+        }
+        self.recent.append(entry)
+        self._queue.put(entry)
+        return entry
+
+    def flush(self, timeout=5):
+        """Block until everything queued so far is on disk."""
+        done = threading.Event()
+        self._queue.put(('flush', done))
+        return done.wait(timeout)
+
+    def snapshot(self, dest, callback=None):
+        """
+        Copy the journal to ``dest`` once all entries queued so far are
+        written. Runs on the writer thread; callback(dest, error) follows.
+        """
+        self._queue.put(('snapshot', dest, callback))
+
+    def close(self, timeout=5):
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    # --- writer thread ---
+    def _writer(self):
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            # drain whatever else is ready so one flush covers a burst
+            while item is not _STOP and not isinstance(item, tuple):
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+            for it in batch:
+                if it is _STOP:
+                    self._close_file()
+                    return
+                if isinstance(it, tuple):
+                    self._control(it)
+                else:
+                    self._write(it)
+            try:
+                if self._fh:
+                    self._fh.flush()
+            except Exception:
+                pass
+
+    def _control(self, item):
+        if item[0] == 'flush':
+            try:
+                if self._fh:
+                    self._fh.flush()
+            finally:
+                item[1].set()
+        elif item[0] == 'snapshot':
+            _, dest, callback = item
+            error = None
+            try:
+                if self._fh:
+                    self._fh.flush()
+                if os.path.exists(self.path):
+                    shutil.copyfile(self.path, dest)
+                else:
+                    open(dest, 'w', encoding='utf-8').close()
+            except Exception as e:
+                error = e
+            if callback:
+                try:
+                    callback(dest, error)
+                except Exception:
+                    pass
+
+    def _write(self, entry):
+        try:
+            if self._fh is None:
+                self._open()
+            self._maybe_rotate()
+            if self._fh is None:
+                self._open()
+            self._fh.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        except Exception:
+            pass
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        # a journal left by an earlier run keeps its age across restarts
+        self._opened_at = self._started_at() or time.time()
+        self._fh = open(self.path, 'a', encoding='utf-8')
+
+    def _started_at(self):
+        """Time of the first entry in the active file (its mtime if unreadable), or None."""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                first = f.readline()
+        except OSError:
+            return None
+        if not first:
+            return None
+        try:
+            return datetime.fromisoformat(json.loads(first)['ts']).timestamp()
+        except (ValueError, KeyError, TypeError):
+            try:
+                return os.path.getmtime(self.path)
+            except OSError:
+                return None
+
+    def _maybe_rotate(self):
+        if self._fh is None:
+            return
+        too_big = self.max_bytes and self._fh.tell() >= self.max_bytes
+        too_old = self.max_age and time.time() - self._opened_at >= self.max_age
+        if too_big or too_old:
+            self._rotate()
+
+    def _rotate(self):
+        """Close the active file, rename it with a timestamp and prune old ones."""
+        self._close_file()
+        if not os.path.exists(self.path):
+            return
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        rotated = os.path.join(self.directory, f'{self.name}-{stamp}.jsonl')
+        os.replace(self.path, rotated)
+        if self.compress:
+            with open(rotated, 'rb') as src, gzip.open(rotated + '.gz', 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(rotated)
+        self._prune()
+
+    def rotated_files(self):
+        prefix = f'{self.name}-'
+        try:
+            names = sorted(n for n in os.listdir(self.directory) if n.startswith(prefix))
+        except OSError:
+            return []
+        return [os.path.join(self.directory, n) for n in names]
+
+    def _prune(self):
+        files = self.rotated_files()
+        for old in files[:max(0, len(files) - self.backup_count)]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+    def _close_file(self):
+        if self._fh is not None:
+            try:
+                self._fh.close()
+            except Exception:
+                pass
+            self._fh = None
@@ -0,0 +1,327 @@
+"""
+Scripts and saved macros.
+
+A script is a text file with one SpeakShell command per line ('#' starts
+a comment). Saved macros are scripts stored in ``~/.speakshell/macros``
+and recorded with 'record macro <name>' ... 'stop recording'.
+
+``MacroRunner`` executes a script as a batch on its own thread. Steps are
+grouped using the ``parallel`` flag of the matched intent: neighbouring
+parallel steps (info queries, app launches, listings) run concurrently on
+the executor, while every other step (cd, file operations, raw commands
+whose effect is unknown) is a barrier that waits for everything before it
+and runs alone, so state changes keep their order. Each step records its
+outcome and a summary table is printed at the end.
+"""
+import itertools
+import os
+import re
+import threading
+import time
+
+import sysinfo
+from executor import Job
+from fileops import FileOp
+
+# intents that control macros are not allowed inside one
+NESTED = ('run_script', 'run_macro', 'record_macro', 'stop_recording')
+
+
+def parse_script(text):
+    """Return the Steps of a script, skipping blank lines and comments."""
+    steps = []
+    for number, line in enumerate(text.splitlines(), 1):
+        command = line.strip()
+        if command and not command.startswith('#'):
+            steps.append(Step(len(steps) + 1, number, command))
+    return steps
+
+
+def plan(steps, index):
+    """
+    Split steps into groups run one after another: a group is either a
+    run of consecutive parallel steps or a single barrier step.
+    """
+    groups = []
+    for step in steps:
+        match = index.match(step.command)
+        step.parallel = bool(match is not None and match.intent.parallel)
+        if step.parallel and groups and groups[-1][0].parallel:
+            groups[-1].append(step)
+        else:
+            groups.append([step])
+    return groups
+
+
+class Step:
+    """One script line and its outcome."""
+    def __init__(self, number, line, command):
+        self.number = number
+        self.line = line
+        self.command = command
+        self.parallel = False
+        self.status = 'pending'   # ok / failed / not run / skipped / cancelled
+        self.detail = ''
+        self.cmd = None
+        self.op = None   # FileOp of a copy/move step
+        self.job = None  # Job of a system report step
+        self.returncode = None
+        self.started = None
+        self.seconds = 0.0
+
+    def finish(self, status, detail=''):
+        self.status = status
+        self.detail = detail
+        if self.started is not None:
+            self.seconds = time.perf_counter() - self.started
+
+    def __repr__(self):
+        return f"<Step {self.number} {self.status} {self.command!r}>"
+
+
+class MacroStore:
+    """Named macros saved as scripts in ``directory``."""
+    def __init__(self, directory):
+        self.directory = directory
+
+    @staticmethod
+    def normalize(name):
+        return re.sub(r'[^a-z0-9_-]+', '_', name.strip().lower()).strip('_')
+
+    def path(self, name):
+        return os.path.join(self.directory, self.normalize(name) + '.txt')
+
+    def names(self):
+        try:
+            return sorted(f[:-4] for f in os.listdir(self.directory) if f.endswith('.txt'))
+        except OSError:
+            return []
+
+    def load(self, name):
+        try:
+            with open(self.path(name), encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def save(self, name, commands):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(name)
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(f"# SpeakShell macro '{self.normalize(name)}'\n")
+            f.writelines(c + '\n' for c in commands)
+        os.replace(tmp, path)
+        return path
+
+
+class MacroRunner:
+    """
+    Runs a script against a ShellCore. Intent handlers run on the UI
+    thread (``call_and_wait``); shell commands go to the shared executor.
+    """
+    _ids = itertools.count(1)
+
+    def __init__(self, shell, name, steps, timeout=60, output_limit=4000, on_done=None):
+        self.id = next(self._ids)
+        self.shell = shell
+        self.name = name
+        self.steps = steps
+        self.groups = plan(steps, shell.intents)
+        self.timeout = timeout
+        self.output_limit = output_limit
+        self.on_done = on_done
+        self.cancelled = False
+        self.started = None
+        self.finished = None
+        self.done = threading.Event()
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self.started is not None and not self.done.is_set()
+
+    def start(self):
+        self.started = time.perf_counter()
+        threading.Thread(target=self._run, name=f'speakshell-macro-{self.id}', daemon=True).start()
+        return self
+
+    def cancel(self):
+        self.cancelled = True
+        with self._lock:
+            jobs = list(self._jobs)
+        for job_id in jobs:
+            self.shell.executor.cancel(job_id)
+        for step in self.steps:
+            if step.op is not None:
+                self.shell.fileops.cancel(step.op.id)
+
+    # --- runner thread ---
+    def _run(self):
+        try:
+            for group in self.groups:
+                if self.cancelled:
+                    break
+                waits = [self._start_step(step) for step in group]
+                for step, event in zip(group, waits):
+                    if event is not None:
+                        event.wait()
+                    if step.op is not None:
+                        self._finish_op(step)
+                    elif step.job is not None:
+                        # after the report's own callback has run on the UI thread
+                        self.shell.call_and_wait(self._finish_job, step)
+            for step in self.steps:
+                if step.status == 'pending':
+                    step.finish('cancelled')
+        finally:
+            self.finished = time.perf_counter()
+            self.shell.call_soon(self._report)
+            if self.on_done:
+                self.on_done(self)
+            self.done.set()
+
+    def _start_step(self, step):
+        """Prepare ``step`` on the UI thread and launch it; returns an Event to wait on, or None."""
+        step.started = time.perf_counter()
+        try:
+            prepared = self.shell.call_and_wait(self._prepare, step)
+        except Exception as e:
+            step.finish('failed', str(e))
+            return None
+        if prepared is None:
+            return None
+        if isinstance(prepared, FileOp):
+            step.op = prepared
+            return prepared.done
+        if isinstance(prepared, Job):
+            step.job = prepared
+            with self._lock:
+                if not prepared.done.is_set():
+                    self._jobs[prepared.id] = prepared
+            return prepared.done
+        cmd, is_shell = prepared
+        step.cmd = cmd
+        if isinstance(cmd, str) and (cmd.startswith('start ') or cmd.startswith('explorer ')):
+            self.shell.call_and_wait(self.shell.run_cmd, cmd, is_shell)
+            step.finish('ok', 'launched')
+            return None
+
+        finished = threading.Event()
+        used = [0]
+
+        def on_output(job, stream, line):
+            if used[0] > self.output_limit:
+                return
+            used[0] += len(line) + 1
+            text = f"[{step.number}] {line}" if used[0] <= self.output_limit else f"[{step.number}] ... (output truncated)"
+            self.shell.call_soon(self.shell.print_output, text)
+
+        def on_exit(job):
+            with self._lock:
+                self._jobs.pop(job.id, None)
+            if not step.parallel:
+                self.shell.results.invalidate()   # see resultcache.py
+            step.returncode = job.returncode
+            if job.cancelled:
+                step.finish('cancelled')
+            elif job.timed_out:
+                step.finish('failed', 'timed out')
+            elif job.error is not None:
+                step.finish('failed', str(job.error))
+            elif job.returncode == 0:
+                step.finish('ok')
+            else:
+                step.finish('failed', f'exit code {job.returncode}')
+            try:
+                # before the next step starts, so it runs in the new folder
+                self.shell.call_and_wait(self.shell.follow_job_cwd, job)
+            finally:
+                finished.set()
+
+        job = self.shell.executor.submit(cmd, cwd=self.shell.cwd, shell=is_shell, timeout=self.timeout,
+                                         on_output=on_output, on_exit=on_exit)
+        with self._lock:
+            if not job.done.is_set():
+                self._jobs[job.id] = job
+        return finished
+
+    def _prepare(self, step):
+        # UI thread: handlers may change cwd, print, or ask for confirmation
+        shell = self.shell
+        shell.print_output(f"\n[{self.name} {step.number}] > {step.command}")
+        shell.log_activity("MACRO", step.command)
+        match = shell.intents.match(step.command)
+        name = match.intent.name if match is not None else None
+        if name in NESTED:
+            step.finish('skipped', 'macro commands cannot be nested')
+            return None
+        if name == 'exit':
+            self.cancelled = True
+            step.finish('ok', 'stopped the macro')
+            return None
+        if shell.run_meta_command(step.command):
+            step.finish('ok')
+            return None
+        shell.last_file_op = shell.last_report = None
+        cmd, is_shell = shell.map_to_cmd(step.command)
+        if not step.parallel:
+            shell.results.invalidate()
+        if shell.last_file_op is not None:
+            return shell.last_file_op   # copy/move running in the background
+        if shell.last_report is not None:
+            return shell.last_report    # system report read on the executor
+        if not cmd:
+            if match is None:
+                step.finish('not run', 'not recognized')
+            elif match.intent.name == 'help' or match.intent.name in sysinfo.REPORTS:
+                step.finish('ok')   # answered in-process
+            else:
+                step.finish('not run')
+            return None
+        shell.print_output(f"Executing: {cmd}")
+        return cmd, is_shell
+
+    @staticmethod
+    def _finish_op(step):
+        op = step.op
+        if op.cancelled:
+            step.finish('cancelled')
+        elif op.error is not None:
+            step.finish('failed', str(op.error))
+        else:
+            step.finish('ok', op.fast_path or '')
+
+    def _finish_job(self, step):
+        job = step.job
+        with self._lock:
+            self._jobs.pop(job.id, None)
+        if job.cancelled:
+            step.finish('cancelled')
+        elif job.error is not None and not isinstance(job.error, sysinfo.Unavailable):
+            step.finish('failed', str(job.error))
+        else:
+            step.finish('ok')
+
+    def summary(self):
+        counts = {}
+        for step in self.steps:
+            counts[step.status] = counts.get(step.status, 0) + 1
+        total = (self.finished or time.perf_counter()) - (self.started or time.perf_counter())
+        parts = ', '.join(f"{n} {status}" for status, n in sorted(counts.items()))
+        lines = [f"[{self.name}] {len(self.steps)} steps in {total:.2f}s ({len(self.groups)} stages): {parts}"]
+        for step in self.steps:
+            mode = '||' if step.parallel else '->'
+            detail = f"  ({step.detail})" if step.detail else ''
+            lines.append(f"  {step.number:>3} {mode} {step.status:<9} {step.seconds:6.2f}s  {step.command}{detail}")
+        return '\n'.join(lines)
+
+    @property
+    def ok(self):
+        return all(step.status == 'ok' for step in self.steps)
+
+    def _report(self):
+        self.shell.print_output(self.summary())
+        self.shell.log_activity("MACRO", f"{self.name} finished ({'ok' if self.ok else 'with errors'})")
+        self.shell.speak("Macro finished" if self.ok else "Macro finished with errors")
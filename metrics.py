@@ -0,0 +1,219 @@
+"""
+Per-stage latency of voice and typed commands.
+
+A ``Trace`` follows one utterance from the capture thread through the
+recognizer pool to the UI thread and the shell job, and each ``mark``
+records how long the stage since the previous mark took:
+
+    listen     recognizer.listen until the phrase ended
+    vad        silence trimming / phrase splitting
+    wake       wake-word spotting, when the gate is on (wakeword.py)
+    preprocess audio cleanup before the phrase is submitted
+    recognize  queued and decoded by the recognizer pool
+    dispatch   hop to the UI thread
+    rerank     choosing among the engine's alternatives (rerank.py)
+    map        map_to_cmd
+    run_cmd    handing the command to the executor
+    execute    the shell job itself
+    render     output queued until it was drawn (GUI only)
+    total      end of speech (or Enter) until the job finished
+
+``LatencyMetrics`` keeps the last ``window`` samples of each stage for the
+rolling p50/p95/p99 in the status bar, plus running counts and sums. The
+same numbers are written as JSON lines (one snapshot per line) and as a
+Prometheus text file (summary type) that a local scraper or
+node_exporter's textfile collector can read; ``start_export`` rewrites
+both in the background while there are new samples.
+"""
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+
+STAGES = ('listen', 'vad', 'wake', 'preprocess', 'recognize', 'dispatch', 'rerank',
+          'map', 'run_cmd', 'execute', 'render', 'total')
+QUANTILES = (0.5, 0.95, 0.99)
+# stages shown in the one-line status summary
+STATUS_STAGES = (('recognize', 'rec'), ('map', 'map'), ('execute', 'run'), ('render', 'draw'), ('total', 'total'))
+
+
+def percentile(ordered, q):
+    """Nearest-rank percentile of an already sorted sequence."""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+def fmt_ms(seconds):
+    ms = seconds * 1e3
+    if ms < 10:
+        return f"{ms:.1f}"
+    return f"{ms:.0f}"
+
+
+class Trace:
+    """Stage timestamps of one command; safe to hand from thread to thread."""
+    def __init__(self, metrics, start=None):
+        self.metrics = metrics
+        self.start = self.last = time.perf_counter() if start is None else start
+        self.stages = {}
+
+    def mark(self, stage, now=None):
+        """Record the time since the previous mark as ``stage``."""
+        now = time.perf_counter() if now is None else now
+        seconds = max(0.0, now - self.last)
+        self.last = now
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+        self.metrics.observe(stage, seconds)
+        return seconds
+
+    def skip(self):
+        """Exclude the time since the previous mark (e.g. a confirmation dialog)."""
+        now = time.perf_counter()
+        self.start += now - self.last
+        self.last = now
+
+    def finish(self, now=None):
+        now = time.perf_counter() if now is None else now
+        self.stages['total'] = max(0.0, now - self.start)
+        self.metrics.observe('total', self.stages['total'])
+        self.metrics.note_finished()
+        return self.stages['total']
+
+
+class LatencyMetrics:
+    def __init__(self, window=500):
+        self.window = window
+        self._samples = {stage: deque(maxlen=window) for stage in STAGES}
+        self._count = dict.fromkeys(STAGES, 0)
+        self._sum = dict.fromkeys(STAGES, 0.0)
+        self._lock = threading.Lock()
+        self._version = 0
+        self.on_update = None   # called (on the finishing thread) after each trace
+        self._export_thread = None
+        self._export_stop = threading.Event()
+
+    def trace(self, start=None):
+        return Trace(self, start)
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            if stage not in self._samples:
+                self._samples[stage] = deque(maxlen=self.window)
+                self._count[stage] = 0
+                self._sum[stage] = 0.0
+            self._samples[stage].append(seconds)
+            self._count[stage] += 1
+            self._sum[stage] += seconds
+            self._version += 1
+
+    def note_finished(self):
+        if self.on_update:
+            try:
+                self.on_update()
+            except Exception:
+                pass
+
+    def reset(self):
+        with self._lock:
+            for stage in self._samples:
+                self._samples[stage].clear()
+                self._count[stage] = 0
+                self._sum[stage] = 0.0
+            self._version += 1
+
+    def snapshot(self):
+        """{stage: {'count', 'sum', 'window', 'p50', 'p95', 'p99'}} for stages with samples (seconds)."""
+        with self._lock:
+            data = {stage: (sorted(samples), self._count[stage], self._sum[stage])
+                    for stage, samples in self._samples.items() if samples}
+        result = {}
+        for stage, (ordered, count, total) in data.items():
+            row = {'count': count, 'sum': total, 'window': len(ordered)}
+            for q in QUANTILES:
+                row[f'p{round(q * 100)}'] = percentile(ordered, q)
+            result[stage] = row
+        return result
+
+    def status_text(self):
+        """Compact p50/p95/p99 line for the status bar ('' before the first command)."""
+        snap = self.snapshot()
+        parts = [f"{label} {fmt_ms(snap[stage]['p50'])}/{fmt_ms(snap[stage]['p95'])}/{fmt_ms(snap[stage]['p99'])}"
+                 for stage, label in STATUS_STAGES if stage in snap]
+        return ("ms p50/p95/p99: " + "  ".join(parts)) if parts else ''
+
+    def table(self):
+        snap = self.snapshot()
+        if not snap:
+            return "No latency samples yet"
+        lines = [f"{'stage':<11} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'mean ms':>9}"]
+        for stage in STAGES:
+            row = snap.get(stage)
+            if row:
+                lines.append(f"{stage:<11} {row['count']:>6} {fmt_ms(row['p50']):>9} {fmt_ms(row['p95']):>9} "
+                             f"{fmt_ms(row['p99']):>9} {fmt_ms(row['sum'] / row['count']):>9}")
+        return '\n'.join(lines)
+
+    # --- export ---
+    def export_jsonl(self, path):
+        """Append one snapshot line: {"ts": ..., "stages": {stage: {...}}}."""
+        line = json.dumps({'ts': time.time(), 'stages': self.snapshot()}, sort_keys=True)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+        return path
+
+    def prometheus_text(self):
+        snap = self.snapshot()
+        name = 'speakshell_stage_latency_seconds'
+        lines = [f"# HELP {name} Latency of each SpeakShell command stage (quantiles over the last {self.window} samples).",
+                 f"# TYPE {name} summary"]
+        for stage in STAGES:
+            row = snap.get(stage)
+            if not row:
+                continue
+            for q in QUANTILES:
+                lines.append(f'{name}{{stage="{stage}",quantile="{q}"}} {row[f"p{round(q * 100)}"]:.6f}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {row["sum"]:.6f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {row["count"]}')
+        return '\n'.join(lines) + '\n'
+
+    def export_prometheus(self, path):
+        """Write the text exposition format atomically (scrapers never see half a file)."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, path)
+        return path
+
+    def start_export(self, directory, interval=15.0):
+        """Rewrite latency.prom and append to latency.jsonl in ``directory`` while samples arrive."""
+        if self._export_thread is not None or not interval:
+            return
+        self._export_stop.clear()
+        self._export_thread = threading.Thread(target=self._export_loop, args=(directory, interval),
+                                               name='speakshell-metrics', daemon=True)
+        self._export_thread.start()
+
+    def stop_export(self):
+        thread, self._export_thread = self._export_thread, None
+        if thread is not None:
+            self._export_stop.set()
+            thread.join(timeout=2)
+
+    def _export_loop(self, directory, interval):
+        written = 0
+        while True:
+            stop = self._export_stop.wait(interval)
+            if self._version != written:
+                written = self._version
+                try:
+                    self.export_prometheus(os.path.join(directory, 'latency.prom'))
+                    self.export_jsonl(os.path.join(directory, 'latency.jsonl'))
+                except OSError:
+                    pass
+            if stop:
+                return
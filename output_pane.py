@@ -0,0 +1,92 @@
+"""
+Bounded, batch-rendered output pane.
+
+Writes are queued and rendered at most once per frame with a single
+``insert`` and ``see('end')``. The widget keeps only the newest
+``max_lines`` lines, so a long session or a huge ``dir`` listing cannot
+make the Text widget (and the event loop) progressively slower.
+``on_flush(seconds)`` reports how long the oldest pending write waited
+until it was on screen (the 'render' stage in metrics.py).
+"""
+import threading
+import time
+
+
+class OutputPane:
+    def __init__(self, text_widget, max_lines=5000, frame_ms=16, on_flush=None):
+        self.widget = text_widget
+        self.on_flush = on_flush
+        self._first_write = None
+        self.max_lines = max_lines
+        self.frame_ms = frame_ms
+        self._pending = []
+        self._pending_lines = 0
+        self._scheduled = False
+        self._lock = threading.Lock()
+        self.dropped_lines = 0
+
+    def write(self, text, newline=True):
+        if newline:
+            text += '\n'
+        with self._lock:
+            if not self._pending:
+                self._first_write = time.perf_counter()
+            self._pending.append(text)
+            self._pending_lines += text.count('\n')
+            if self._pending_lines > 2 * self.max_lines:
+                # collapse early so a burst cannot grow the queue unbounded
+                self._pending = [self._tail(''.join(self._pending))]
+                self._pending_lines = self._pending[0].count('\n')
+            if self._scheduled:
+                return
+            self._scheduled = True
+        try:
+            self.widget.after(self.frame_ms, self.flush)
+        except Exception:
+            with self._lock:
+                self._scheduled = False
+
+    def flush(self):
+        with self._lock:
+            chunk = ''.join(self._pending)
+            self._pending = []
+            self._pending_lines = 0
+            self._scheduled = False
+            queued = self._first_write
+        if not chunk:
+            return
+        chunk = self._tail(chunk)
+        try:
+            self.widget.insert('end', chunk)
+            self._trim()
+            self.widget.see('end')
+        except Exception:
+            return
+        if self.on_flush and queued is not None:
+            self.on_flush(time.perf_counter() - queued)
+
+    def clear(self):
+        with self._lock:
+            self._pending = []
+            self._pending_lines = 0
+        self.widget.delete('1.0', 'end')
+
+    def set_max_lines(self, max_lines):
+        self.max_lines = max(1, int(max_lines))
+        self._trim()
+
+    def _tail(self, chunk):
+        lines = chunk.split('\n')
+        # a trailing '\n' leaves one empty element after the split
+        if len(lines) - 1 > self.max_lines:
+            self.dropped_lines += len(lines) - 1 - self.max_lines
+            return '\n'.join(lines[-(self.max_lines + 1):])
+        return chunk
+
+    def _trim(self):
+        # 'end-1c' sits on the (empty) line after the last newline
+        line_count = int(self.widget.index('end-1c').split('.')[0]) - 1
+        excess = line_count - self.max_lines
+        if excess > 0:
+            self.widget.delete('1.0', f'{excess + 1}.0')
+            self.dropped_lines += excess
@@ -0,0 +1,244 @@
+"""
+Multi-process recognition pipeline.
+
+The capture thread only records phrases; each phrase's PCM bytes are put
+in a shared-memory block and decoded by a pool of worker processes, so the
+microphone keeps being read while earlier phrases are recognized and
+CPU-heavy local decoding is not held back by the GIL. Results are handed
+back strictly in capture order.
+
+Streaming backends skip the pool: ``stream_phrase`` feeds them chunk by
+chunk straight from the microphone.
+"""
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import engines
+from vad import pcm_rms
+
+_worker_backends = {}
+
+
+def _worker_backend(engine, language, options=None):
+    options = options or {}
+    key = (engine, repr(sorted(options.items())))
+    backend = _worker_backends.get(key)
+    if backend is None:
+        backend = engines.create(engine, language=language, **options)
+        backend.warm_up()
+        _worker_backends[key] = backend
+    return backend
+
+
+def _init_worker(engine, language, options):
+    # load the selected engine before the first phrase arrives
+    try:
+        _worker_backend(engine, language, options)
+    except Exception:
+        pass
+
+
+def recognize_segment(shm_name, size, sample_rate, sample_width, engine, language, options=None, nbest=1):
+    """
+    Worker-process entry point. Returns (status, payload, seconds) where
+    status is 'ok', 'unknown', 'request' or 'error'. For 'ok' the payload
+    is the list of [(text, confidence), ...] alternatives, best first.
+    """
+    import speech_recognition as sr
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        frame_data = bytes(shm.buf[:size])
+    finally:
+        shm.close()
+    audio = sr.AudioData(frame_data, sample_rate, sample_width)
+    t0 = time.perf_counter()
+    try:
+        alternatives = _worker_backend(engine, language, options).recognize_nbest(audio, max(1, nbest))
+        if alternatives:
+            return 'ok', alternatives, time.perf_counter() - t0
+        return 'unknown', None, time.perf_counter() - t0
+    except engines.RecognitionError as e:
+        return 'request', str(e), time.perf_counter() - t0
+    except Exception as e:
+        return 'error', str(e), time.perf_counter() - t0
+
+
+class RecognitionPipeline:
+    """
+    Fan captured phrases out to recognizer processes.
+
+    on_result(seq, status, payload) is called from a pool thread, once per
+    submitted phrase and in submission order.
+    """
+    def __init__(self, on_result, pool_size=2, engine='google', language='en-US', max_pending=8,
+                 worker=recognize_segment, options=None, nbest=1):
+        self.on_result = on_result
+        self.nbest = nbest
+        self.engine = engine
+        self.options = options or {}
+        self.pool_size = max(1, int(pool_size))
+        self.language = language
+        self.max_pending = max_pending
+        self._worker = worker
+        self._pool = None
+        self._seq = itertools.count()
+        self._next = 0
+        self._ready = {}
+        self._inflight = {}
+        self._contexts = {}
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def start(self):
+        if self._pool is None:
+            with self._lock:
+                self._seq = itertools.count()
+                self._next = 0
+            self._pool = ProcessPoolExecutor(max_workers=self.pool_size, initializer=_init_worker,
+                                             initargs=(self.engine, self.language, self.options))
+        return self
+
+    @property
+    def pending(self):
+        with self._lock:
+            return len(self._inflight)
+
+    def submit(self, audio, engine=None, options=None, context=None):
+        """
+        Queue an sr.AudioData for recognition; returns its sequence number
+        or None if dropped. ``options`` are backend constructor options.
+        ``context`` is held until the result is delivered; on_result can
+        take it with pop_context(seq).
+        """
+        engine = engine or self.engine
+        options = self.options if options is None else options
+        if self.pending >= self.max_pending:
+            self.dropped += 1
+            return None
+        data = audio.frame_data
+        shm = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+        shm.buf[:len(data)] = data
+        with self._lock:
+            seq = next(self._seq)
+            self._inflight[seq] = shm
+            if context is not None:
+                self._contexts[seq] = context
+        try:
+            fut = self._pool.submit(self._worker, shm.name, len(data), audio.sample_rate,
+                                    audio.sample_width, engine, self.language, options, self.nbest)
+        except Exception as e:
+            self._complete(seq, ('error', str(e), 0.0))
+            return seq
+        fut.add_done_callback(lambda f, seq=seq: self._on_done(seq, f))
+        return seq
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        with self._lock:
+            blocks = list(self._inflight.values())
+            self._inflight.clear()
+            self._ready.clear()
+            self._contexts.clear()
+        for shm in blocks:
+            self._release(shm)
+
+    def pop_context(self, seq):
+        # called from on_result, i.e. while _complete holds the lock
+        return self._contexts.pop(seq, None)
+
+    # --- internals ---
+    def _on_done(self, seq, fut):
+        try:
+            result = fut.result()
+        except Exception as e:
+            result = ('error', str(e), 0.0)
+        self._complete(seq, result)
+
+    def _complete(self, seq, result):
+        with self._lock:
+            if seq not in self._inflight:
+                return  # pipeline was shut down meanwhile
+            shm = self._inflight.pop(seq)
+            self._ready[seq] = result
+            # deliver in capture order; later phrases wait for earlier ones
+            while self._next in self._ready:
+                status, payload, _ = self._ready.pop(self._next)
+                try:
+                    self.on_result(self._next, status, payload)
+                except Exception:
+                    pass
+                self._next += 1
+        self._release(shm)
+
+    @staticmethod
+    def _release(shm):
+        try:
+            shm.close()
+            shm.unlink()
+        except Exception:
+            pass
+
+
+class PhraseTimeout(Exception):
+    """No speech started within the listen timeout."""
+
+
+def stream_phrase(source, backend, energy_threshold, pause_threshold=0.8, listen_timeout=10,
+                  phrase_time_limit=7, on_partial=None, keep_going=lambda: True, is_speech=None, nbest=None):
+    """
+    Capture one phrase from an open sr.Microphone while feeding it to a
+    streaming backend. Returns the final hypothesis (None if nothing was
+    understood or capture stopped), or with ``nbest`` the list of
+    [(text, confidence), ...] alternatives; raises PhraseTimeout if no
+    speech starts within ``listen_timeout`` seconds. ``is_speech(chunk)``
+    overrides the plain energy test (e.g. VoiceActivityDetector).
+    """
+    if is_speech is None:
+        def is_speech(chunk):
+            return pcm_rms(chunk, source.SAMPLE_WIDTH) > energy_threshold
+    seconds_per_chunk = float(source.CHUNK) / source.SAMPLE_RATE
+    preroll = deque(maxlen=max(1, int(0.3 / seconds_per_chunk)))
+    waited = 0.0
+    while True:
+        if not keep_going():
+            return None
+        buf = source.stream.read(source.CHUNK)
+        if not buf:
+            return None
+        if is_speech(buf):
+            break
+        preroll.append(buf)
+        waited += seconds_per_chunk
+        if listen_timeout and waited > listen_timeout:
+            raise PhraseTimeout()
+
+    stream = backend.start_stream(on_partial=on_partial)
+    for chunk in preroll:
+        stream.feed(chunk)
+    stream.feed(buf)
+    spoken = seconds_per_chunk
+    silence = 0.0
+    while keep_going():
+        buf = source.stream.read(source.CHUNK)
+        if not buf:
+            break
+        stream.feed(buf)
+        spoken += seconds_per_chunk
+        if is_speech(buf):
+            silence = 0.0
+        else:
+            silence += seconds_per_chunk
+        if silence >= pause_threshold:
+            break
+        if phrase_time_limit and spoken >= phrase_time_limit:
+            break
+    text = stream.finish()
+    if nbest:
+        return stream.alternatives(nbest) if text else []
+    return text
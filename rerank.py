@@ -0,0 +1,215 @@
+"""
+N-best re-ranking of recognition hypotheses.
+
+Engines return several alternative transcripts. Instead of trusting the
+first one, each alternative is scored against a precomputed index of
+every command phrase and the names in the current folder, and the best
+executable reading wins. A near miss such as "least files" is repaired to
+"list files" because the words sound alike (Soundex) or are a small edit
+apart.
+
+The index maps the phonetic key of every phrase word to the phrases that
+contain it, so only phrases sharing at least one sound-alike word with a
+hypothesis are compared.
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+from grammar import spoken_words
+from intents import COMMANDS, EXACT, PAIR, PREFIX, TAIL, compile_commands
+
+_SOUNDEX = {c: d for d, letters in (('1', 'bfpv'), ('2', 'cgjkqsxz'), ('3', 'dt'),
+                                     ('4', 'l'), ('5', 'mn'), ('6', 'r')) for c in letters}
+
+# intents whose parameter names something that already exists
+EXISTING_TARGETS = ('cd', 'go_to', 'open_file', 'delete_file', 'rename', 'move', 'copy', 'run_macro')
+
+Candidate = namedtuple('Candidate', 'text score hypothesis rank match corrected')
+Candidate.__doc__ = """A scored reading of one hypothesis.
+
+text is what would be executed, hypothesis the engine transcript it came
+from, match the IntentMatch of text (None if no command was found) and
+corrected whether text differs from the transcript.
+"""
+
+
+@lru_cache(maxsize=4096)
+def soundex(word):
+    letters = [c for c in word.lower() if c.isalpha()]
+    if not letters:
+        return word
+    out = [letters[0]]
+    last = _SOUNDEX.get(letters[0], '')
+    for c in letters[1:]:
+        code = _SOUNDEX.get(c, '')
+        if code and code != last:
+            out.append(code)
+        if c not in 'hw':
+            last = code
+    return (''.join(out) + '000')[:4]
+
+
+def edit_similarity(a, b):
+    """1 - Levenshtein distance / longer length."""
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return 1.0 - prev[-1] / float(max(len(a), len(b)))
+
+
+def word_similarity(a, b):
+    if a == b:
+        return 1.0
+    sim = edit_similarity(a, b)
+    if soundex(a) == soundex(b):
+        sim = max(sim, 0.8)
+    return sim
+
+
+class CommandRanker:
+    """
+    accept: score at or above which the best reading runs directly.
+    confirm: score at or above which it is offered for confirmation;
+    below that the engine's first transcript is used unchanged.
+    min_word: every word a correction replaces must be at least this
+    similar to the word it replaces ("git status" is not "battery status").
+
+    A reading that differs from the engine's first transcript runs without
+    asking only if its intent is read-only (``parallel``): a sound-alike
+    must never quit ("quiet please") or copy ("coffee") on its own.
+    """
+    def __init__(self, commands=None, index=None, names=(), accept=0.8, confirm=0.55, min_word=0.5):
+        self.commands = COMMANDS if commands is None else commands
+        self.index = index or compile_commands(self.commands)
+        self.accept = accept
+        self.confirm = confirm
+        self.min_word = min_word
+        self._phrases = []
+        self._by_key = {}
+        for it in self.commands:
+            for phrase in it.phrases:
+                tokens = tuple(phrase.split())
+                entry = (tokens, it)
+                self._phrases.append(entry)
+                for key in {soundex(t) for t in tokens}:
+                    self._by_key.setdefault(key, []).append(entry)
+        self.set_names(names)
+
+    def set_names(self, names):
+        """Known file/folder (or macro) names, used to repair command parameters."""
+        self._names = {}
+        for name in names:
+            spoken = ' '.join(spoken_words(name))
+            if spoken:
+                self._names.setdefault(spoken, name)
+
+    # --- scoring ---
+    def rank(self, hypotheses):
+        """Score [(text, confidence), ...] and return Candidates, best first."""
+        candidates = []
+        for rank, (text, confidence) in enumerate(hypotheses):
+            if not text:
+                continue
+            prior = 0.75 + 0.25 * confidence if confidence is not None else 1.0 - 0.05 * rank
+            reading, similarity = self._read(text.lower().strip())
+            match = self.index.match(reading) if reading else None
+            score = similarity * prior if match is not None else 0.0
+            candidates.append(Candidate(reading or text, score, text, rank, match,
+                                        bool(reading) and reading != text.lower().strip()))
+        candidates.sort(key=lambda c: (-c.score, c.rank))
+        return candidates
+
+    def _read(self, text):
+        """Best command reading of ``text`` and its similarity (1.0 if it already matches)."""
+        match = self.index.match(text)
+        if match is not None:
+            return self._repair_param(text, match), 1.0
+        tokens = text.split()
+        if not tokens:
+            return None, 0.0
+        seen = set()
+        best = (0.0, None)
+        for token in tokens:
+            for entry in self._by_key.get(soundex(token), ()):
+                if id(entry) in seen:
+                    continue
+                seen.add(id(entry))
+                phrase, it = entry
+                n = len(phrase)
+                if it.kind == EXACT:
+                    starts = [0] if len(tokens) == n else []
+                elif it.kind == PREFIX:
+                    starts = [0]
+                else:
+                    starts = range(len(tokens) - n + 1)
+                for i in starts:
+                    window = tokens[i:i + n]
+                    if len(window) < n:
+                        continue
+                    sims = [word_similarity(w, p) for w, p in zip(window, phrase)]
+                    if min(sims) < self.min_word:
+                        continue
+                    sim = sum(sims) / n
+                    if sim > best[0]:
+                        best = (sim, tokens[:i] + list(phrase) + tokens[i + n:])
+        if best[1] is None:
+            return None, 0.0
+        reading = ' '.join(best[1])
+        match = self.index.match(reading)
+        if match is None:
+            return None, 0.0
+        return self._repair_param(reading, match), best[0]
+
+    def _repair_param(self, text, match):
+        """Snap the parameter of commands that target existing things to a known name."""
+        if not self._names or match.intent.name not in EXISTING_TARGETS:
+            return text
+        tail = text[match.end:].strip()
+        if not tail:
+            return text
+        if match.intent.slots == PAIR and ' to ' in f' {tail} ':
+            src, dst = f' {tail} '.split(' to ', 1)
+            src = self._closest_name(src.strip())
+            return f"{text[:match.end]} {src} to {dst.strip()}"
+        if match.intent.slots == TAIL:
+            return f"{text[:match.end]} {self._closest_name(tail)}"
+        return text
+
+    def _closest_name(self, spoken, threshold=0.75):
+        words = ' '.join(spoken_words(spoken))
+        if words in self._names:
+            return self._names[words]
+        best, best_sim = spoken, threshold
+        for candidate, name in self._names.items():
+            sim = max(edit_similarity(words, candidate),
+                      edit_similarity(words.replace(' ', ''), candidate.replace(' ', '')))
+            if sim > best_sim:
+                best, best_sim = name, sim
+        return best
+
+    # --- decision ---
+    def choose(self, hypotheses):
+        """
+        Return (action, candidate): action is 'run' (score >= accept),
+        'confirm' (>= confirm) or 'fallback' (use the first transcript).
+        A reading other than the first transcript is only run directly if
+        its intent is read-only.
+        """
+        ranked = self.rank(hypotheses)
+        if not ranked:
+            return 'fallback', None
+        best = ranked[0]
+        first = next(text for text, _ in hypotheses if text).lower().strip()
+        changed = best.text.lower().strip() != first
+        if best.score >= self.accept and not (changed and not best.match.intent.parallel):
+            return 'run', best
+        if best.score >= self.confirm:
+            return 'confirm', best
+        return 'fallback', best
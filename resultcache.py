@@ -0,0 +1,106 @@
+"""
+Short-lived cache of read-only command results.
+
+"disk space", "network info", "memory usage" and "what time is it" are
+asked for again and again, and each used to spawn a fresh shell command.
+Intents that only read state carry a ``ttl`` in the command table
+(intents.py). Their results are kept here for that many seconds, keyed by
+the normalized command and the folder it ran in. A repeat within the TTL
+is answered from memory.
+
+The cache is invalidated as a whole whenever something may have changed
+state: a command whose intent is not ``parallel``, a raw command, a
+finished copy or move, or a macro step that changes state. Saying
+"refresh <command>" skips the cache for that one request.
+"""
+import threading
+import time
+
+
+def command_key(cmd, cwd):
+    return ('cmd', ' '.join(str(cmd).split()), cwd)
+
+
+class CachedResult:
+    __slots__ = ('value', 'stored', 'expires')
+
+    def __init__(self, value, stored, expires):
+        self.value = value
+        self.stored = stored
+        self.expires = expires
+
+    def age(self, now=None):
+        return (time.monotonic() if now is None else now) - self.stored
+
+
+class ResultCache:
+    def __init__(self, max_entries=128, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # bumped by every invalidate(); a result computed across one is not stored
+        self.generation = 0
+
+    def get(self, key, refresh=False):
+        """The live CachedResult for ``key``, or None (counted as a miss)."""
+        with self._lock:
+            entry = None if refresh else self._entries.get(key)
+            if entry is not None and entry.expires <= self.clock():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def put(self, key, value, ttl, generation=None):
+        """Store ``value`` for ``ttl`` seconds, unless the cache was invalidated since ``generation``."""
+        if not ttl or ttl <= 0:
+            return
+        now = self.clock()
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if len(self._entries) >= self.max_entries and key not in self._entries:
+                # expired entries first, then the oldest
+                for k in [k for k, e in self._entries.items() if e.expires <= now]:
+                    del self._entries[k]
+                if len(self._entries) >= self.max_entries:
+                    del self._entries[min(self._entries, key=lambda k: self._entries[k].stored)]
+            self._entries[key] = CachedResult(value, now, now + ttl)
+
+    def invalidate(self):
+        with self._lock:
+            self.generation += 1
+            if self._entries:
+                self._entries.clear()
+                self.invalidations += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats_text(self):
+        return f"cache {self.hits} hit / {self.misses} miss ({self.hit_rate() * 100:.0f}%)"
+
+    def describe(self):
+        """Multi-line listing for the 'cache' command."""
+        now = self.clock()
+        with self._lock:
+            entries = sorted(self._entries.items(), key=lambda kv: kv[1].stored)
+        lines = [f"{self.stats_text()}, {self.invalidations} invalidations, {len(entries)} cached"]
+        for key, entry in entries:
+            left = entry.expires - now
+            if left > 0:
+                what = key[1] if key[0] == 'cmd' else f"{key[1]} report"
+                where = f"  in {key[2]}" if key[0] == 'cmd' and len(key) > 2 else ''
+                lines.append(f"  {what}{where}  ({entry.age(now):.0f}s old, {left:.0f}s left)")
+        return '\n'.join(lines)
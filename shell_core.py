@@ -0,0 +1,1468 @@
+"""
+Front-end independent core of SpeakShell.
+
+``ShellCore`` owns everything that does not need a window: the command
+table and intent handlers, the background executor, the journal, TTS,
+and the voice pipeline. Front ends subclass it and override the small
+set of UI hooks (``print_output``, ``call_soon``, ``set_status``,
+``confirm``, ...). The Tk GUI lives in voice_cmd.py and the headless
+REPL in headless.py; this module never imports tkinter.
+"""
+import os
+import threading
+import time
+from datetime import datetime
+
+from deps import (
+    SPEECH_RECOGNITION_AVAILABLE,
+    PYAUDIO_AVAILABLE,
+    TTS_AVAILABLE,
+    TOAST_AVAILABLE,
+    sr,
+    pyttsx3,
+    ToastNotifier,
+    start_warmup,
+)
+from intents import compile_commands, clean_param
+from executor import CommandExecutor
+from fileops import FileOpEngine
+from shellsession import ShellSession
+from journal import ActivityJournal
+from tts import TTSWorker
+from recognition import RecognitionPipeline, PhraseTimeout, stream_phrase
+from engines import create as create_backend, get_backend_class, RecognitionError
+from grammar import CommandGrammar
+from vad import VoiceActivityDetector
+from wakeword import WakeWordSpotter
+from preprocess import AudioPreprocessor
+from macros import NESTED, MacroRunner, MacroStore, parse_script
+from rerank import CommandRanker
+import sysinfo
+from dirindex import DirectoryIndex
+from metrics import LatencyMetrics
+from history import CommandHistory
+from resultcache import ResultCache, command_key
+from helpers import (COLORS, LOG_DIR, TTS_CACHE_DIR, GRAMMAR_DIR, MACRO_DIR, METRICS_DIR, HISTORY_DB, INDEX_ROOTS,
+                     PHRASE_TIME_LIMIT)
+
+
+class ShellCore:
+    """
+    Command interpretation, execution and voice capture shared by every
+    front end. Background threads hand results back through ``call_soon``.
+    """
+    # resources a window shares between its sessions (see voice_cmd.SessionTab);
+    # everything else (cwd, executor, jobs, macros running) is per session
+    SHARED = ('history', 'journal', 'activity_log', 'dir_index', 'intents', 'grammar',
+              'latency', 'metrics_interval', 'results', 'macros', 'wake')
+
+    def __init__(self, voice_feedback=True, shared=None):
+        if shared is None:
+            self._init_shared(voice_feedback)
+        else:
+            for name in self.SHARED:
+                setattr(self, name, getattr(shared, name))
+        self._init_session()
+
+    def _init_shared(self, voice_feedback):
+        # Recognizer: created on first use (or by the warm-up thread) so
+        # speech_recognition is not imported before the front end is up
+        self.recognizer = None
+        self.microphone = None
+        self._recognizer_lock = threading.Lock()
+        self.voice_enabled = SPEECH_RECOGNITION_AVAILABLE and PYAUDIO_AVAILABLE
+
+        # TTS: the engine is created and driven on its own thread (see tts.py)
+        self.tts_enabled = TTS_AVAILABLE
+        self.tts = TTSWorker(lambda: pyttsx3.init(), cache_dir=TTS_CACHE_DIR, autostart=False) if (voice_feedback and TTS_AVAILABLE) else None
+        self.voice_feedback = self.tts is not None
+
+        self.is_listening = False
+        self.listen_thread = None
+
+        # de-duplicated, frequency-ranked history kept in SQLite and loaded
+        # by a background thread; also drives completion (see history.py)
+        self.history = self._open_history()
+        # JSON-lines journal written by a background thread; activity_log
+        # is only the recent window kept in memory (see journal.py)
+        self.journal = ActivityJournal(LOG_DIR)
+        self.activity_log = self.journal.recent
+
+        # Enhanced voice control parameters (exposed in UI)
+        self.energy_threshold = 300
+        self.phrase_time_limit = PHRASE_TIME_LIMIT
+        self.listen_timeout = 10
+        # voice-activity detection between capture and recognition (vad.py)
+        self.vad = VoiceActivityDetector(level=2, energy_threshold=self.energy_threshold)
+        # optional wake word ("shell, ...") in front of the recognizer (wakeword.py)
+        self.wake = WakeWordSpotter()
+        # NumPy cleanup of each segment before it is submitted (preprocess.py)
+        self.preprocessor = AudioPreprocessor()
+        # recognition engine: 'google' or 'sphinx' (if available)
+        self.recognition_engine = 'google'
+        # recognizer worker processes used while listening
+        self.recognizer_pool_size = 2
+        self.recognition_pipeline = None
+        # streaming backends run in-process on the capture thread
+        self.streaming_backends = {}
+        # limit offline engines to the command grammar ("Commands only")
+        self.constrained_decoding = True
+
+        # Folder/file names under INDEX_ROOTS, built after startup by
+        # warm_up() and kept current in the background (see dirindex.py)
+        self.dir_index = DirectoryIndex(INDEX_ROOTS + [os.getcwd()])
+
+        # Command table compiled once into a token trie (see intents.py)
+        self.intents = compile_commands()
+        # Grammar generated from the same table for constrained offline
+        # decoding; rebuilt lazily when commands or cwd change (grammar.py)
+        self.grammar = CommandGrammar(GRAMMAR_DIR)
+        self._grammar_dirty = True
+
+        # Per-stage latency (listen -> recognize -> map -> run_cmd -> job),
+        # shown in the status bar and exported to METRICS_DIR (see metrics.py)
+        self.latency = LatencyMetrics()
+        self.latency.on_update = lambda: self.call_soon(self._update_latency_stats)
+        self.metrics_interval = 15.0
+
+        # Results of read-only intents reused for their ttl (see resultcache.py)
+        self.results = ResultCache()
+
+        # Saved macros (see macros.py)
+        self.macros = MacroStore(MACRO_DIR)
+
+    def _init_session(self):
+        # Toast: notifier created on the first toast
+        self.toaster = None
+
+        # Track current working directory for navigation
+        self.cwd = os.getcwd()
+        # commands run in this session, oldest first (history.py keeps all of them)
+        self.session_history = []
+
+        # Alternatives requested from the engine and re-ranked against the
+        # command phrases and folder names (see rerank.py)
+        self.nbest = 5
+        self.ranker = CommandRanker(self.intents.commands, index=self.intents)
+        self._ranker_dirty = True
+
+        # Shell commands run on background workers (see executor.py), in
+        # one long-lived shell while it is free (see shellsession.py)
+        self.shell_session = ShellSession(cwd=self.cwd)
+        self.executor = CommandExecutor(max_workers=4, session=self.shell_session)
+        # copy/move run on their own threads with progress (see fileops.py)
+        self.fileops = FileOpEngine(max_workers=4, new_id=self.executor.new_id)
+        self.last_file_op = None
+        self.last_report = None   # Job of the last system report started
+        self._job_output_chars = {}
+        self._job_traces = {}     # job id -> Trace (metrics.py)
+        self._cache_fills = {}    # job id -> (key, ttl, generation, lines)
+        self._refresh = False     # set while mapping a "refresh <command>"
+        self._reports_unavailable = set()
+
+        # Scripts and macros running in this session (see macros.py)
+        self.macro_runs = []
+        self.macro_recording = None   # (name, [commands]) while recording
+
+    # --- front-end hooks ---
+    def call_soon(self, fn, *args):
+        """Run ``fn(*args)`` on the front end's UI thread."""
+        fn(*args)
+
+    def call_and_wait(self, fn, *args):
+        """From a worker thread: run ``fn(*args)`` via call_soon and return its result."""
+        done = threading.Event()
+        box = {}
+
+        def _call():
+            try:
+                box['value'] = fn(*args)
+            except Exception as e:
+                box['error'] = e
+            finally:
+                done.set()
+        self.call_soon(_call)
+        done.wait()
+        if 'error' in box:
+            raise box['error']
+        return box.get('value')
+
+    def print_output(self, text, newline=True):
+        raise NotImplementedError
+
+    def voice_output(self, text):
+        """Print a voice or microphone message where the user is looking (the focused session)."""
+        self.print_output(text)
+
+    def clear_output(self):
+        """Clear the output area."""
+
+    def set_status(self, text, fg=None):
+        """Show a one-line status (listening, processing, partial hypotheses)."""
+
+    def confirm(self, title, message):
+        return False
+
+    def quit(self):
+        """Leave the front end's main loop (called after 'exit')."""
+
+    def _update_vad_stats(self):
+        """Refresh the VAD statistics display."""
+
+    def _update_wake_stats(self):
+        """Refresh the wake-word statistics display."""
+
+    def _on_calibrated(self):
+        """Called on the UI thread after calibrate_mic updated energy_threshold."""
+
+    def _on_listening_changed(self):
+        """Called when is_listening flips."""
+
+    def _on_history_added(self, command):
+        """Called after a command is recorded in history."""
+
+    def _on_history_loaded(self):
+        """Called once the saved history has been read from disk."""
+
+    def _update_latency_stats(self):
+        """Refresh the latency summary after a command finished (see metrics.py)."""
+
+    def _update_cache_stats(self):
+        """Refresh the result-cache hit/miss display."""
+
+    def run_tab_command(self, command):
+        """Front ends with several sessions handle 'new tab', 'close tab' etc. here; True if handled."""
+        return False
+
+    def _open_history(self):
+        return CommandHistory(HISTORY_DB, on_loaded=lambda: self.call_soon(self._on_history_loaded))
+
+    # --- voice ---
+    def ensure_recognizer(self):
+        """Create and tune the sr.Recognizer on first use; returns None without voice support."""
+        if self.recognizer is not None or not self.voice_enabled or not sr:
+            return self.recognizer
+        with self._recognizer_lock:
+            if self.recognizer is None:
+                recognizer = sr.Recognizer()
+                # tuned parameters
+                recognizer.energy_threshold = self.energy_threshold
+                recognizer.dynamic_energy_threshold = True
+                # these attributes may not exist on all versions; guard
+                try:
+                    recognizer.dynamic_energy_adjustment_damping = 0.15
+                    recognizer.dynamic_energy_ratio = 1.5
+                except Exception:
+                    pass
+                recognizer.pause_threshold = 0.8
+                recognizer.operation_timeout = None
+                # phrase and non_speaking are optional
+                try:
+                    recognizer.phrase_threshold = 0.3
+                    recognizer.non_speaking_duration = 0.5
+                except Exception:
+                    pass
+                self.recognizer = recognizer
+        return self.recognizer
+
+    def warm_up(self, on_done=None):
+        """Import optional dependencies and build the recognizer off the UI thread."""
+        self.dir_index.start()
+        self.latency.start_export(METRICS_DIR, self.metrics_interval)
+
+        def _done():
+            self.ensure_recognizer()
+            if self.tts:
+                self.tts.start()
+            if on_done:
+                on_done()
+        return start_warmup(on_done=_done)
+
+    def calibrate_mic(self):
+        if not sr or self.ensure_recognizer() is None:
+            self.voice_output("[Calibrate] SpeechRecognition not available")
+            return
+        # Run a short calibration on a background thread to avoid blocking UI
+        def _cal():
+            try:
+                with sr.Microphone(sample_rate=16000) as src:
+                    self.call_soon(self.voice_output, "[Calibrate] Listening to ambient noise for 2s...")
+                    self._capture_noise_profile(src)
+                    self.recognizer.adjust_for_ambient_noise(src, duration=2)
+                    self.energy_threshold = getattr(self.recognizer, 'energy_threshold', self.energy_threshold)
+                    self.vad.energy_threshold = self.energy_threshold
+                    self.call_soon(self._on_calibrated)
+                    self.call_soon(self.voice_output, f"[Calibrate] Done. energy_threshold={self.energy_threshold}")
+            except Exception as e:
+                self.call_soon(self.voice_output, f"[Calibrate] Error: {e}")
+        threading.Thread(target=_cal, daemon=True).start()
+
+
+    def _capture_noise_profile(self, source, seconds=0.5):
+        """Record a little ambient audio as the noise gate's reference spectrum."""
+        if not self.preprocessor.available:
+            return
+        try:
+            chunks = int(source.SAMPLE_RATE * seconds / source.CHUNK) + 1
+            pcm = b''.join(source.stream.read(source.CHUNK) for _ in range(chunks))
+            self.preprocessor.set_noise_profile(pcm, source.SAMPLE_RATE, source.SAMPLE_WIDTH)
+        except Exception:
+            pass
+
+    def _on_engine_change(self, name):
+        self.recognition_engine = name
+        cls = get_backend_class(name)
+        if cls is not None and cls.streaming:
+            # load the model now rather than on the first phrase
+            threading.Thread(target=lambda: self._streaming_backend(name, self._backend_options(name)), daemon=True).start()
+
+    def reload_commands(self, commands):
+        """Swap in a new command table; the decoder grammar follows it."""
+        self.intents = compile_commands(commands)
+        self.grammar.set_commands(commands)
+        self._grammar_dirty = True
+        self.ranker = CommandRanker(commands, index=self.intents,
+                                    accept=self.ranker.accept, confirm=self.ranker.confirm)
+        self._ranker_dirty = True
+
+    def _backend_options(self, engine):
+        """Constructor options for ``engine``: a command grammar for offline engines when enabled."""
+        cls = get_backend_class(engine)
+        if cls is None or not cls.offline or not self.constrained_decoding:
+            return {}
+        if self._grammar_dirty:
+            self.grammar.set_slot_names(self.cwd_names())
+            self._grammar_dirty = False
+        try:
+            return self.grammar.decoder_options(engine)
+        except Exception as e:
+            self.call_soon(self.voice_output, f"[Voice] Grammar unavailable, using full vocabulary: {e}")
+            return {}
+
+    def _streaming_backend(self, name, options=None):
+        """Return the in-process instance of a streaming backend, warming it up on first use."""
+        options = options or {}
+        key = (name, repr(sorted(options.items())))
+        backend = self.streaming_backends.get(key)
+        if backend is None:
+            for old in [k for k in self.streaming_backends if k[0] == name]:
+                self.streaming_backends.pop(old).shutdown()
+            backend = create_backend(name, **options)
+            self.streaming_backends[key] = backend
+        try:
+            backend.warm_up()
+        except RecognitionError as e:
+            self.call_soon(self.voice_output, f"[Voice] ERROR: {e}")
+        return backend
+
+    def speak(self, text, interrupt=False):
+        # queued on the TTS worker; never blocks the caller
+        if self.voice_feedback and self.tts:
+            try:
+                self.tts.say(text, interrupt=interrupt)
+            except Exception:
+                pass
+
+    def toast(self, title, msg, duration=4):
+        try:
+            if self.toaster is None and TOAST_AVAILABLE:
+                self.toaster = ToastNotifier()
+            if self.toaster:
+                self.toaster.show_toast(title, msg, duration=duration, threaded=True)
+        except Exception:
+            pass
+
+    def update_cwd(self, new_path=None):
+        if new_path:
+            self.cwd = new_path
+            self._grammar_dirty = True
+            self._ranker_dirty = True
+
+    def start_listening(self):
+        if not self.voice_enabled or self.is_listening:
+            return
+        self.is_listening = True
+        self.set_status("Status: LISTENING | Speak clearly for best accuracy", COLORS['warn'])
+        self._on_listening_changed()
+
+        self.listen_thread = threading.Thread(target=self.high_accuracy_listen_loop, daemon=True)
+        self.listen_thread.start()
+
+        self.voice_output("\n[Voice] High accuracy mode activated")
+        self.voice_output("[Voice] Listening started with 90%+ accuracy settings...")
+        self.log_activity("VOICE", "High accuracy listening started")
+
+    def stop_listening(self):
+        self.is_listening = False
+        self.set_status("Status: Ready ", COLORS['ok'])
+        self._on_listening_changed()
+        self.voice_output("[Voice] Listening stopped.")
+        self.log_activity("VOICE", "Listening stopped")
+
+    def high_accuracy_listen_loop(self):
+        if not sr or self.ensure_recognizer() is None:
+            return
+        with sr.Microphone(sample_rate=16000) as source:
+            self.call_soon(self.voice_output, "[Voice] Calibrating for ambient noise...")
+            self.call_soon(self.set_status, "Status: CALIBRATING (Please wait 2 seconds)...", "#00FFFF")
+            self._capture_noise_profile(source)
+            try:
+                self.recognizer.adjust_for_ambient_noise(source, duration=2)
+            except Exception:
+                pass
+            self.vad.energy_threshold = self.recognizer.energy_threshold
+            self.call_soon(self.voice_output, "[Voice] Calibration complete!")
+            self.call_soon(self.voice_output, "[Voice] Ready! Speak your commands clearly...")
+            self.call_soon(self.set_status, "Status: LISTENING | Speak now!", "#00FF00")
+
+            # Capture only: phrases are decoded by the recognizer process
+            # pool while the mic keeps being read (see recognition.py)
+            pipeline = RecognitionPipeline(self._on_recognition_result, pool_size=self.recognizer_pool_size,
+                                           engine=self.recognition_engine,
+                                           options=self._backend_options(self.recognition_engine),
+                                           nbest=self.nbest).start()
+            self.recognition_pipeline = pipeline
+            try:
+                while self.is_listening:
+                    try:
+                        self.call_soon(self.set_status, "Status: LISTENING | Speak clearly...", COLORS['warn'])
+                        engine = getattr(self, 'recognition_engine', 'google')
+                        cls = get_backend_class(engine)
+                        if cls is not None and cls.streaming:
+                            self._listen_streaming(source, engine)
+                            continue
+                        started = time.perf_counter()
+                        audio = self.recognizer.listen(source, timeout=getattr(self, 'listen_timeout', 10), phrase_time_limit=getattr(self, 'phrase_time_limit', PHRASE_TIME_LIMIT))
+                        trace = self.latency.trace()
+                        self.latency.observe('listen', trace.start - started)
+                        # VAD: trim silence, split multi-phrase buffers, drop noise
+                        self.vad.energy_threshold = self.recognizer.energy_threshold
+                        segments = self.vad.split(audio.frame_data, audio.sample_rate, audio.sample_width)
+                        trace.mark('vad')
+                        self.call_soon(self._update_vad_stats)
+                        if not segments:
+                            continue
+                        options = self._backend_options(engine)
+                        for i, segment in enumerate(segments):
+                            # every phrase after the first starts its own trace here
+                            trace = trace if i == 0 else self.latency.trace()
+                            if self.wake.enabled:
+                                segment = self._wake_gate(segment, audio.sample_rate, audio.sample_width)
+                                trace.mark('wake')
+                                if segment is None:
+                                    continue
+                            pcm, rate = self.preprocessor.process(segment, audio.sample_rate, audio.sample_width)
+                            trace.mark('preprocess')
+                            if pipeline.submit(sr.AudioData(pcm, rate, audio.sample_width), engine, options, context=trace) is None:
+                                self.call_soon(self.voice_output, "[Voice] Recognizer busy - phrase skipped")
+                        self.call_soon(self.set_status, f"Status: PROCESSING ({pipeline.pending} pending)...", "#00FFFF")
+                    except (sr.WaitTimeoutError, PhraseTimeout):
+                        continue
+                    except Exception as e:
+                        self.call_soon(self.voice_output, f"[Voice] ERROR: {str(e)}")
+                        break
+            finally:
+                pipeline.shutdown()
+                self.recognition_pipeline = None
+
+    def _listen_streaming(self, source, engine):
+        # decode while capturing; partial hypotheses go to the status bar
+        backend = self._streaming_backend(engine, self._backend_options(engine))
+        started = time.perf_counter()
+        try:
+            hypotheses = stream_phrase(
+                source, backend,
+                energy_threshold=self.recognizer.energy_threshold,
+                pause_threshold=self.recognizer.pause_threshold,
+                listen_timeout=getattr(self, 'listen_timeout', 10),
+                phrase_time_limit=getattr(self, 'phrase_time_limit', PHRASE_TIME_LIMIT),
+                on_partial=lambda partial: self.call_soon(self.set_status, f"Status: HEARING: {partial}", "#00FFFF"),
+                keep_going=lambda: self.is_listening,
+                is_speech=(lambda chunk: self.vad.is_speech(chunk, source.SAMPLE_RATE, source.SAMPLE_WIDTH)) if self.vad.enabled else None,
+                nbest=self.nbest,
+            )
+        except RecognitionError as e:
+            self._on_recognition_result(None, 'request', str(e))
+            return
+        # decoding overlapped the speech, so the phrase counts as 'listen' only
+        trace = self.latency.trace()
+        self.latency.observe('listen', trace.start - started)
+        if self.is_listening:
+            self._on_recognition_result(None, 'ok' if hypotheses else 'unknown', hypotheses, trace)
+
+    def _wake_gate(self, segment, sample_rate, sample_width):
+        # capture thread: the audio after the wake word, or None to skip the phrase
+        try:
+            command = self.wake.gate(segment, sample_rate, sample_width)
+        except Exception as e:
+            self.wake.enabled = False
+            self.call_soon(self.voice_output, f"[Voice] Wake word off - keyword spotter failed: {e}")
+            command = segment
+        if command is None and self.wake.awake:
+            self.call_soon(self.set_status, "Status: AWAKE | Say a command...", "#00FFFF")
+        self.call_soon(self._update_wake_stats)
+        return command
+
+    def _wake_filter(self, hypotheses, streamed):
+        """Strip the wake word from the engine's alternatives; None if nothing is left to run."""
+        if isinstance(hypotheses, str):
+            hypotheses = [(hypotheses, None)]
+        if streamed:
+            # streaming engines heard the whole phrase: check it for the wake word here
+            allowed = self.wake.gate_text(hypotheses[0][0]) is not None
+            self.call_soon(self._update_wake_stats)
+            if not allowed:
+                return None
+        stripped = [(self.wake.strip(text), conf) for text, conf in hypotheses]
+        return [(text, conf) for text, conf in stripped if text] or None
+
+    def set_wake_word(self, enabled, phrase=None):
+        """Turn the wake-word gate on or off (it needs pocketsphinx); returns whether it is on."""
+        if phrase:
+            self.wake.set_phrase(phrase)
+        if enabled and not self.wake.available:
+            self.print_output("Wake word needs pocketsphinx (pip install pocketsphinx)")
+            enabled = False
+        elif enabled:
+            try:
+                self.wake.load()
+            except Exception as e:
+                self.print_output(f"ERROR: Wake word '{self.wake.phrase}' cannot be used: {e}")
+                enabled = False
+        self.wake.enabled = bool(enabled)
+        self._update_wake_stats()
+        return self.wake.enabled
+
+    def set_wake_threshold(self, threshold):
+        """Keyword-spotting threshold of the wake word (None: the phrase's default); ValueError if out of range."""
+        self.wake.set_threshold(threshold)
+        self._update_wake_stats()
+        return self.wake.kws_threshold
+
+    def _on_recognition_result(self, seq, status, payload, trace=None):
+        # called in capture order (pipeline thread or capture thread); hop to the UI thread
+        pipeline = self.recognition_pipeline
+        if trace is None and seq is not None and pipeline is not None:
+            trace = pipeline.pop_context(seq)
+        if trace is not None and seq is not None:
+            decoded = trace.mark('recognize')
+            if self.wake.enabled:
+                self.wake.note_decode(decoded)
+        if status == 'ok' and payload and self.wake.enabled:
+            payload = self._wake_filter(payload, streamed=seq is None)
+            if not payload:
+                return
+        if status == 'ok':
+            if payload:
+                self.call_soon(self._run_hypotheses, payload, trace)
+        elif status == 'unknown':
+            self.call_soon(self.voice_output, "[Voice] Could not understand - please speak more clearly")
+            self.call_soon(self.voice_output, "[Voice] Tips: Speak at normal pace, reduce background noise")
+        elif status == 'request':
+            self.call_soon(self.voice_output, f"[Voice] ERROR: {payload}")
+            cls = get_backend_class(getattr(self, 'recognition_engine', 'google'))
+            if cls is None or not cls.offline:
+                self.call_soon(self.voice_output, "[Voice] Check internet connection")
+            self.call_soon(self.voice_output, "[Voice] Use manual text input as backup")
+            self.call_soon(self.stop_listening)
+        else:
+            self.call_soon(self.voice_output, f"[Voice] ERROR: {payload}")
+
+    def _run_hypotheses(self, hypotheses, trace=None):
+        """Run the best executable reading of the engine's alternatives (see rerank.py)."""
+        if trace is not None:
+            trace.mark('dispatch')
+        if isinstance(hypotheses, str):
+            hypotheses = [(hypotheses, None)]
+        heard = hypotheses[0][0]
+        self.print_output(f"[Voice] Recognized: {heard}")
+        if self._ranker_dirty:
+            self.ranker.set_names(self.cwd_names() + self.macros.names())
+            self._ranker_dirty = False
+        action, best = self.ranker.choose(hypotheses)
+        if trace is not None:
+            trace.mark('rerank')
+        text = heard
+        if action == 'run':
+            text = best.text
+        elif action == 'confirm':
+            if not self.confirm("Confirm command", f"Heard '{heard}'.\nRun '{best.text}'?"):
+                self.print_output(f"[Voice] Skipped '{best.text}' (score {best.score:.2f})")
+                return
+            if trace is not None:
+                trace.skip()   # time spent in the dialog is not latency
+            text = best.text
+        if action != 'fallback' and text.lower() != heard.lower():
+            self.print_output(f"[Voice] Using: {text} (alternative {best.rank + 1}, score {best.score:.2f})")
+        self.process_command(text, "voice", trace)
+
+    def process_command(self, command, source="manual", trace=None):
+        """
+        Run one typed, spoken or scripted command. ``trace`` carries the
+        voice stages timed so far (metrics.py); typed commands start one here.
+        """
+        if trace is None:
+            trace = self.latency.trace()
+        command = command.strip()
+        self.print_output(f"\n> {command}")
+        # record to history UI
+        try:
+            self.history.add(command)
+            self.session_history.append(command)
+            if len(self.session_history) > 2000:
+                del self.session_history[:-1000]
+            self._on_history_added(command)
+        except Exception:
+            pass
+        self.log_activity(source.upper(), command)
+        # before the exit intent, which would take "close tab" as "close"
+        if self.run_tab_command(command):
+            return
+        command, refresh = self._split_refresh(command)
+
+        # Exit flow
+        match = self.intents.match(command)
+        if match is not None and match.intent.name == 'exit':
+            self.exit_session()
+            return
+
+        if self.macro_recording is not None and (match is None or match.intent.name not in NESTED):
+            self.macro_recording[1].append(command)
+
+        if self.run_meta_command(command):
+            return
+
+        # Map then execute
+        self._refresh = refresh
+        try:
+            system_cmd, is_shell = self.map_to_cmd(command)
+        finally:
+            self._refresh = False
+        trace.mark('map')
+        if match is None or not match.intent.parallel:
+            # raw or state-changing command: cached answers may be stale now
+            self.results.invalidate()
+        if not system_cmd:
+            trace.finish()
+            # a matched handler has already reported why nothing runs
+            if match is None or match.intent.handler is None:
+                self.print_output("ERROR: Command not recognized. Type 'help' for commands.")
+                self.speak("Command not recognized")
+            return
+
+        ttl = match.intent.ttl if match is not None else None
+        if ttl:
+            key = command_key(system_cmd, self.cwd)
+            cached = self.results.get(key, refresh)
+            self._update_cache_stats()
+            if cached is not None:
+                self._replay_cached(command, system_cmd, cached)
+                trace.mark('run_cmd')
+                trace.finish()
+                return
+
+        self.print_output(f"Executing: {system_cmd}")
+        self.log_activity("EXECUTE", system_cmd)
+        job = self.run_cmd(system_cmd, is_shell=is_shell)
+        trace.mark('run_cmd')
+        if job is not None:
+            self._job_traces[job.id] = trace
+            if ttl:
+                self._cache_fills[job.id] = (key, ttl, self.results.generation, [])
+        else:
+            trace.finish()
+
+    REFRESH_PREFIXES = ('force refresh ', 'refresh ')
+
+    def _split_refresh(self, command):
+        """'refresh disk space' -> ('disk space', True): run it even if a cached result exists."""
+        low = command.lower()
+        for prefix in self.REFRESH_PREFIXES:
+            if low.startswith(prefix) and command[len(prefix):].strip():
+                return command[len(prefix):].strip(), True
+        return command, False
+
+    def _replay_cached(self, command, system_cmd, cached):
+        self.log_activity("CACHED", system_cmd)
+        for line in cached.value:
+            self.print_output(line)
+        self.print_output(f"OK (cached {cached.age():.0f}s ago - say 'refresh {command}' to run it again)")
+        self.speak("Command executed successfully")
+
+    def run_meta_command(self, command):
+        """Handle the local meta-commands (save log, jobs, cache, latency, wake word, cancel, clear); True if handled."""
+        low = command.lower()
+        if low == 'save log':
+            self.save_log()
+            return True
+        if low == 'jobs':
+            self.list_jobs()
+            return True
+        if low in ('cache', 'show cache'):
+            self.print_output(self.results.describe())
+            return True
+        if low == 'clear cache':
+            self.results.invalidate()
+            self.print_output("Result cache cleared")
+            return True
+        if low in ('wake word', 'show wake word'):
+            self.print_output(self.wake.stats_text())
+            return True
+        if low in ('wake word on', 'wake word off'):
+            if self.set_wake_word(low.endswith('on')):
+                self.print_output(f"Wake word on: say '{self.wake.phrase}, <command>'")
+            else:
+                self.print_output("Wake word off")
+            return True
+        if low.startswith('set wake word '):
+            on = self.set_wake_word(True, command[len('set wake word '):])
+            self.print_output(f"Wake word is now '{self.wake.phrase}'" + ('' if on else ' (off)'))
+            return True
+        if low.startswith('set wake threshold '):
+            value = low[len('set wake threshold '):].strip()
+            try:
+                threshold = self.set_wake_threshold(None if value in ('auto', 'default') else float(value))
+            except ValueError:
+                self.print_output("Wake threshold: give a number between 0 and 1 (e.g. 1e-5) or 'auto'")
+            else:
+                self.print_output(f"Wake threshold is now {threshold:g}"
+                                  + (" (default for the phrase)" if self.wake.threshold is None else ''))
+            return True
+        if low in ('latency', 'show latency'):
+            self.print_output(self.latency.table())
+            return True
+        if low.startswith('export latency'):
+            self.export_latency(low[len('export latency'):].strip())
+            return True
+        if low == 'cancel' or low.startswith('cancel '):
+            self.cancel_jobs(command[len('cancel'):].strip().lower())
+            return True
+        if low == 'clear history':
+            self.history.clear()
+            self._on_history_loaded()
+            self.print_output("History cleared")
+            return True
+        if low.startswith('clear'):
+            self.clear_screen()
+            return True
+        return False
+
+    def export_latency(self, fmt=''):
+        """Write the latency numbers to METRICS_DIR as JSON lines and/or Prometheus text."""
+        paths = []
+        try:
+            if fmt in ('', 'json', 'jsonl'):
+                paths.append(self.latency.export_jsonl(os.path.join(METRICS_DIR, 'latency.jsonl')))
+            if fmt in ('', 'prometheus', 'prom'):
+                paths.append(self.latency.export_prometheus(os.path.join(METRICS_DIR, 'latency.prom')))
+        except OSError as e:
+            self.print_output(f"ERROR: Could not export latency: {e}")
+            return
+        if not paths:
+            self.print_output("Usage: export latency [json | prometheus]")
+            return
+        for path in paths:
+            self.print_output(f"Latency exported: {path}")
+
+    def sanitize_filename(self, name):
+        # Reduce path traversal and strip quotes
+        name = name.strip().strip('"').strip("'")
+        # If it's a relative simple name, allow; otherwise normalize
+        # Keep spaces intact; forbid redirection/special shell chars
+        forbidden = ['&', '|', ';', '>', '<', '`']
+        for ch in forbidden:
+            name = name.replace(ch, '')
+        return name
+
+    def run_cmd(self, cmd, is_shell=True):
+        """
+        Execute a command in current working directory.
+        Launchers (start/explorer) are fired off without waiting; other
+        commands are handed to the background executor and their output is
+        streamed. Returns the Job for waited-on commands, else None.
+        """
+        try:
+            # Built-in launchers
+            if isinstance(cmd, str) and (cmd.startswith('start ') or cmd.startswith('explorer ')):
+                self.executor.submit(cmd, cwd=self.cwd, shell=True, timeout=15,
+                                     on_exit=lambda job: self.call_soon(self._on_launch_exit, job))
+                self.print_output("OK - Application launched")
+                self.toast("Voice CMD", "Application launched")
+                self.speak("Application launched")
+                return None
+
+            job = self.executor.submit(
+                cmd, cwd=self.cwd, shell=is_shell, timeout=60,
+                on_output=lambda job, stream, line: self.call_soon(self._on_job_output, job, stream, line),
+                on_exit=lambda job: self.call_soon(self._on_job_exit, job),
+            )
+            self._job_output_chars[job.id] = 0
+            if len(self.executor.running_jobs()) > 1:
+                self.print_output(f"[job {job.id}] started (type 'cancel {job.id}' to stop)")
+            return job
+
+        except Exception as e:
+            self.print_output(f"ERROR: {str(e)}")
+            self.toast("Voice CMD", "Unexpected error")
+            self.speak("Unexpected error")
+            return None
+
+    def _on_job_output(self, job, stream, line):
+        used = self._job_output_chars.get(job.id, 0)
+        if used > 12000:
+            return
+        used += len(line) + 1
+        self._job_output_chars[job.id] = used
+        if used > 12000:
+            self.print_output("... (output truncated)")
+            self._cache_fills.pop(job.id, None)   # never replay a truncated answer
+            return
+        self.print_output(line)
+        fill = self._cache_fills.get(job.id)
+        if fill is not None:
+            fill[3].append(line)
+
+    def _on_launch_exit(self, job):
+        if job.error is not None or job.timed_out or (job.returncode or 0) != 0:
+            self.print_output(f"ERROR: Could not launch '{job.cmd}'")
+
+    def follow_job_cwd(self, job):
+        """Follow a raw command that changed the session's folder (pushd, cd /d ...)."""
+        if (job.final_cwd and job.cwd == self.cwd and os.path.isdir(job.final_cwd)
+                and os.path.normcase(os.path.abspath(job.final_cwd)) != os.path.normcase(os.path.abspath(self.cwd))):
+            self.update_cwd(os.path.abspath(job.final_cwd))
+            self.print_output(f"Directory changed to: {self.cwd}")
+
+    def _on_job_exit(self, job):
+        self._job_output_chars.pop(job.id, None)
+        trace = self._job_traces.pop(job.id, None)
+        if trace is not None:
+            trace.mark('execute')
+            trace.finish()
+        fill = self._cache_fills.pop(job.id, None)
+        if fill is None:
+            # an arbitrary command may have changed files or processes
+            self.results.invalidate()
+        elif job.returncode == 0 and not (job.cancelled or job.timed_out or job.error is not None):
+            key, ttl, generation, lines = fill
+            self.results.put(key, lines, ttl, generation)
+        # the command may have created or removed entries
+        if job.cwd:
+            self.dir_index.note_changed(job.cwd)
+        self.follow_job_cwd(job)
+        if job.cancelled:
+            self.print_output(f"[job {job.id}] cancelled")
+            self.speak("Command cancelled")
+        elif job.timed_out:
+            self.print_output("ERROR: Command timed out")
+            self.toast("Voice CMD", "Command timed out")
+            self.speak("Command timed out")
+        elif job.error is not None:
+            self.print_output(f"ERROR: {str(job.error)}")
+            self.toast("Voice CMD", "Unexpected error")
+            self.speak("Unexpected error")
+        elif job.returncode == 0:
+            self.print_output("OK")
+            self.toast("Voice CMD", "Command executed successfully")
+            self.speak("Command executed successfully")
+        else:
+            self.print_output(f"ERROR: Exit code {job.returncode}")
+            self.toast("Voice CMD", "Command failed")
+            self.speak("Command failed")
+
+    def list_jobs(self):
+        jobs = self.executor.running_jobs()
+        ops = self.fileops.running()
+        if not jobs and not ops:
+            self.print_output("No running jobs")
+        for job in jobs:
+            state = f"{time.time() - job.started:.1f}s" if job.started else "queued"
+            self.print_output(f"[job {job.id}] {job.cmd}  ({state})")
+        for op in ops:
+            self.print_output(f"[job {op.id}] {op.describe()}")
+
+    def cancel_jobs(self, which=None):
+        """Cancel one job by id, or every running job when ``which`` is None/'all'."""
+        if which in (None, '', 'all'):
+            runs = [run for run in self.macro_runs if run.running]
+            for run in runs:
+                run.cancel()
+            ids = self.executor.cancel_all() + self.fileops.cancel_all()
+            if not ids and not runs:
+                self.print_output("No running jobs")
+            return
+        try:
+            job_id = int(which)
+        except ValueError:
+            self.print_output("Usage: cancel <job id> | cancel all")
+            return
+        if not self.executor.cancel(job_id) and not self.fileops.cancel(job_id):
+            self.print_output(f"No running job {job_id}")
+
+    def map_to_cmd(self, voice):
+        """
+        Map human or voice command to an actual command string.
+        Returns (cmd_string, is_shell_bool).
+        """
+        v = voice.lower().strip()
+        match = self.intents.match(v)
+        if match is None:
+            return self._intent_passthrough(v)
+        it = match.intent
+        if it.handler is None:
+            return it.command
+        return getattr(self, it.handler)(v, match)
+
+    # --- intent handlers (see intents.COMMANDS) ---
+    def _intent_help(self, v, match):
+        self.print_output("""
+Available Commands:
+  File ops:
+    create file <name>           - Create a file (adds .txt if no extension)
+    open file <name>             - Open a file with default app
+    delete file <name>           - Delete a file (with confirmation)
+    rename <old> to <new>        - Rename a file or folder
+    move <src> to <dst>          - Move file/folder
+    copy <src> to <dst>          - Copy file/folder
+  Directory ops:
+    list files                   - dir
+    show files                   - dir
+    create directory <name>      - mkdir
+    make folder <name>           - mkdir
+    go to desktop/downloads/docs - quick jump
+    go to <path or folder>       - change directory if exists
+    cd <path>                    - change directory
+    go up                        - cd ..
+  System info:
+    show processes               - top processes by memory
+    kill process <name>          - taskkill /f /im <name>.exe (confirm)
+    task manager                 - start taskmgr
+    system information           - host, OS, CPUs, memory, uptime
+    memory usage                 - RAM and swap in use
+    disk space                   - size and free space per drive
+    battery status               - charge and time left
+    (add "json" to any of the five above for JSON output)
+    network info                 - ipconfig /all
+  Apps:
+    calculator/notepad/paint     - launch
+  Time/date:
+    what time is it              - time /t
+    what is the date             - date /t
+  Jobs:
+    jobs                         - list running commands
+    cancel <id> / cancel all     - stop a running command (cancel all also stops macros)
+    refresh <command>            - run a query again instead of reusing its recent result
+    cache / clear cache          - show or drop reused results (hits and misses)
+    latency                      - p50/p95/p99 of each stage (listen ... execute)
+    export latency [json|prometheus] - write them under ~/.speakshell/metrics
+  Scripts and macros:
+    run script <file>            - run a file of commands (one per line) as a batch
+    record macro <name>          - record the following commands ...
+    stop recording               - ... and save them as a macro
+    run macro <name>             - replay a saved macro
+    list macros                  - show saved macros
+  Listening:
+    wake word on / off           - only decode phrases that start with "shell, ..."
+    set wake word <phrase>       - use another wake word
+    set wake threshold <n|auto>  - keyword-spotting threshold (smaller wakes more easily)
+    wake word                    - phrases ignored and decode time saved so far
+  Tabs (window only):
+    new tab / close tab          - open a session in the current folder / close this one
+    next tab / previous tab      - switch sessions (or: tab <number>)
+  Misc:
+    save log, clear screen, clear history, exit
+  Raw CMD:
+    say any Windows command listed in Microsoft docs; it will be passed through safely.
+""")
+        return None, True
+
+    def _intent_exit(self, v, match):
+        return 'echo Exiting...', True
+
+    def _intent_passthrough(self, v):
+        # Raw Windows command passthrough (safe-ish)
+        forbidden = ['&', '|', ';', '>', '<', '`']
+        if not any(ch in v for ch in forbidden):
+            return v, True
+        return None, True
+
+    def _intent_cd(self, v, match):
+        path = v[match.end:].strip().strip('"')
+        if not path:
+            return self._intent_passthrough(v)
+        resolved = self.resolve_path(path)
+        if os.path.isdir(resolved):
+            self.update_cwd(resolved)
+            self.print_output(f"Directory changed to: {self.cwd}")
+            self.speak("Directory changed")
+            return 'dir', True
+        else:
+            self.print_output("ERROR: Directory not found")
+            self.speak("Directory not found")
+            return None, True
+
+    def _intent_go_up(self, v, match):
+        parent = os.path.abspath(os.path.join(self.cwd, '..'))
+        if os.path.isdir(parent):
+            self.update_cwd(parent)
+            self.print_output(f"Directory changed to: {self.cwd}")
+            self.speak("Directory changed")
+            return 'dir', True
+        else:
+            self.print_output("ERROR: Could not go up")
+            self.speak("Could not go up")
+            return None, True
+
+    def _intent_go_to(self, v, match):
+        # "go to <path or folder>"
+        name = v[match.end:].strip().strip('"')
+        if not name:
+            return self._intent_passthrough(v)
+        resolved = self.resolve_path(name)
+        if os.path.isdir(resolved):
+            self.update_cwd(resolved)
+            self.print_output(f"Directory changed to: {self.cwd}")
+            self.speak("Directory changed")
+            return 'dir', True
+        else:
+            # try relative in cwd
+            maybe = os.path.join(self.cwd, name)
+            if os.path.isdir(maybe):
+                self.update_cwd(os.path.abspath(maybe))
+                self.print_output(f"Directory changed to: {self.cwd}")
+                self.speak("Directory changed")
+                return 'dir', True
+            # then any indexed folder with that (or a similar) name
+            found = self.dir_index.resolve(name, near=self.cwd)
+            if found and os.path.isdir(found):
+                self.update_cwd(found)
+                self.print_output(f"Directory changed to: {self.cwd}")
+                self.speak("Directory changed")
+                return 'dir', True
+            if not self.dir_index.ready.is_set():
+                self.print_output("(folder index is still being built)")
+            self.print_output("ERROR: Target directory not found")
+            self.speak("Target directory not found")
+            return None, True
+
+    QUICK_JUMPS = {
+        'go_desktop': '%USERPROFILE%\\Desktop',
+        'go_downloads': '%USERPROFILE%\\Downloads',
+        'go_documents': '%USERPROFILE%\\Documents',
+    }
+
+    def _intent_quick_jump(self, v, match):
+        return self.change_dir_quick(self.QUICK_JUMPS[match.intent.name])
+
+    def _intent_create_file(self, v, match):
+        filename = match.param
+        if filename:
+            filename = self.sanitize_filename(filename)
+            if '.' not in filename:
+                filename += '.txt'
+            # Create safely using Python instead of shell
+            try:
+                open(os.path.join(self.cwd, filename), 'a', encoding='utf-8').close()
+                self.print_output(f"Created file: {filename}")
+                self.speak("File created")
+                return 'dir', True
+            except Exception as e:
+                self.print_output(f"ERROR: {e}")
+                self.speak("Failed to create file")
+                return None, True
+        return None, True
+
+    def _intent_open_file(self, v, match):
+        filename = match.param
+        if filename:
+            filename = self.sanitize_filename(filename)
+            full = os.path.join(self.cwd, filename)
+            if not os.path.exists(full):
+                found = self.dir_index.lookup(filename, near=self.cwd, limit=1)
+                if found and os.path.exists(found[0].path):
+                    full = found[0].path
+                    self.print_output(f"Found: {full}")
+            if os.path.exists(full):
+                return f'start "" "{full}"', True
+            else:
+                self.print_output("ERROR: File not found")
+                self.speak("File not found")
+                return None, True
+        return None, True
+
+    def _intent_delete_file(self, v, match):
+        filename = match.param
+        if filename:
+            filename = self.sanitize_filename(filename)
+            full = os.path.join(self.cwd, filename)
+            if os.path.exists(full) and os.path.isfile(full):
+                if self.confirm("Confirm Delete", f"Delete file '{filename}'?"):
+                    try:
+                        os.remove(full)
+                        self.print_output(f"Deleted file: {filename}")
+                        self.speak("File deleted")
+                        return 'dir', True
+                    except Exception as e:
+                        self.print_output(f"ERROR: {e}")
+                        self.speak("Failed to delete file")
+                        return None, True
+                else:
+                    self.print_output("Delete cancelled")
+                    return None, True
+            else:
+                self.print_output("ERROR: File not found")
+                self.speak("File not found")
+                return None, True
+        return None, True
+
+    def _split_src_dst(self, v, match):
+        # "<verb> src to dst", falling back to two bare names
+        rest = v[match.end:].strip()
+        if ' to ' in f" {rest} ":
+            src, dst = f" {rest} ".split(' to ', 1)
+            return src.strip(), dst.strip()
+        toks = rest.split()
+        if len(toks) >= 2:
+            return toks[0], toks[1]
+        return None, None
+
+    def _intent_rename(self, v, match):
+        # Expect "rename old to new"
+        old, new = self._split_src_dst(v, match)
+        if old and new:
+            old = self.sanitize_filename(old.strip().strip('"'))
+            new = self.sanitize_filename(new.strip().strip('"'))
+            src = os.path.join(self.cwd, old)
+            dst = os.path.join(self.cwd, new)
+            if os.path.exists(src):
+                try:
+                    os.replace(src, dst)
+                    self.print_output(f"Renamed '{old}' to '{new}'")
+                    self.speak("Rename completed")
+                    return 'dir', True
+                except Exception as e:
+                    self.print_output(f"ERROR: {e}")
+                    self.speak("Rename failed")
+                    return None, True
+            else:
+                self.print_output("ERROR: Source not found")
+                self.speak("Source not found")
+                return None, True
+        self.print_output("Usage: rename <old> to <new>")
+        return None, True
+
+    def _intent_move(self, v, match):
+        # "move src to dst"
+        return self._file_op_intent('move', v, match)
+
+    def _intent_copy(self, v, match):
+        # "copy src to dst"
+        return self._file_op_intent('copy', v, match)
+
+    def _file_op_intent(self, kind, v, match):
+        src, dst = self._split_src_dst(v, match)
+        if src and dst:
+            src = self.sanitize_filename(src.strip().strip('"'))
+            dst = self.sanitize_filename(dst.strip().strip('"'))
+            srcp = os.path.join(self.cwd, src)
+            dstp = os.path.join(self.cwd, dst)
+            if os.path.exists(srcp):
+                self.start_file_op(kind, srcp, dstp)
+                return None, True
+            else:
+                self.print_output("ERROR: Source not found")
+                self.speak("Source not found")
+                return None, True
+        self.print_output(f"Usage: {kind} <src> to <dst>")
+        return None, True
+
+    def start_file_op(self, kind, src, dst):
+        """Copy or move in the background; progress goes to the status line."""
+        try:
+            op = self.fileops.submit(
+                kind, src, dst,
+                on_progress=lambda op: self.call_soon(self.set_status, f"Status: [job {op.id}] {op.describe()}"),
+                on_exit=lambda op: self.call_soon(self._on_file_op_exit, op),
+            )
+        except Exception as e:
+            self.print_output(f"ERROR: {e}")
+            self.speak(f"{kind.capitalize()} failed")
+            return None
+        self.last_file_op = op
+        verb = 'Copying' if kind == 'copy' else 'Moving'
+        self.print_output(f"[job {op.id}] {verb} '{os.path.basename(src)}' to '{op.dst}' "
+                          f"(type 'cancel {op.id}' to stop)")
+        return op
+
+    def _on_file_op_exit(self, op):
+        self.results.invalidate()
+        for path in (op.src, op.dst):
+            self.dir_index.note_changed(os.path.dirname(path) or self.cwd)
+        if not self.is_listening:
+            self.set_status("Status: Ready ", COLORS['ok'])
+        name = os.path.basename(op.src)
+        done = 'Moved' if op.kind == 'move' else 'Copied'
+        if op.cancelled:
+            self.print_output(f"[job {op.id}] {op.kind} of '{name}' cancelled")
+            self.speak(f"{op.kind.capitalize()} cancelled")
+        elif op.error is not None:
+            self.print_output(f"ERROR: {op.kind} of '{name}' failed: {op.error}")
+            self.toast("Voice CMD", f"{op.kind.capitalize()} failed")
+            self.speak(f"{op.kind.capitalize()} failed")
+        else:
+            if op.fast_path == 'rename':
+                detail = "renamed in place"
+            else:
+                detail = (f"{op.done_files} files, {sysinfo.fmt_bytes(op.done_bytes)} in {op.elapsed():.1f}s, "
+                          f"{sysinfo.fmt_bytes(op.throughput())}/s")
+                if op.links:
+                    detail += f", {op.links} links"
+            self.print_output(f"{done} '{name}' to '{op.dst}' ({detail})")
+            for path, reason in op.skipped:
+                self.print_output(f"  not copied: {path} ({reason})")
+            self.toast("Voice CMD", f"{op.kind.capitalize()} completed")
+            self.speak(f"{op.kind.capitalize()} completed")
+
+    def _intent_create_directory(self, v, match):
+        if match.phrase == 'mkdir':
+            dirname = v[match.end:].strip().strip('"')
+        else:
+            dirname = match.param
+        if dirname:
+            dirname = self.sanitize_filename(dirname)
+            try:
+                os.makedirs(os.path.join(self.cwd, dirname), exist_ok=True)
+                self.print_output(f"Directory created: {dirname}")
+                self.speak("Directory created")
+                return 'dir', True
+            except Exception as e:
+                self.print_output(f"ERROR: {e}")
+                self.speak("Failed to create directory")
+                return None, True
+        return None, True
+
+    def _intent_system_report(self, v, match):
+        # answered in-process (see sysinfo.py); the shell command is the fallback
+        name = match.intent.name
+        if name in self._reports_unavailable:
+            return match.intent.command
+        cached = self.results.get(('report', name), self._refresh)
+        self._update_cache_stats()
+        if cached is not None:
+            self._show_report(v, cached.value)
+            self.print_output(f"(cached {cached.age():.0f}s ago - say 'refresh {v}' to read it again)")
+            return None, True
+        # psutil can take hundreds of milliseconds (process owners on
+        # Windows), so the report is read on the executor
+        generation = self.results.generation
+        self.last_report = self.run_call(sysinfo.REPORTS[name], v,
+                                         lambda job: self._on_report_exit(job, v, match, generation))
+        return None, True
+
+    def run_call(self, fn, label, on_done):
+        """Run ``fn`` on the executor as a job; on_done(job) follows on the UI thread."""
+        return self.executor.submit_call(fn, label, on_exit=lambda job: self.call_soon(on_done, job))
+
+    def _on_report_exit(self, job, v, match, generation):
+        if job.cancelled:
+            self.print_output(f"[job {job.id}] cancelled")
+            return
+        if job.error is not None:
+            if isinstance(job.error, sysinfo.Unavailable):
+                self._reports_unavailable.add(match.intent.name)
+            else:
+                self.print_output(f"ERROR: {job.error}")
+            cmd, is_shell = match.intent.command
+            self.print_output(f"Executing: {cmd}")
+            self.log_activity("EXECUTE", cmd)
+            self.run_cmd(cmd, is_shell=is_shell)
+            return
+        self.results.put(('report', match.intent.name), job.result, match.intent.ttl, generation)
+        self._show_report(v, job.result)
+
+    def _show_report(self, v, report):
+        self.print_output(report.json() if 'json' in v.split() else report.table())
+        self.speak(report.summary)
+
+    def _intent_kill_process(self, v, match):
+        process = match.param
+        if process:
+            process = self.sanitize_filename(process)
+            procname = process if process.lower().endswith('.exe') else f"{process}.exe"
+            if self.confirm("Confirm Kill", f"Terminate process '{procname}'?"):
+                return f'taskkill /f /im "{procname}"', True
+            else:
+                self.print_output("Kill cancelled")
+                return None, True
+        return None, True
+
+    def _intent_run_script(self, v, match):
+        path = v[match.end:].strip().strip('"')
+        if not path:
+            self.print_output("Usage: run script <file>")
+            return None, True
+        self.run_script(self.resolve_path(path))
+        return None, True
+
+    def _intent_run_macro(self, v, match):
+        name = v[match.end:].strip()
+        if not name:
+            self.print_output("Usage: run macro <name>")
+            return None, True
+        self.run_macro(name)
+        return None, True
+
+    def _intent_record_macro(self, v, match):
+        name = MacroStore.normalize(v[match.end:])
+        if not name:
+            self.print_output("Usage: record macro <name>")
+            return None, True
+        self.macro_recording = (name, [])
+        self.print_output(f"Recording macro '{name}' - say 'stop recording' to save it")
+        self.speak("Recording macro")
+        return None, True
+
+    def _intent_stop_recording(self, v, match):
+        if self.macro_recording is None:
+            self.print_output("Not recording a macro")
+            return None, True
+        name, commands = self.macro_recording
+        self.macro_recording = None
+        if not commands:
+            self.print_output("Macro is empty - nothing saved")
+            return None, True
+        try:
+            path = self.macros.save(name, commands)
+        except OSError as e:
+            self.print_output(f"ERROR: Could not save macro - {e}")
+            return None, True
+        self.print_output(f"Macro '{name}' saved ({len(commands)} steps): {path}")
+        self.speak("Macro saved")
+        return None, True
+
+    def _intent_list_macros(self, v, match):
+        names = self.macros.names()
+        self.print_output("Macros: " + (', '.join(names) if names else "(none)"))
+        return None, True
+
+    def run_script(self, path, name=None):
+        """Run a script file as a batch; returns the MacroRunner or None."""
+        try:
+            with open(path, encoding='utf-8') as f:
+                text = f.read()
+        except OSError as e:
+            self.print_output(f"ERROR: Could not read script - {e}")
+            self.speak("Script not found")
+            return None
+        return self.start_macro(name or os.path.basename(path), text)
+
+    def run_macro(self, name):
+        text = self.macros.load(name)
+        if text is None:
+            self.print_output(f"ERROR: No macro named '{MacroStore.normalize(name)}'")
+            self.speak("Macro not found")
+            return None
+        return self.start_macro(MacroStore.normalize(name), text)
+
+    def start_macro(self, name, text):
+        steps = parse_script(text)
+        if not steps:
+            self.print_output(f"[{name}] nothing to run")
+            return None
+        run = MacroRunner(self, name, steps)
+        self.macro_runs = [r for r in self.macro_runs if r.running] + [run]
+        stages = len(run.groups)
+        self.print_output(f"[{name}] running {len(steps)} steps in {stages} stages")
+        self.log_activity("MACRO", f"{name} started ({len(steps)} steps)")
+        return run.start()
+
+    def change_dir_quick(self, env_path):
+        path = os.path.expandvars(env_path)
+        if os.path.isdir(path):
+            self.update_cwd(path)
+            self.print_output(f"Directory changed to: {self.cwd}")
+            self.speak("Directory changed")
+            return 'dir', True
+        else:
+            self.print_output("ERROR: Target folder not found")
+            self.speak("Target folder not found")
+            return None, True
+
+    def cwd_names(self):
+        """Entries of the current folder, from the index when it has them."""
+        names = self.dir_index.names_in(self.cwd)
+        if names is None:
+            try:
+                names = os.listdir(self.cwd)
+            except OSError:
+                names = []
+        return names
+
+    def resolve_path(self, name_or_path):
+        # If absolute or has drive, expand and normalize
+        p = os.path.expanduser(os.path.expandvars(name_or_path))
+        if os.path.isabs(p):
+            return os.path.abspath(p)
+        # Otherwise relative to cwd
+        return os.path.abspath(os.path.join(self.cwd, p))
+
+    def extract_param(self, text, phrases):
+        text_l = text.lower()
+        for phrase in phrases:
+            if phrase in text_l:
+                pos = text_l.find(phrase) + len(phrase)
+                original_tail = text[pos:].strip()
+                return clean_param(original_tail)
+        return None
+
+    def log_activity(self, activity_type, message):
+        self.journal.log(activity_type, message)
+
+    def save_log(self):
+        # The journal is already on disk; snapshot it once pending entries
+        # are written instead of rewriting the whole log here.
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = os.path.join(self.journal.directory, f"voice_cmd_log_{timestamp}.jsonl")
+
+        def _done(dest, error):
+            self.call_soon(self._on_log_saved, dest, error)
+        self.journal.snapshot(filename, _done)
+
+    def _on_log_saved(self, filename, error):
+        if error is not None:
+            self.print_output(f"ERROR: Could not save log - {str(error)}")
+            self.speak("Failed to save log")
+            return
+        self.print_output(f"\nLog saved: {filename}")
+        self.toast("Voice CMD", f"Log saved: {filename}")
+        self.speak("Log saved")
+
+    def exit_session(self):
+        """'exit': stop this session's jobs, save the log and leave the front end."""
+        self.print_output("Exiting...")
+        self.executor.shutdown()
+        self.save_log()
+        self.quit()
+
+    def close_session(self):
+        """Cancel this session's macros, jobs and copies and stop its shell."""
+        for run in self.macro_runs:
+            if run.running:
+                run.cancel()
+        self.executor.shutdown()
+        self.fileops.shutdown()
+
+    def clear_screen(self):
+        self.clear_output()
+        self.print_output("Screen cleared. Type 'help' for commands.\n")
+
+    def shutdown(self):
+        """Stop background workers; call once when the front end exits."""
+        self.is_listening = False
+        self.dir_index.stop()
+        self.latency.stop_export()
+        self.close_session()
+        if self.tts:
+            self.tts.shutdown()
+        self.history.close()
+        self.journal.close()
@@ -0,0 +1,185 @@
+"""
+Long-lived shell process that runs commands one after another.
+
+Spawning a shell per command pays process startup every time and forgets
+shell state (``set``/``export``, ``pushd``). ``ShellSession`` keeps one
+shell (cmd.exe on Windows, /bin/sh elsewhere) running with its stdin,
+stdout and stderr on pipes. Each command is written as a small frame:
+change to the job's folder, run the command with stdin from the null
+device, then print a sentinel line carrying a per-command token, the
+exit code and the shell's folder afterwards. A second sentinel on stderr
+marks the end of that stream. Output between the frame's start and the
+sentinels belongs to the command.
+
+If the shell dies (a cancelled or timed-out command kills its whole
+process tree, or the command was ``exit``), the running command fails
+with ShellExited and the next command starts a fresh shell.
+"""
+import os
+import queue
+import shlex
+import subprocess
+import threading
+import uuid
+
+
+class ShellExited(Exception):
+    """The session's shell process ended while a command was running."""
+
+
+def default_shell_argv():
+    if os.name == 'nt':
+        # /Q: no echo (and no prompt), /D: skip AutoRun, /K: keep reading stdin
+        return [os.environ.get('COMSPEC', 'cmd.exe'), '/Q', '/D', '/K']
+    return ['/bin/sh']
+
+
+class ShellSession:
+    def __init__(self, cwd=None, argv=None):
+        self.argv = argv or default_shell_argv()
+        self.cwd = cwd
+        self.process = None
+        self.starts = 0
+        self.commands = 0
+        self._busy = threading.Lock()
+        self._lines = None
+
+    # --- executor side ---
+    def accepts(self, cmd):
+        """Whether ``cmd`` can be framed safely (otherwise it gets its own shell)."""
+        if not isinstance(cmd, str) or '\n' in cmd or '\r' in cmd:
+            return False
+        # on cmd.exe the command is wrapped in ( ... ) to redirect its stdin
+        return os.name != 'nt' or ')' not in cmd
+
+    def acquire(self):
+        """Claim the session for one command; False if it is busy."""
+        return self._busy.acquire(blocking=False)
+
+    def release(self):
+        self._busy.release()
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def run(self, job, emit):
+        """
+        Run ``job.cmd`` in ``job.cwd``; emit(stream, line) receives its
+        output. Returns (exit code, folder after the command). The caller
+        must hold the session (acquire()).
+        """
+        proc = self._ensure_started()
+        lines = self._lines
+        marker = f"__speakshell_{uuid.uuid4().hex}__"
+        job.process = proc
+        if job.cancelled:
+            raise ShellExited("cancelled before start")
+        self._write(proc, self._frame(job.cmd, job.cwd or self.cwd, marker))
+        self.commands += 1
+        returncode, cwd = None, None
+        pending = {'stdout', 'stderr'}
+        while pending:
+            stream, line = lines.get()
+            if line is None:
+                raise ShellExited(f"shell exited with code {proc.wait()}")
+            at = line.find(marker)
+            if at < 0:
+                emit(stream, line)
+                continue
+            if at > 0:
+                # output without a trailing newline runs into the sentinel
+                emit(stream, line[:at])
+            pending.discard(stream)
+            if stream == 'stdout':
+                rest = line[at + len(marker):].strip().split(' ', 1)
+                try:
+                    returncode = int(rest[0])
+                except ValueError:
+                    returncode = 1
+                cwd = rest[1].strip() if len(rest) > 1 and rest[1].strip() else None
+        if cwd:
+            self.cwd = cwd
+        return returncode, cwd
+
+    def close(self):
+        proc, self.process = self.process, None
+        if proc is not None and proc.poll() is None:
+            try:
+                proc.stdin.close()
+                proc.wait(timeout=2)
+            except Exception:
+                proc.kill()
+
+    # --- framing ---
+    @staticmethod
+    def _frame(cmd, cwd, marker):
+        if os.name == 'nt':
+            lines = []
+            if cwd:
+                lines.append(f'cd /d "{cwd}"')
+            lines += [f'({cmd}) < NUL',
+                      f'echo {marker} %errorlevel% %cd%',
+                      f'echo {marker} 1>&2']
+            return '\r\n'.join(lines) + '\r\n'
+        lines = []
+        if cwd:
+            lines.append(f'cd -- {shlex.quote(cwd)} 2>/dev/null')
+        # `command eval` keeps a syntax error in cmd from exiting the shell
+        lines += [f'command eval {shlex.quote(cmd)} </dev/null',
+                  '__speakshell_rc=$?',
+                  f"printf '%s %d %s\\n' {marker} \"$__speakshell_rc\" \"$PWD\"",
+                  f"printf '%s\\n' {marker} >&2"]
+        return '\n'.join(lines) + '\n'
+
+    # --- process ---
+    def _ensure_started(self):
+        if self.alive:
+            return self.process
+        kwargs = {}
+        if os.name == 'nt':
+            kwargs['creationflags'] = getattr(subprocess, 'CREATE_NEW_PROCESS_GROUP', 0)
+        else:
+            kwargs['start_new_session'] = True
+        proc = subprocess.Popen(
+            self.argv, cwd=self.cwd if self.cwd and os.path.isdir(self.cwd) else None,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            text=True, errors='replace', bufsize=1, **kwargs
+        )
+        lines = queue.Queue()
+        for stream, pipe in (('stdout', proc.stdout), ('stderr', proc.stderr)):
+            threading.Thread(target=self._pump, args=(pipe, stream, lines),
+                             name=f'speakshell-session-{stream}', daemon=True).start()
+        self.process = proc
+        self._lines = lines
+        self.starts += 1
+        # swallow the banner cmd.exe prints on start
+        marker = f"__speakshell_{uuid.uuid4().hex}__"
+        self._write(proc, f'echo {marker}\r\necho {marker} 1>&2\r\n' if os.name == 'nt'
+                    else f"echo {marker}; echo {marker} >&2\n")
+        pending = {'stdout', 'stderr'}
+        while pending:
+            stream, line = lines.get()
+            if line is None:
+                raise ShellExited(f"shell failed to start (code {proc.wait()})")
+            if marker in line:
+                pending.discard(stream)
+        return proc
+
+    @staticmethod
+    def _write(proc, text):
+        try:
+            proc.stdin.write(text)
+            proc.stdin.flush()
+        except (OSError, ValueError) as e:
+            raise ShellExited(f"shell is not accepting input: {e}")
+
+    @staticmethod
+    def _pump(pipe, stream, lines):
+        try:
+            for line in iter(pipe.readline, ''):
+                lines.put((stream, line.rstrip('\r\n')))
+        except Exception:
+            pass
+        finally:
+            lines.put((stream, None))
@@ -1,12 +1,53 @@
 """
 Professional entrypoint for SpeakShell.
 
-Run this file to launch the GUI application.
+Run this file to launch the GUI application, or pass --headless for the
+terminal front end (see headless.py), which never imports tkinter.
+--daemon runs the backend alone (daemon.py); --client (client.py) and
+--connect (the window) are front ends attached to it.
+--startup-profile prints where startup time went (see startup.py).
 """
-from voice_cmd import HighAccuracyVoiceCMD
+from startup import PROFILE  # first, so its clock covers the imports below
 
+import argparse
+import sys
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(add_help=False)
+    ap.add_argument('--headless', action='store_true')
+    ap.add_argument('--daemon', action='store_true')
+    ap.add_argument('--client', action='store_true')
+    ap.add_argument('--connect', action='store_true')
+    ap.add_argument('--startup-profile', action='store_true')
+    args, rest = ap.parse_known_args(sys.argv[1:] if argv is None else argv)
+    PROFILE.enabled = args.startup_profile
+    if args.headless:
+        from headless import main as headless_main
+        PROFILE.mark('import headless front end')
+        return headless_main(rest)
+    if args.daemon:
+        from daemon import main as daemon_main
+        PROFILE.mark('import daemon')
+        return daemon_main(rest)
+    if args.client:
+        from client import main as client_main
+        return client_main(rest)
+
+    from voice_cmd import HighAccuracyVoiceCMD, RemoteVoiceCMD
+    PROFILE.mark('import GUI front end')
+    if args.connect:
+        from client import DaemonClient, DaemonError
+        try:
+            client = DaemonClient(name='window').connect(spawn=True)
+        except (DaemonError, OSError) as e:
+            print(f"speakshell: {e}", file=sys.stderr)
+            return 1
+        PROFILE.mark('connect to daemon')
+        app = RemoteVoiceCMD(client)
+        app.run()
+        return 0
 
-def main():
     print("=" * 60)
     print("Speak Shell")
     print("=" * 60)
@@ -23,7 +64,8 @@ def main():
 
     app = HighAccuracyVoiceCMD()
     app.run()
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+Startup timing for ``--startup-profile``.
+
+Front ends call ``PROFILE.mark(label)`` after each startup phase and
+``PROFILE.ready()`` once the first keystroke can be accepted. The report
+lists the phases and the optional-dependency imports (deps.LOAD_TIMES),
+separating those paid before the app was ready from those deferred to
+first use or to the background warm-up.
+"""
+import sys
+import time
+
+import deps
+
+
+class StartupProfile:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.enabled = False
+        self.marks = []
+        self.ready_at = None
+        self._last = self.start
+        self._deps_before_ready = 0
+
+    def mark(self, label):
+        now = time.perf_counter()
+        self.marks.append((label, now - self._last))
+        self._last = now
+
+    def ready(self, label='ready for input'):
+        if self.ready_at is not None:
+            return
+        self.mark(label)
+        self.ready_at = time.perf_counter()
+        self._deps_before_ready = len(deps.LOAD_TIMES)
+
+    def report(self):
+        lines = ["Startup profile (ms)"]
+        for label, seconds in self.marks:
+            lines.append(f"  {label:<36} {seconds * 1000:8.1f}")
+        if self.ready_at is not None:
+            lines.append(f"  {'total before first keystroke':<36} {(self.ready_at - self.start) * 1000:8.1f}")
+        loads = list(deps.LOAD_TIMES)
+        lines.append("Optional dependencies imported before ready:")
+        lines.extend(self._format_loads(loads[:self._deps_before_ready]) or ["  (none)"])
+        lines.append("Imported later (first use / warm-up):")
+        lines.extend(self._format_loads(loads[self._deps_before_ready:]) or ["  (none yet)"])
+        return '\n'.join(lines)
+
+    @staticmethod
+    def _format_loads(loads):
+        return [f"  {module:<24} {seconds * 1000:8.1f}  [{thread}]" for module, seconds, thread in loads]
+
+    def print_report(self, stream=None):
+        if self.enabled:
+            print(self.report(), file=stream or sys.stderr, flush=True)
+
+
+PROFILE = StartupProfile()
@@ -0,0 +1,330 @@
+"""
+In-process answers for the built-in system-information commands.
+
+"memory usage", "disk space", "battery status", "show processes" and
+"system information" used to run wmic/tasklist/systeminfo through the
+shell, which takes seconds and only works on Windows. Each function here
+returns a ``Report`` built from psutil when it is installed, otherwise
+from the standard library and /proc, /sys or the Win32 API. Reports keep
+raw values (bytes, percent, seconds) so they can be rendered as a text
+table or dumped as JSON.
+
+A function raises ``Unavailable`` when neither source can answer; the
+caller then falls back to the intent's shell command.
+"""
+import json
+import os
+import platform
+import shutil
+import socket
+import sys
+import time
+from collections import namedtuple
+
+from deps import psutil
+
+Column = namedtuple('Column', 'key label fmt')
+
+
+class Unavailable(Exception):
+    """No in-process source for this report on this system."""
+
+
+def fmt_bytes(n):
+    if n is None:
+        return '-'
+    for unit in ('B', 'KB', 'MB', 'GB', 'TB'):
+        if abs(n) < 1024 or unit == 'TB':
+            return f"{n:.0f} {unit}" if unit == 'B' else f"{n:.1f} {unit}"
+        n /= 1024.0
+
+
+def fmt_percent(p):
+    return '-' if p is None else f"{p:.0f}%"
+
+
+def fmt_duration(seconds):
+    if seconds is None:
+        return '-'
+    seconds = int(seconds)
+    days, rest = divmod(seconds, 86400)
+    hours, rest = divmod(rest, 3600)
+    minutes = rest // 60
+    return f"{days}d {hours}h {minutes}m" if days else f"{hours}h {minutes}m"
+
+
+class Report:
+    """Rows of raw values plus how to label and format each column."""
+    def __init__(self, title, columns, rows, summary='', source=''):
+        self.title = title
+        self.columns = columns
+        self.rows = rows
+        self.summary = summary
+        self.source = source
+
+    def table(self):
+        if not self.rows:
+            return f"{self.title}: {self.summary or 'nothing to show'}"
+        header = any(c.label for c in self.columns)
+        cells = [[c.label for c in self.columns]] if header else []
+        for row in self.rows:
+            cells.append([(c.fmt or str)(row.get(c.key)) if row.get(c.key) is not None else '-'
+                          for c in self.columns])
+        widths = [max(len(r[i]) for r in cells) for i in range(len(self.columns))]
+        lines = [self.title]
+        for n, r in enumerate(cells):
+            lines.append('  ' + '  '.join(v.ljust(w) for v, w in zip(r, widths)).rstrip())
+            if n == 0 and header:
+                lines.append('  ' + '  '.join('-' * w for w in widths))
+        return '\n'.join(lines)
+
+    def as_dict(self):
+        return {'title': self.title, 'summary': self.summary, 'source': self.source, 'rows': self.rows}
+
+    def json(self, indent=2):
+        return json.dumps(self.as_dict(), indent=indent, default=str)
+
+
+# --- memory ---
+def memory():
+    if psutil:
+        vm = psutil.virtual_memory()
+        sw = psutil.swap_memory()
+        rows = [{'kind': 'RAM', 'total': vm.total, 'used': vm.total - vm.available,
+                 'free': vm.available, 'percent': vm.percent},
+                {'kind': 'Swap', 'total': sw.total, 'used': sw.used, 'free': sw.free, 'percent': sw.percent}]
+        source = 'psutil'
+    else:
+        rows, source = _memory_fallback()
+    ram = rows[0]
+    return Report('Memory', _MEMORY_COLUMNS, rows,
+                  summary=f"Memory {ram['percent']:.0f} percent used", source=source)
+
+
+_MEMORY_COLUMNS = [Column('kind', '', None), Column('total', 'Total', fmt_bytes),
+                   Column('used', 'Used', fmt_bytes), Column('free', 'Available', fmt_bytes),
+                   Column('percent', 'Used %', fmt_percent)]
+
+
+def _row(kind, total, free):
+    used = total - free
+    return {'kind': kind, 'total': total, 'used': used, 'free': free,
+            'percent': 100.0 * used / total if total else 0.0}
+
+
+def _memory_fallback():
+    if os.name == 'nt':
+        import ctypes
+
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [('dwLength', ctypes.c_ulong), ('dwMemoryLoad', ctypes.c_ulong),
+                        ('ullTotalPhys', ctypes.c_ulonglong), ('ullAvailPhys', ctypes.c_ulonglong),
+                        ('ullTotalPageFile', ctypes.c_ulonglong), ('ullAvailPageFile', ctypes.c_ulonglong),
+                        ('ullTotalVirtual', ctypes.c_ulonglong), ('ullAvailVirtual', ctypes.c_ulonglong),
+                        ('ullAvailExtendedVirtual', ctypes.c_ulonglong)]
+        status = MEMORYSTATUSEX()
+        status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+        if not ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            raise Unavailable('GlobalMemoryStatusEx failed')
+        return [_row('RAM', status.ullTotalPhys, status.ullAvailPhys)], 'win32'
+    try:
+        info = {}
+        with open('/proc/meminfo') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                info[key] = int(value.split()[0]) * 1024
+    except (OSError, ValueError, IndexError):
+        raise Unavailable('no psutil and no /proc/meminfo')
+    free = info.get('MemAvailable', info.get('MemFree', 0))
+    rows = [_row('RAM', info['MemTotal'], free)]
+    if info.get('SwapTotal'):
+        rows.append(_row('Swap', info['SwapTotal'], info.get('SwapFree', 0)))
+    return rows, '/proc'
+
+
+# --- disks ---
+_SKIP_FS = {'proc', 'sysfs', 'tmpfs', 'devtmpfs', 'devpts', 'cgroup', 'cgroup2', 'overlay', 'squashfs',
+            'securityfs', 'pstore', 'debugfs', 'tracefs', 'mqueue', 'hugetlbfs', 'autofs', 'fusectl',
+            'configfs', 'binfmt_misc', 'nsfs', 'ramfs', 'bpf'}
+
+
+def _mountpoints():
+    if psutil:
+        return [(p.mountpoint, p.fstype) for p in psutil.disk_partitions(all=False)], 'psutil'
+    if os.name == 'nt':
+        import string
+        return [(f"{c}:\\", '') for c in string.ascii_uppercase if os.path.exists(f"{c}:\\")], 'os'
+    mounts = []
+    try:
+        with open('/proc/mounts') as f:
+            for line in f:
+                device, mountpoint, fstype = line.split()[:3]
+                if fstype not in _SKIP_FS and device.startswith('/'):
+                    mounts.append((mountpoint.replace('\\040', ' '), fstype))
+    except OSError:
+        pass
+    return mounts or [('/', '')], '/proc'
+
+
+def disks():
+    mounts, source = _mountpoints()
+    rows = []
+    seen = set()
+    for mountpoint, fstype in mounts:
+        try:
+            usage = shutil.disk_usage(mountpoint)
+        except OSError:
+            continue   # empty drives, permission errors
+        key = (usage.total, usage.used)
+        if key in seen:
+            continue   # bind mounts of the same filesystem
+        seen.add(key)
+        # like df (and psutil): reserved blocks count as neither used nor free
+        visible = usage.used + usage.free
+        rows.append({'mount': mountpoint, 'fstype': fstype or None, 'total': usage.total,
+                     'used': usage.used, 'free': usage.free,
+                     'percent': 100.0 * usage.used / visible if visible else 0.0})
+    if not rows:
+        raise Unavailable('no readable disks')
+    fullest = max(rows, key=lambda r: r['percent'])
+    return Report('Disk space', _DISK_COLUMNS, rows, source=source,
+                  summary=f"{len(rows)} disks, fullest {fullest['mount']} at {fullest['percent']:.0f} percent")
+
+
+_DISK_COLUMNS = [Column('mount', 'Drive', None), Column('fstype', 'Type', None),
+                 Column('total', 'Size', fmt_bytes), Column('used', 'Used', fmt_bytes),
+                 Column('free', 'Free', fmt_bytes), Column('percent', 'Used %', fmt_percent)]
+
+
+# --- battery ---
+def battery():
+    rows = []
+    source = 'psutil'
+    if psutil:
+        state = psutil.sensors_battery() if hasattr(psutil, 'sensors_battery') else None
+        if state is not None:
+            plugged = state.power_plugged
+            secs = state.secsleft if isinstance(state.secsleft, (int, float)) and state.secsleft >= 0 else None
+            rows.append({'name': 'Battery', 'percent': state.percent,
+                         'status': 'charging' if plugged else ('discharging' if plugged is not None else None),
+                         'remaining': secs})
+    elif os.path.isdir('/sys/class/power_supply'):
+        source = '/sys'
+        base = '/sys/class/power_supply'
+        for name in sorted(os.listdir(base)):
+            try:
+                with open(os.path.join(base, name, 'type')) as f:
+                    if f.read().strip() != 'Battery':
+                        continue
+                with open(os.path.join(base, name, 'capacity')) as f:
+                    percent = float(f.read().strip())
+                status = None
+                if os.path.exists(os.path.join(base, name, 'status')):
+                    with open(os.path.join(base, name, 'status')) as f:
+                        status = f.read().strip().lower()
+            except (OSError, ValueError):
+                continue
+            rows.append({'name': name, 'percent': percent, 'status': status, 'remaining': None})
+    else:
+        raise Unavailable('no psutil')
+    if not rows:
+        return Report('Battery', _BATTERY_COLUMNS, rows, summary='No battery found', source=source)
+    first = rows[0]
+    summary = f"Battery at {first['percent']:.0f} percent"
+    if first['status']:
+        summary += f", {first['status']}"
+    return Report('Battery', _BATTERY_COLUMNS, rows, summary=summary, source=source)
+
+
+_BATTERY_COLUMNS = [Column('name', '', None), Column('percent', 'Charge', fmt_percent),
+                    Column('status', 'Status', None), Column('remaining', 'Time left', fmt_duration)]
+
+
+# --- processes ---
+def processes(limit=25):
+    """The ``limit`` processes using the most memory."""
+    rows = []
+    if psutil:
+        source = 'psutil'
+        for p in psutil.process_iter(['pid', 'name', 'memory_info', 'num_threads', 'username']):
+            info = p.info
+            mem = info.get('memory_info')
+            rows.append({'pid': info['pid'], 'name': info.get('name') or '?',
+                         'memory': mem.rss if mem is not None else None,
+                         'threads': info.get('num_threads'), 'user': info.get('username')})
+    elif os.path.isdir('/proc') and sys.platform.startswith('linux'):
+        source = '/proc'
+        page = os.sysconf('SC_PAGE_SIZE')
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    stat = f.read()
+                name = stat[stat.index('(') + 1:stat.rindex(')')]
+                fields = stat[stat.rindex(')') + 2:].split()
+                if fields[21] == '0':
+                    continue   # kernel thread
+                rows.append({'pid': int(entry), 'name': name, 'memory': int(fields[21]) * page,
+                             'threads': int(fields[17]), 'user': None})
+            except (OSError, ValueError, IndexError):
+                continue   # exited while we were looking
+    else:
+        raise Unavailable('no psutil')
+    total = len(rows)
+    rows.sort(key=lambda r: r['memory'] or 0, reverse=True)
+    return Report(f"Processes (top {min(limit, total)} of {total} by memory)", _PROCESS_COLUMNS,
+                  rows[:limit], summary=f"{total} processes running", source=source)
+
+
+_PROCESS_COLUMNS = [Column('pid', 'PID', str), Column('name', 'Name', None),
+                    Column('memory', 'Memory', fmt_bytes), Column('threads', 'Threads', str),
+                    Column('user', 'User', None)]
+
+
+# --- system ---
+def system():
+    uname = platform.uname()
+    rows = [
+        {'field': 'Host Name', 'value': socket.gethostname()},
+        {'field': 'OS Name', 'value': f"{uname.system} {uname.release}".strip()},
+        {'field': 'OS Version', 'value': uname.version},
+        {'field': 'System Type', 'value': uname.machine},
+        {'field': 'Processors', 'value': os.cpu_count()},
+    ]
+    source = 'psutil' if psutil else 'os'
+    try:
+        total = memory().rows[0]['total']
+    except Unavailable:
+        total = None
+    rows.append({'field': 'Total Physical Memory', 'value': total, 'bytes': True})
+    boot = None
+    if psutil:
+        boot = psutil.boot_time()
+    elif os.path.exists('/proc/uptime'):
+        with open('/proc/uptime') as f:
+            boot = time.time() - float(f.read().split()[0])
+    if boot is not None:
+        rows.append({'field': 'Up Time', 'value': time.time() - boot, 'seconds': True})
+    for row in rows:
+        # keep raw numbers in JSON, format them for the table
+        if row.pop('bytes', False):
+            row['text'] = fmt_bytes(row['value'])
+        elif row.pop('seconds', False):
+            row['text'] = fmt_duration(row['value'])
+        else:
+            row['text'] = row['value']
+    return Report('System information', _SYSTEM_COLUMNS, rows, source=source,
+                  summary=f"{rows[1]['value']} on {rows[0]['value']}")
+
+
+_SYSTEM_COLUMNS = [Column('field', '', None), Column('text', '', str)]
+
+# intent name -> report function
+REPORTS = {
+    'memory': memory,
+    'disk_space': disks,
+    'battery': battery,
+    'processes': processes,
+    'system_info': system,
+}
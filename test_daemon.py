@@ -0,0 +1,87 @@
+import queue
+import threading
+
+import pytest
+
+import daemon as daemon_module
+
+
+class FakeClient:
+    """An attached front end that records the events it is sent."""
+    def __init__(self):
+        self.name = 'test'
+        self.authed = True
+        self.events = None
+        self.sessions = None
+        self.received = queue.Queue()
+
+    def wants(self, event, session=None):
+        return True
+
+    def send(self, message):
+        self.received.put(message)
+
+    def close(self, timeout=None):
+        pass
+
+    def next_event(self, event, timeout=10, **fields):
+        while True:
+            message = self.received.get(timeout=timeout)
+            if message.get('event') == event and all(message.get(k) == v for k, v in fields.items()):
+                return message
+
+
+@pytest.fixture
+def daemon(monkeypatch, tmp_path):
+    import shell_core
+    for name in ('LOG_DIR', 'TTS_CACHE_DIR', 'GRAMMAR_DIR', 'MACRO_DIR', 'METRICS_DIR'):
+        monkeypatch.setattr(shell_core, name, str(tmp_path / name.lower()))
+    monkeypatch.setattr(shell_core, 'HISTORY_DB', str(tmp_path / 'history.db'))
+    monkeypatch.setattr(shell_core, 'INDEX_ROOTS', [str(tmp_path)])
+    daemon = daemon_module.SpeakShellDaemon(info_path=str(tmp_path / 'daemon.json'),
+                                            socket_path=str(tmp_path / 'daemon.sock'))
+    yield daemon
+    daemon.stop()
+
+
+def test_confirm_does_not_block_other_sessions(daemon, tmp_path):
+    work = tmp_path / 'work'
+    work.mkdir()
+    (work / 'x.txt').write_text('keep me')
+    client = FakeClient()
+    daemon.clients.add(client)
+    daemon.main.cwd = daemon.main.shell_session.cwd = str(work)
+    other = daemon.open_session(str(work))
+
+    first = daemon.handle(client, {'op': 'submit', 'session': 0, 'command': 'delete file x.txt'})['request']
+    asked = client.next_event('confirm', session=0)
+
+    # session 0 waits for an answer; the daemon keeps serving everyone else
+    state, done = [], []
+    try:
+        thread = threading.Thread(target=lambda: state.append(daemon.handle(client, {'op': 'state'})))
+        thread.start()
+        thread.join(5)
+        second = daemon.handle(client, {'op': 'submit', 'session': other.sid, 'command': 'echo hello'})['request']
+        done.append(client.next_event('done', timeout=5, request=second))
+    except queue.Empty:
+        pass
+    finally:
+        daemon.handle(client, {'op': 'confirm_reply', 'confirm': asked['confirm'], 'answer': False})
+    client.next_event('done', request=first)
+    assert state and len(state[0]['sessions']) == 2
+    assert done and done[0]['ok']
+    assert (work / 'x.txt').read_text() == 'keep me'
+
+
+def test_confirm_reply_answers_the_question(daemon, tmp_path):
+    (tmp_path / 'x.txt').write_text('bye')
+    client = FakeClient()
+    daemon.clients.add(client)
+    daemon.main.cwd = daemon.main.shell_session.cwd = str(tmp_path)
+    request = daemon.handle(client, {'op': 'submit', 'session': 0, 'command': 'delete file x.txt'})['request']
+    asked = client.next_event('confirm', session=0)
+    daemon.handle(client, {'op': 'confirm_reply', 'confirm': asked['confirm'], 'answer': True})
+    client.next_event('confirm', confirm=asked['confirm'], answered=True)
+    client.next_event('done', request=request)
+    assert not (tmp_path / 'x.txt').exists()
@@ -0,0 +1,118 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+from fileops import Cancelled, FileOpEngine
+
+
+@pytest.fixture
+def engine():
+    engine = FileOpEngine(max_workers=2, progress_interval=0.05)
+    yield engine
+    engine.shutdown()
+
+
+def run(engine, kind, src, dst):
+    op = engine.submit(kind, str(src), str(dst))
+    assert op.wait(10)
+    return op
+
+
+def make_tree(root):
+    (root / 'sub').mkdir(parents=True)
+    (root / 'a.txt').write_text('alpha')
+    (root / 'sub' / 'b.txt').write_text('beta')
+
+
+def test_copy_file_into_folder(engine, tmp_path):
+    (tmp_path / 'a.txt').write_text('alpha')
+    (tmp_path / 'out').mkdir()
+    op = run(engine, 'copy', tmp_path / 'a.txt', tmp_path / 'out')
+    assert op.ok
+    assert (tmp_path / 'out' / 'a.txt').read_text() == 'alpha'
+
+
+@pytest.mark.parametrize('kind', ['copy', 'move'])
+@pytest.mark.parametrize('dst', ['a.txt', '.'])
+def test_file_onto_itself_is_refused(engine, tmp_path, kind, dst):
+    (tmp_path / 'a.txt').write_text('alpha')
+    with pytest.raises(shutil.SameFileError):
+        engine.submit(kind, str(tmp_path / 'a.txt'), str(tmp_path / dst))
+    assert (tmp_path / 'a.txt').read_text() == 'alpha'
+
+
+@pytest.mark.parametrize('kind', ['copy', 'move'])
+@pytest.mark.parametrize('dst', ['tree', os.path.join('tree', 'sub'), os.path.join('tree', 'new')])
+def test_folder_into_itself_is_refused(engine, tmp_path, kind, dst):
+    make_tree(tmp_path / 'tree')
+    with pytest.raises(shutil.Error):
+        engine.submit(kind, str(tmp_path / 'tree'), str(tmp_path / dst))
+    assert (tmp_path / 'tree' / 'a.txt').read_text() == 'alpha'
+    assert (tmp_path / 'tree' / 'sub' / 'b.txt').read_text() == 'beta'
+
+
+def test_copy_overwrites_existing_file(engine, tmp_path):
+    (tmp_path / 'a.txt').write_text('new')
+    (tmp_path / 'b.txt').write_text('old')
+    op = run(engine, 'copy', tmp_path / 'a.txt', tmp_path / 'b.txt')
+    assert op.ok
+    assert (tmp_path / 'b.txt').read_text() == 'new'
+    assert sorted(os.listdir(tmp_path)) == ['a.txt', 'b.txt']
+
+
+def test_cancelled_copy_keeps_existing_file(engine, tmp_path, monkeypatch):
+    (tmp_path / 'a.txt').write_text('new contents')
+    (tmp_path / 'b.txt').write_text('keep me')
+
+    def cancel_halfway(op, fsrc, fdst):
+        fdst.write(fsrc.read(3))
+        op.cancelled = True
+        raise Cancelled()
+    monkeypatch.setattr(engine, '_copy_data', cancel_halfway)
+    op = run(engine, 'copy', tmp_path / 'a.txt', tmp_path / 'b.txt')
+    assert op.cancelled
+    assert (tmp_path / 'b.txt').read_text() == 'keep me'
+    assert sorted(os.listdir(tmp_path)) == ['a.txt', 'b.txt']
+
+
+def test_copy_folder(engine, tmp_path):
+    make_tree(tmp_path / 'tree')
+    op = run(engine, 'copy', tmp_path / 'tree', tmp_path / 'copy')
+    assert op.ok and op.done_files == 2
+    assert (tmp_path / 'copy' / 'sub' / 'b.txt').read_text() == 'beta'
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason="creating symlinks needs privileges")
+@pytest.mark.parametrize('kind', ['copy', 'move'])
+def test_links_are_kept(engine, tmp_path, kind):
+    make_tree(tmp_path / 'tree')
+    (tmp_path / 'elsewhere').mkdir()
+    (tmp_path / 'elsewhere' / 'c.txt').write_text('gamma')
+    os.symlink(str(tmp_path / 'elsewhere'), str(tmp_path / 'tree' / 'linked'))
+    os.symlink('a.txt', str(tmp_path / 'tree' / 'alias.txt'))
+    # merging into an existing folder always takes the copy path, even for a move
+    (tmp_path / 'out').mkdir()
+    op = run(engine, kind, tmp_path / 'tree', tmp_path / 'out')
+    assert op.ok, op.error
+    assert op.links == 2
+    assert os.readlink(str(tmp_path / 'out' / 'linked')) == str(tmp_path / 'elsewhere')
+    assert (tmp_path / 'out' / 'linked' / 'c.txt').read_text() == 'gamma'
+    assert os.readlink(str(tmp_path / 'out' / 'alias.txt')) == 'a.txt'
+    assert (tmp_path / 'elsewhere' / 'c.txt').exists()
+    assert (tmp_path / 'tree').exists() == (kind == 'copy')
+
+
+def test_move_keeps_source_when_a_link_cannot_be_copied(engine, tmp_path, monkeypatch):
+    make_tree(tmp_path / 'tree')
+    os.symlink('a.txt', str(tmp_path / 'tree' / 'alias.txt'))
+    (tmp_path / 'out').mkdir()
+
+    def refuse(*args, **kwargs):
+        raise PermissionError(1, 'Operation not permitted')
+    monkeypatch.setattr(os, 'symlink', refuse)
+    op = run(engine, 'move', tmp_path / 'tree', tmp_path / 'out')
+    assert not op.ok
+    assert [os.path.basename(path) for path, _ in op.skipped] == ['alias.txt']
+    assert (tmp_path / 'tree' / 'a.txt').read_text() == 'alpha'
@@ -0,0 +1,37 @@
+import os
+
+from grammar import CommandGrammar, build_jsgf
+
+
+def test_public_rule_is_named_after_the_file():
+    # recognize_sphinx(grammar='.../commands.jsgf') looks up <commands.commands>
+    text = build_jsgf(slot_words=['notes'])
+    lines = text.splitlines()
+    assert lines[:2] == ['#JSGF V1.0;', 'grammar commands;']
+    assert lines[2].startswith('public <commands> = ')
+    assert '<command>' not in text
+    assert 'notes' in lines[-1]
+
+
+def test_ensure_names_the_rule_after_its_path(tmp_path):
+    grammar = CommandGrammar(str(tmp_path), vocabulary=None)
+    path = grammar.ensure()
+    assert os.path.basename(path) == 'commands.jsgf'
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    assert 'grammar commands;' in text and 'public <commands> = ' in text
+
+
+def test_rewrite_drops_the_compiled_fsg(tmp_path):
+    grammar = CommandGrammar(str(tmp_path), vocabulary=None)
+    grammar.ensure()
+    fsg = tmp_path / 'commands.fsg'
+    fsg.write_text('stale')
+    # unchanged grammar: the compiled file is still valid
+    grammar.ensure()
+    assert fsg.exists() and grammar.builds == 1
+    grammar.set_slot_names(['Quarterly Report.txt'])
+    grammar.ensure()
+    assert grammar.builds == 2
+    assert not fsg.exists()
+    assert 'quarterly' in (tmp_path / 'commands.jsgf').read_text()
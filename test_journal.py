@@ -0,0 +1,62 @@
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+from journal import ActivityJournal
+
+
+def _entries(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def _write_old_journal(directory, age):
+    ts = (datetime.now() - age).isoformat(timespec='seconds')
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, 'activity.jsonl'), 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'ts': ts, 'type': 'OLD', 'message': 'left by an earlier run'}) + '\n')
+
+
+def test_old_journal_rotates_after_restart(tmp_path):
+    _write_old_journal(str(tmp_path), timedelta(days=2))
+    journal = ActivityJournal(str(tmp_path), max_age=3600, compress=False)
+    journal.log('NEW', 'first entry of this run')
+    journal.flush()
+    journal.close()
+    assert len(journal.rotated_files()) == 1
+    assert [e['type'] for e in _entries(journal.path)] == ['NEW']
+    assert [e['type'] for e in _entries(journal.rotated_files()[0])] == ['OLD']
+
+
+def test_recent_journal_is_appended_to(tmp_path):
+    _write_old_journal(str(tmp_path), timedelta(minutes=5))
+    journal = ActivityJournal(str(tmp_path), max_age=3600)
+    journal.log('NEW', 'entry')
+    journal.flush()
+    journal.close()
+    assert journal.rotated_files() == []
+    assert [e['type'] for e in _entries(journal.path)] == ['OLD', 'NEW']
+
+
+def test_unparseable_journal_uses_mtime(tmp_path):
+    path = tmp_path / 'activity.jsonl'
+    path.write_text('not json\n', encoding='utf-8')
+    old = time.time() - 2 * 86400
+    os.utime(path, (old, old))
+    journal = ActivityJournal(str(tmp_path), max_age=3600, compress=False)
+    journal.log('NEW', 'entry')
+    journal.flush()
+    journal.close()
+    assert len(journal.rotated_files()) == 1
+
+
+def test_size_rotation_keeps_backup_count(tmp_path):
+    journal = ActivityJournal(str(tmp_path), max_bytes=200, backup_count=2)
+    for i in range(40):
+        journal.log('TEST', f'message {i}')
+        journal.flush()
+    journal.close()
+    rotated = journal.rotated_files()
+    assert len(rotated) == 2
+    assert all(name.endswith('.jsonl.gz') for name in rotated)
@@ -0,0 +1,45 @@
+import io
+import threading
+
+import pytest
+
+from executor import Job
+
+
+@pytest.fixture
+def shell(monkeypatch, tmp_path):
+    import shell_core
+    from headless import HeadlessShell
+    for name in ('LOG_DIR', 'TTS_CACHE_DIR', 'GRAMMAR_DIR', 'MACRO_DIR', 'METRICS_DIR'):
+        monkeypatch.setattr(shell_core, name, str(tmp_path / name.lower()))
+    monkeypatch.setattr(shell_core, 'HISTORY_DB', str(tmp_path / 'history.db'))
+    monkeypatch.setattr(shell_core, 'INDEX_ROOTS', [str(tmp_path)])
+    shell = HeadlessShell(interactive=False, out=io.StringIO())
+    shell.update_cwd(str(tmp_path))
+    yield shell
+    shell.executor.shutdown()
+
+
+def test_raw_command_that_changes_folder_moves_the_macro(shell, tmp_path, monkeypatch):
+    (tmp_path / 'sub').mkdir()
+    ran = []
+
+    def submit(cmd, cwd=None, shell=True, timeout=None, on_output=None, on_exit=None):
+        # what the persistent session reports after 'pushd sub'
+        job = Job(len(ran) + 1, cmd, cwd, shell, timeout)
+        ran.append((cmd, cwd))
+        job.returncode = 0
+        job.final_cwd = str(tmp_path / 'sub') if cmd == 'pushd sub' else cwd
+
+        def finish():
+            on_exit(job)
+            job.done.set()
+        threading.Thread(target=finish).start()
+        return job
+
+    monkeypatch.setattr(shell.executor, 'submit', submit)
+    run = shell.start_macro('t', 'pushd sub\nwhoami')
+    assert run.done.wait(10)
+    assert [step.status for step in run.steps] == ['ok', 'ok']
+    assert ran == [('pushd sub', str(tmp_path)), ('whoami', str(tmp_path / 'sub'))]
+    assert shell.cwd == str(tmp_path / 'sub')
@@ -0,0 +1,47 @@
+import pytest
+
+from deps import np
+from preprocess import AudioPreprocessor
+
+pytestmark = pytest.mark.skipif(not np, reason="numpy is not installed")
+
+
+def tone(seconds, rate, freq=440.0):
+    t = np.arange(int(seconds * rate)) / float(rate)
+    return (0.5 * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+@pytest.mark.parametrize('hop', [None, 256, 448])
+@pytest.mark.parametrize('samples', [600, 16000, 16001])
+def test_open_gate_reconstructs_the_signal(hop, samples):
+    pre = AudioPreprocessor(hop=hop)
+    x = np.random.default_rng(0).standard_normal(samples).astype(np.float32) * 0.1
+    # a zero noise floor keeps every bin: the STFT round trip must be exact
+    pre._gate_threshold = np.zeros(pre.fft_size // 2 + 1)
+    y = pre._noise_gate(x.copy())
+    assert y.shape == x.shape
+    assert np.abs(y - x).max() < 1e-5
+
+
+def test_hop_must_overlap():
+    with pytest.raises(ValueError):
+        AudioPreprocessor(hop=100)
+
+
+@pytest.mark.parametrize('rate', [8000, 22050, 44100, 48000])
+def test_resample_keeps_length_and_tone(rate):
+    pre = AudioPreprocessor()
+    for seconds in (0.5, 3.0, 0.25):   # the cached grid is reused and grown
+        y = pre._resample(tone(seconds, rate), rate, 16000)
+        assert y.size == int(round(seconds * 16000))
+        expected = tone(seconds, 16000)
+        assert np.abs(y[8:-8] - expected[8:-8]).max() < 0.05
+
+
+def test_process_at_phrase_limit_removes_dc():
+    pre = AudioPreprocessor()
+    pcm = ((tone(7.0, 44100) + 0.1) * 32767 * 0.5).astype('<i2').tobytes()
+    out, rate = pre.process(pcm, 44100)
+    y = np.frombuffer(out, dtype='<i2').astype(np.float64)
+    assert rate == 16000 and y.size == 7 * 16000
+    assert abs(y.mean()) < 0.01 * np.abs(y).max()
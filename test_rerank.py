@@ -0,0 +1,53 @@
+import pytest
+
+from rerank import CommandRanker, soundex
+
+
+@pytest.fixture(scope='module')
+def ranker():
+    return CommandRanker(names=['Projects', 'report.txt'])
+
+
+def test_soundex():
+    assert soundex('least') == soundex('list')
+    assert soundex('coffee') == soundex('copy')
+
+
+@pytest.mark.parametrize('heard', ['list files', 'what time is it'])
+def test_exact_command_runs(ranker, heard):
+    action, best = ranker.choose([(heard, None)])
+    assert (action, best.text) == ('run', heard)
+
+
+@pytest.mark.parametrize('heard, reading', [('least files', 'list files'),
+                                            ('shoe processes', 'show processes')])
+def test_read_only_correction_runs(ranker, heard, reading):
+    action, best = ranker.choose([(heard, None)])
+    assert (action, best.text) == ('run', reading)
+
+
+@pytest.mark.parametrize('heard, reading', [('quiet please', 'quit please'),
+                                            ('coffee', 'copy'),
+                                            ('coffee a to b', 'copy a to b'),
+                                            ('go two desktop', 'go to desktop')])
+def test_state_changing_correction_needs_confirmation(ranker, heard, reading):
+    action, best = ranker.choose([(heard, None)])
+    assert (action, best.text) == ('confirm', reading)
+
+
+def test_exit_from_a_lower_alternative_needs_confirmation(ranker):
+    action, best = ranker.choose([('quiet please', None), ('quit', None)])
+    assert action == 'confirm'
+    assert best.match.intent.name == 'exit'
+
+
+def test_dissimilar_word_is_not_corrected(ranker):
+    action, best = ranker.choose([('git status', None)])
+    assert action == 'fallback'
+    assert best.text == 'git status'
+
+
+def test_parameter_snaps_to_known_name(ranker):
+    action, best = ranker.choose([('go to project', None)])
+    assert best.text == 'go to Projects'
+    assert action == 'confirm'
@@ -0,0 +1,66 @@
+import collections
+import io
+import threading
+
+import pytest
+
+import sysinfo
+from sysinfo import Column, Report
+
+Usage = collections.namedtuple('Usage', 'total used free')
+
+
+def test_disk_percent_ignores_reserved_blocks(monkeypatch):
+    monkeypatch.setattr(sysinfo, '_mountpoints', lambda: ([('/', 'ext4')], 'test'))
+    # 5 of 100 blocks are reserved for root, as on a default ext4
+    monkeypatch.setattr(sysinfo.shutil, 'disk_usage', lambda path: Usage(100, 45, 50))
+    row = sysinfo.disks().rows[0]
+    assert row['percent'] == pytest.approx(100.0 * 45 / 95)
+
+
+@pytest.fixture
+def shell(monkeypatch, tmp_path):
+    import shell_core
+    from headless import HeadlessShell
+    for name in ('LOG_DIR', 'TTS_CACHE_DIR', 'GRAMMAR_DIR', 'MACRO_DIR', 'METRICS_DIR'):
+        monkeypatch.setattr(shell_core, name, str(tmp_path / name.lower()))
+    monkeypatch.setattr(shell_core, 'HISTORY_DB', str(tmp_path / 'history.db'))
+    monkeypatch.setattr(shell_core, 'INDEX_ROOTS', [str(tmp_path)])
+    shell = HeadlessShell(interactive=False, out=io.StringIO())
+    yield shell
+    shell.executor.shutdown()
+
+
+def test_report_is_read_off_the_calling_thread(shell, monkeypatch):
+    release = threading.Event()
+    threads = []
+
+    def slow_report():
+        threads.append(threading.current_thread())
+        release.wait(10)
+        return Report('Memory', [Column('kind', '', None)], [{'kind': 'RAM'}], summary='plenty')
+
+    monkeypatch.setitem(sysinfo.REPORTS, 'memory', slow_report)
+    with shell._lock:
+        shell.process_command('memory usage', 'manual')
+    # the command returned while the report is still being read
+    assert shell.last_report is not None and shell.last_report.running
+    assert 'RAM' not in shell.out.getvalue()
+    release.set()
+    shell.wait_for_jobs()
+    assert threads and threads[0] is not threading.current_thread()
+    assert 'RAM' in shell.out.getvalue()
+    # the second ask is answered from the cache without another job
+    shell.execute('memory usage')
+    assert len(threads) == 1
+    assert 'cached' in shell.out.getvalue()
+
+
+def test_unavailable_report_falls_back_to_the_shell(shell, monkeypatch):
+    def unavailable():
+        raise sysinfo.Unavailable('no psutil')
+
+    monkeypatch.setitem(sysinfo.REPORTS, 'memory', unavailable)
+    shell.execute('memory usage')
+    assert 'memory' in shell._reports_unavailable
+    assert 'Executing: ' in shell.out.getvalue()
@@ -0,0 +1,71 @@
+import os
+import threading
+import types
+import wave
+
+import pytest
+
+import tts
+from tts import TTSWorker
+
+
+class FakeEngine:
+    def __init__(self):
+        self.said = []
+        self.done = threading.Event()
+
+    def connect(self, name, callback):
+        pass
+
+    def getProperty(self, name):
+        return 'default'
+
+    def say(self, text):
+        self.said.append(text)
+
+    def runAndWait(self):
+        self.done.set()
+
+    def save_to_file(self, text, path):
+        pass
+
+
+def broken_pyaudio():
+    def fail():
+        raise OSError("no default output device")
+    return types.SimpleNamespace(PyAudio=fail)
+
+
+@pytest.fixture
+def cached(tmp_path):
+    """A worker whose 'Command failed' phrase is already in the cache."""
+    engine = FakeEngine()
+    worker = TTSWorker(lambda: engine, cache_dir=str(tmp_path), cached_phrases=['Command failed'],
+                       autostart=False)
+    worker.engine = engine
+    path = worker._cached_path('Command failed')
+    with wave.open(path, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(16000)
+        wf.writeframes(b'\x00\x00' * 160)
+    worker.engine = None
+    yield worker, engine, path
+    worker.shutdown()
+
+
+@pytest.mark.skipif(os.name == 'nt', reason="uses winsound on Windows")
+def test_play_wav_reports_failed_audio_init(cached, monkeypatch):
+    worker, engine, path = cached
+    monkeypatch.setattr(tts, 'pyaudio', broken_pyaudio())
+    assert worker._play_wav(path) is False
+
+
+@pytest.mark.skipif(os.name == 'nt', reason="uses winsound on Windows")
+def test_failed_playback_falls_back_to_the_engine(cached, monkeypatch):
+    worker, engine, path = cached
+    monkeypatch.setattr(tts, 'pyaudio', broken_pyaudio())
+    worker.say('Command failed')
+    assert engine.done.wait(5)
+    assert engine.said == ['Command failed']
+    assert worker.cache_hits == 0
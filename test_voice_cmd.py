@@ -0,0 +1,155 @@
+import importlib
+import sys
+import types
+
+import pytest
+
+from client import DaemonError
+
+
+class Widget:
+    """Accepts any Tk call."""
+    def __init__(self, *args, **kw):
+        self.command = kw.get('command')
+        self.value = None
+
+    def __getattr__(self, name):
+        return lambda *args, **kw: Widget()
+
+    def __call__(self, *args, **kw):
+        return Widget()
+
+    def __iter__(self):
+        return iter(())
+
+    def get(self, *args):
+        return self.value if self.value is not None else ''
+
+    def set(self, value, *more):
+        self.value = value
+
+
+class Scale(Widget):
+    """Like Tk, runs its command when the value is set from code too."""
+    def set(self, value, *more):
+        self.value = value
+        if self.command:
+            self.command(str(value))
+
+
+class Var:
+    def __init__(self, master=None, value=None):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+    def trace_add(self, *args):
+        pass
+
+
+class FakeTk(types.ModuleType):
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        if name.endswith('Var'):
+            return Var
+        if name.isupper():
+            return name.lower()
+        return Scale if name == 'Scale' else Widget
+
+
+@pytest.fixture
+def voice_cmd(monkeypatch, tmp_path):
+    tk = FakeTk('tkinter')
+    tk.TclError = Exception
+    monkeypatch.setitem(sys.modules, 'tkinter', tk)
+    for sub in ('ttk', 'messagebox', 'filedialog', 'scrolledtext'):
+        module = FakeTk('tkinter.' + sub)
+        setattr(tk, sub, module)
+        monkeypatch.setitem(sys.modules, 'tkinter.' + sub, module)
+    for name in ('voice_cmd', 'virtual_list'):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    module = importlib.import_module('voice_cmd')
+    import shell_core
+    for name in ('LOG_DIR', 'TTS_CACHE_DIR', 'GRAMMAR_DIR', 'MACRO_DIR', 'METRICS_DIR'):
+        monkeypatch.setattr(shell_core, name, str(tmp_path / name.lower()))
+    monkeypatch.setattr(shell_core, 'HISTORY_DB', str(tmp_path / 'history.db'))
+    monkeypatch.setattr(shell_core, 'INDEX_ROOTS', [str(tmp_path)])
+    return module
+
+
+class FakeClient:
+    def __init__(self):
+        self.posted = []
+        self.closed = False
+        self.on_event = None
+        self.state = {
+            'protocol': 1, 'pid': 4242, 'focus': 0, 'listening': False, 'voice_enabled': True,
+            'sessions': [{'session': 0, 'cwd': '/srv'}],
+            'engines': ['google'],
+            'settings': {
+                'energy_threshold': 450, 'phrase_time_limit': 9, 'recognizer_pool_size': 3,
+                'vad_level': 1, 'min_speech_ms': 200, 'wake_word': 'computer', 'wake_threshold': 0.0,
+                'engine': 'google', 'constrained_decoding': False, 'clean_audio': False, 'voice_feedback': False,
+            },
+            'stats': {'vad': 'vad', 'wake': 'wake', 'latency': 'latency', 'cache': 'cache'},
+        }
+
+    def post(self, op, **fields):
+        self.posted.append((op, fields))
+
+    def request(self, op, timeout=30, **fields):
+        if op == 'subscribe':
+            return None
+        raise DaemonError("offline")
+
+    def close(self):
+        self.closed = True
+
+    def sets(self):
+        return [(fields['name'], fields['value']) for op, fields in self.posted if op == 'set']
+
+
+def test_local_window_builds(voice_cmd):
+    app = voice_cmd.HighAccuracyVoiceCMD()
+    try:
+        assert app.vad.energy_threshold == app.energy_threshold
+        assert app.sessions == [app] and app.active is app
+        assert app.executor is not None and app.journal is not None
+    finally:
+        app.shutdown()
+
+
+def test_remote_window_has_no_local_core(voice_cmd):
+    client = FakeClient()
+    app = voice_cmd.RemoteVoiceCMD(client)
+    assert app.journal is None and app.dir_index is None and app.tts is None and app.macros is None
+    assert app.executor is None and app.shell_session is None and app.fileops is None
+    assert app.cwd == '/srv'
+    assert app.energy_threshold == 450 and app.vad.energy_threshold == 450
+    assert app.wake.enabled and app.wake.phrase == 'computer'
+    app.shutdown()
+    assert client.closed
+
+
+def test_remote_window_does_not_echo_settings_at_build(voice_cmd):
+    client = FakeClient()
+    app = voice_cmd.RemoteVoiceCMD(client)
+    app.warm_up()
+    assert client.sets() == []
+    app._on_energy_change('600')
+    app._on_energy_change('600.0')
+    assert client.sets() == [('energy_threshold', 600)]
+
+
+def test_remote_window_tracks_daemon_energy(voice_cmd):
+    client = FakeClient()
+    app = voice_cmd.RemoteVoiceCMD(client)
+    app._on_daemon_stats({'kind': 'energy', 'value': 380})
+    assert client.sets() == []
+    app._on_energy_change('450')
+    assert client.sets() == [('energy_threshold', 450)]
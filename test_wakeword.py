@@ -0,0 +1,192 @@
+import types
+
+import pytest
+
+from shell_core import ShellCore
+from wakeword import WakeWordSpotter
+
+RATE = 16000
+SECOND = b'\x00\x00' * RATE
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def spotter(clock):
+    """A spotter whose keyword search is replaced by ``spotter.heard`` (offset or None)."""
+    spotter = WakeWordSpotter('shell', clock=clock)
+    spotter.enabled = True
+    spotter.heard = None
+    spotter.spot = lambda pcm, rate, width=2: spotter.heard
+    return spotter
+
+
+def test_phrase_without_wake_word_is_dropped(spotter):
+    assert spotter.gate(SECOND * 2, RATE) is None
+    assert (spotter.rejected, spotter.decodes_skipped, spotter.wakes) == (1, 1, 0)
+    assert spotter.seconds_rejected == pytest.approx(2.0)
+
+
+def test_audio_after_wake_word_is_submitted(spotter):
+    spotter.heard = len(SECOND) // 2
+    pcm = SECOND * 2
+    assert spotter.gate(pcm, RATE) == pcm[len(SECOND) // 2:]
+    assert (spotter.wakes, spotter.rejected) == (1, 0)
+    assert not spotter.awake
+
+
+def test_bare_wake_word_lets_next_phrase_through(spotter, clock):
+    spotter.heard = len(SECOND) - 100
+    assert spotter.gate(SECOND, RATE) is None
+    assert spotter.awake
+    spotter.heard = None
+    assert spotter.gate(SECOND, RATE) == SECOND
+    assert spotter.followed == 1
+    # only the one phrase
+    assert spotter.gate(SECOND, RATE) is None
+
+
+def test_follow_window_expires(spotter, clock):
+    spotter.heard = len(SECOND)
+    spotter.gate(SECOND, RATE)
+    clock.now += spotter.follow_s + 1
+    spotter.heard = None
+    assert spotter.gate(SECOND, RATE) is None
+
+
+@pytest.mark.parametrize('text, command', [('shell, list files', 'list files'),
+                                           ('Shell list files', 'list files'),
+                                           ('shellfish recipes', 'shellfish recipes'),
+                                           ('list files', 'list files')])
+def test_strip(spotter, text, command):
+    assert spotter.strip(text) == command
+
+
+def test_multi_word_phrase():
+    spotter = WakeWordSpotter('Hey, Shell!')
+    assert spotter.phrase == 'hey shell'
+    assert spotter.strip('hey shell open folder') == 'open folder'
+    assert spotter.strip('shell open folder') == 'shell open folder'
+
+
+@pytest.mark.parametrize('phrase, threshold', [('shell', 1e-5), ('hey shell', 1e-10),
+                                               ('computer', 1e-15), ('ok computer please listen now', 1e-40)])
+def test_default_threshold_follows_phrase_length(phrase, threshold):
+    assert WakeWordSpotter(phrase).kws_threshold == pytest.approx(threshold)
+
+
+def test_threshold_override():
+    spotter = WakeWordSpotter('shell', threshold=1e-2)
+    assert spotter.kws_threshold == 1e-2
+    spotter.set_phrase('hey shell')
+    assert spotter.kws_threshold == 1e-2
+    spotter.set_threshold(None)
+    assert spotter.kws_threshold == pytest.approx(1e-10)
+    with pytest.raises(ValueError):
+        spotter.set_threshold(5)
+
+
+def test_gate_text(spotter):
+    assert spotter.gate_text('list files') is None
+    assert spotter.gate_text('shell list files') == 'list files'
+    assert spotter.gate_text('shell') is None
+    assert spotter.gate_text('list files') == 'list files'
+    assert (spotter.wakes, spotter.followed, spotter.rejected) == (2, 1, 1)
+
+
+def test_seconds_saved(spotter):
+    assert spotter.seconds_saved() == 0.0
+    spotter.gate(SECOND, RATE)
+    spotter.gate(SECOND, RATE)
+    spotter.note_decode(0.5)
+    spotter.note_decode(1.5)
+    assert spotter.seconds_saved() == pytest.approx(2.0)
+    assert '2 phrases ignored' in spotter.stats_text()
+    spotter.enabled = False
+    assert spotter.stats_text() == "Wake word off ('shell')"
+
+
+class Segment:
+    def __init__(self, word, **frames):
+        self.word = word
+        self.__dict__.update(frames)
+
+
+class FakeDecoder:
+    """Just enough of a pocketsphinx Decoder for spot()."""
+    def __init__(self, hypstr, segments):
+        self.hypstr = hypstr
+        self.segments = segments
+        self.processed = b''
+
+    def start_utt(self):
+        pass
+
+    def process_raw(self, data, no_search, full_utt):
+        self.processed += data
+
+    def end_utt(self):
+        pass
+
+    def hyp(self):
+        return types.SimpleNamespace(hypstr=self.hypstr) if self.hypstr else None
+
+    def seg(self):
+        return iter(self.segments)
+
+
+@pytest.mark.parametrize('segment', [Segment('shell', start=10, duration=40),   # pocketsphinx 5.x
+                                     Segment('shell', start_frame=10, end_frame=49)])  # 0.1.x
+def test_spot_cuts_after_the_wake_word(segment):
+    spotter = WakeWordSpotter('shell')
+    decoder = FakeDecoder('shell', [Segment('<sil>', start=0, duration=10), segment])
+    spotter.load = lambda rate=16000: decoder
+    pcm = SECOND * 3
+    # the word ends at frame 50 = 0.5 s
+    assert spotter.spot(pcm, RATE) == len(SECOND) // 2
+    assert len(decoder.processed) == len(SECOND) * 2   # window_s only
+    spotter.enabled = True
+    assert spotter.gate(pcm, RATE) == pcm[len(SECOND) // 2:]
+
+
+def test_spot_without_keyphrase():
+    spotter = WakeWordSpotter('shell')
+    spotter.load = lambda rate=16000: FakeDecoder('', [])
+    assert spotter.spot(SECOND, RATE) is None
+
+
+def core(spotter):
+    return types.SimpleNamespace(wake=spotter, call_soon=lambda fn, *args: None,
+                                 _update_wake_stats=lambda: None, voice_output=print, set_status=print)
+
+
+def test_filter_strips_wake_word_from_alternatives(spotter):
+    hypotheses = [('shell list files', 0.9), ('shell least files', 0.4), ('shell', 0.1)]
+    assert ShellCore._wake_filter(core(spotter), hypotheses, streamed=False) == [
+        ('list files', 0.9), ('least files', 0.4)]
+    assert ShellCore._wake_filter(core(spotter), 'shell', streamed=False) is None
+
+
+def test_filter_checks_streamed_transcripts(spotter):
+    assert ShellCore._wake_filter(core(spotter), [('list files', None)], streamed=True) is None
+    assert ShellCore._wake_filter(core(spotter), [('shell list files', None)], streamed=True) == [
+        ('list files', None)]
+
+
+def test_failing_spotter_turns_the_gate_off(spotter):
+    def broken(pcm, rate, width=2):
+        raise ValueError("no model")
+    spotter.spot = broken
+    assert ShellCore._wake_gate(core(spotter), SECOND, RATE, 2) == SECOND
+    assert not spotter.enabled
@@ -0,0 +1,214 @@
+"""
+Asynchronous text-to-speech worker.
+
+The pyttsx3 engine lives on its own thread, so ``speak`` returns at once
+instead of blocking in ``runAndWait`` on the Tk thread. Pending messages
+sit in a small bounded queue: when it is full the oldest message is
+dropped, and a repeat of what is already queued or playing is merged away.
+Fixed status phrases are rendered to WAV once and replayed from a disk
+cache.
+"""
+import hashlib
+import os
+import threading
+import time
+import wave
+from collections import deque
+
+from deps import pyaudio
+
+# Phrases the app repeats constantly; rendered once and replayed from cache
+COMMON_PHRASES = (
+    "Command executed successfully",
+    "Command failed",
+    "Command not recognized",
+    "Command timed out",
+    "Command cancelled",
+    "Application launched",
+    "Directory changed",
+    "Directory not found",
+    "Directory created",
+    "File created",
+    "File deleted",
+    "File not found",
+    "Source not found",
+    "Log saved",
+    "Unexpected error",
+)
+
+
+class TTSWorker:
+    def __init__(self, engine_factory, cache_dir=None, cached_phrases=COMMON_PHRASES, max_pending=1, autostart=True):
+        self._engine_factory = engine_factory
+        self.cache_dir = cache_dir
+        self.cached_phrases = tuple(cached_phrases)
+        self._pending = deque(maxlen=max_pending)
+        self._cond = threading.Condition()
+        self._interrupt = threading.Event()
+        self._stopped = False
+        self._current = None
+        self.engine = None
+        self.spoken = 0
+        self.dropped = 0
+        self.cache_hits = 0
+        self._thread = threading.Thread(target=self._run, name='speakshell-tts', daemon=True)
+        if autostart:
+            self.start()
+
+    def start(self):
+        """Start the worker (creates the engine); say() does this on first use."""
+        with self._cond:
+            if not self._thread.is_alive() and not self._stopped and self._thread.ident is None:
+                self._thread.start()
+
+    # --- caller side ---
+    def say(self, text, interrupt=False):
+        """Queue ``text``; with interrupt=True cut off whatever is playing."""
+        self.start()
+        with self._cond:
+            if text == self._current and not interrupt:
+                self.dropped += 1
+                return
+            if text in self._pending:
+                self.dropped += 1
+                return
+            if len(self._pending) == self._pending.maxlen:
+                self.dropped += 1
+            self._pending.append(text)
+            if interrupt:
+                self._interrupt.set()
+            self._cond.notify()
+
+    def interrupt(self):
+        """Drop everything queued and stop the current utterance."""
+        with self._cond:
+            self.dropped += len(self._pending)
+            self._pending.clear()
+            self._interrupt.set()
+
+    def shutdown(self):
+        with self._cond:
+            self._stopped = True
+            self._pending.clear()
+            self._interrupt.set()
+            self._cond.notify()
+
+    # --- worker thread ---
+    def _run(self):
+        try:
+            self.engine = self._engine_factory()
+            self.engine.connect('started-word', self._on_word)
+        except Exception:
+            self.engine = None
+            return
+        # pre-render cached phrases; gives way as soon as a message arrives
+        self._warm_cache()
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                text = self._pending.popleft()
+                self._current = text
+                self._interrupt.clear()
+            try:
+                path = self._cached_path(text)
+                if path and os.path.exists(path) and self._play_wav(path):
+                    self.cache_hits += 1
+                else:
+                    self.engine.say(text)
+                    self.engine.runAndWait()
+                self.spoken += 1
+            except Exception:
+                pass
+            finally:
+                with self._cond:
+                    self._current = None
+
+    def _on_word(self, name, location, length):
+        if self._interrupt.is_set():
+            try:
+                self.engine.stop()
+            except Exception:
+                pass
+
+    # --- phrase cache ---
+    def _cached_path(self, text):
+        if not self.cache_dir or text not in self.cached_phrases:
+            return None
+        try:
+            voice = self.engine.getProperty('voice')
+            rate = self.engine.getProperty('rate')
+        except Exception:
+            voice, rate = '', ''
+        key = hashlib.sha1(f'{voice}|{rate}|{text}'.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f'{key}.wav')
+
+    def _warm_cache(self):
+        if not self.cache_dir or not _player_available():
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        except OSError:
+            return
+        for text in self.cached_phrases:
+            if self._pending or self._stopped:
+                return
+            path = self._cached_path(text)
+            if os.path.exists(path):
+                continue
+            try:
+                tmp = path + '.tmp.wav'
+                self.engine.save_to_file(text, tmp)
+                self.engine.runAndWait()
+                if os.path.exists(tmp) and os.path.getsize(tmp) > 44:
+                    os.replace(tmp, path)
+            except Exception:
+                pass
+
+    def _play_wav(self, path):
+        """Play a cached WAV, stopping early on interrupt. False if no player."""
+        if os.name == 'nt':
+            try:
+                import winsound
+                with wave.open(path, 'rb') as wf:
+                    duration = wf.getnframes() / float(wf.getframerate())
+                winsound.PlaySound(path, winsound.SND_FILENAME | winsound.SND_ASYNC)
+                end = time.time() + duration
+                while time.time() < end:
+                    if self._interrupt.wait(0.02):
+                        winsound.PlaySound(None, 0)
+                        break
+                return True
+            except Exception:
+                return False
+        if not pyaudio:
+            return False
+        pa = None
+        try:
+            # a failing audio device falls back to engine.say in _run
+            pa = pyaudio.PyAudio()
+            with wave.open(path, 'rb') as wf:
+                stream = pa.open(format=pa.get_format_from_width(wf.getsampwidth()),
+                                 channels=wf.getnchannels(), rate=wf.getframerate(), output=True)
+                try:
+                    data = wf.readframes(1024)
+                    while data and not self._interrupt.is_set():
+                        stream.write(data)
+                        data = wf.readframes(1024)
+                finally:
+                    stream.stop_stream()
+                    stream.close()
+            return True
+        except Exception:
+            return False
+        finally:
+            if pa is not None:
+                pa.terminate()
+
+
+def _player_available():
+    if os.name == 'nt':
+        return True
+    return bool(pyaudio)
@@ -0,0 +1,136 @@
+"""
+Voice-activity detection between capture and recognition.
+
+Captured phrases are cut into short frames and each frame is classified
+as speech or not (webrtcvad when installed, otherwise frame energy against
+the calibrated threshold). Leading and trailing silence is trimmed, long
+pauses split a buffer into separate phrases, and segments with too little
+speech are dropped before they cost a decode or an upload.
+"""
+import math
+import operator
+from array import array
+
+from deps import webrtcvad
+
+
+def pcm_rms(pcm, sample_width=2):
+    """RMS energy of a little-endian 16-bit PCM chunk (same scale as recognizer.energy_threshold)."""
+    if sample_width != 2:
+        return 0.0
+    samples = array('h')
+    samples.frombytes(pcm[:len(pcm) // 2 * 2])
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(map(operator.mul, samples, samples)) / len(samples))
+
+
+class VoiceActivityDetector:
+    """
+    level: 0 disables the stage, 1-3 trade recall for aggressiveness (the
+    webrtcvad mode, or 1x/1.5x/2x the energy threshold).
+    """
+    ENERGY_RATIOS = {1: 1.0, 2: 1.5, 3: 2.0}
+
+    def __init__(self, level=2, frame_ms=30, min_speech_ms=150, split_gap_ms=600, pad_ms=150,
+                 energy_threshold=300):
+        self.frame_ms = frame_ms
+        self.min_speech_ms = min_speech_ms
+        self.split_gap_ms = split_gap_ms
+        self.pad_ms = pad_ms
+        self.energy_threshold = energy_threshold
+        self._vad = None
+        self.level = 0
+        self.set_level(level)
+        self.reset_stats()
+
+    def set_level(self, level):
+        self.level = max(0, min(3, int(level)))
+        # webrtcvad.Vad is created on the first frame (keeps the import off startup)
+        self._vad = None
+        self._vad_ready = False
+
+    def _detector(self):
+        if not self._vad_ready:
+            self._vad_ready = True
+            if self.level and webrtcvad:
+                try:
+                    self._vad = webrtcvad.Vad(self.level)
+                except Exception:
+                    self._vad = None
+        return self._vad
+
+    def reset_stats(self):
+        self.seconds_in = 0.0
+        self.seconds_dropped = 0.0
+        self.segments_out = 0
+        self.segments_dropped = 0
+
+    @property
+    def enabled(self):
+        return self.level > 0
+
+    def is_speech(self, frame, sample_rate, sample_width=2):
+        vad = self._detector()
+        if vad is not None and sample_width == 2 and sample_rate in (8000, 16000, 32000, 48000):
+            try:
+                return vad.is_speech(frame, sample_rate)
+            except Exception:
+                pass
+        return pcm_rms(frame, sample_width) > self.energy_threshold * self.ENERGY_RATIOS.get(self.level, 1.0)
+
+    def split(self, pcm, sample_rate, sample_width=2):
+        """Return the speech segments of ``pcm`` (list of bytes), updating the counters."""
+        bytes_per_second = sample_rate * sample_width
+        total = len(pcm) / float(bytes_per_second) if bytes_per_second else 0.0
+        self.seconds_in += total
+        if not self.enabled:
+            self.segments_out += 1
+            return [pcm]
+
+        frame_bytes = int(sample_rate * self.frame_ms / 1000) * sample_width
+        n_frames = len(pcm) // frame_bytes
+        flags = [self.is_speech(pcm[i * frame_bytes:(i + 1) * frame_bytes], sample_rate, sample_width)
+                 for i in range(n_frames)]
+
+        gap_frames = max(1, self.split_gap_ms // self.frame_ms)
+        pad_frames = self.pad_ms // self.frame_ms
+        min_frames = max(1, self.min_speech_ms // self.frame_ms)
+
+        # runs of speech frames separated by at least gap_frames of silence
+        regions = []
+        start = last = None
+        speech_count = 0
+        for i, flag in enumerate(flags):
+            if not flag:
+                continue
+            if start is not None and i - last > gap_frames:
+                regions.append((start, last, speech_count))
+                start = None
+            if start is None:
+                start, speech_count = i, 0
+            last = i
+            speech_count += 1
+        if start is not None:
+            regions.append((start, last, speech_count))
+
+        segments = []
+        kept = 0
+        for start, last, count in regions:
+            if count < min_frames:
+                self.segments_dropped += 1
+                continue
+            lo = max(0, start - pad_frames) * frame_bytes
+            hi = min(n_frames, last + 1 + pad_frames) * frame_bytes
+            segments.append(pcm[lo:hi])
+            kept += hi - lo
+        if not regions:
+            self.segments_dropped += 1
+        self.segments_out += len(segments)
+        self.seconds_dropped += (len(pcm) - kept) / float(bytes_per_second)
+        return segments
+
+    def stats_text(self):
+        pct = (self.seconds_dropped / self.seconds_in * 100) if self.seconds_in else 0.0
+        return (f"VAD: dropped {self.seconds_dropped:.1f}s of {self.seconds_in:.1f}s ({pct:.0f}%), "
+                f"{self.segments_dropped} noise segments")
@@ -0,0 +1,89 @@
+"""
+Virtualized list for the history pane.
+
+A Tk Listbox holding hundreds of thousands of items is slow to fill and
+to update. ``VirtualList`` keeps only the visible rows in the Listbox and
+drives its own scrollbar: ``fetch(start, count)`` supplies rows on demand
+and ``size()`` the total, so scrolling or adding a command costs one
+screenful of inserts whatever the history size.
+"""
+import tkinter as tk
+
+
+class VirtualList:
+    def __init__(self, parent, fetch, size, height=10, **listbox_options):
+        self.fetch = fetch
+        self.size = size
+        self.height = height
+        self.offset = 0
+        self.frame = tk.Frame(parent, bg=listbox_options.get('bg'))
+        self.listbox = tk.Listbox(self.frame, height=height, **listbox_options)
+        self.scrollbar = tk.Scrollbar(self.frame, orient='vertical', command=self._on_scroll)
+        self.scrollbar.pack(side='right', fill='y')
+        self.listbox.pack(side='left', fill='both', expand=True)
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            self.listbox.bind(sequence, self._on_wheel)
+        self.listbox.bind('<Up>', lambda e: self._on_key(-1))
+        self.listbox.bind('<Down>', lambda e: self._on_key(1))
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def bind(self, sequence, func):
+        self.listbox.bind(sequence, func)
+
+    def selected(self):
+        """Text of the selected row, or None."""
+        sel = self.listbox.curselection()
+        return self.listbox.get(sel[0]) if sel else None
+
+    def config(self, **options):
+        self.listbox.config(**options)
+
+    def refresh(self):
+        """Reload the visible rows (after the data changed)."""
+        total = self.size()
+        self.offset = max(0, min(self.offset, total - self.height))
+        rows = self.fetch(self.offset, self.height)
+        self.listbox.delete(0, 'end')
+        if rows:
+            self.listbox.insert('end', *rows)
+        if total <= self.height:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self.offset / total, (self.offset + len(rows)) / total)
+
+    def scroll_to(self, offset):
+        offset = max(0, min(int(offset), self.size() - self.height))
+        self.offset = offset
+        self.refresh()
+
+    def _on_scroll(self, action, amount, unit=None):
+        if action == 'moveto':
+            self.scroll_to(float(amount) * self.size())
+        elif action == 'scroll':
+            step = self.height - 1 if unit == 'pages' else 1
+            self.scroll_to(self.offset + int(amount) * step)
+
+    def _on_wheel(self, event):
+        if getattr(event, 'num', None) == 4 or getattr(event, 'delta', 0) > 0:
+            self.scroll_to(self.offset - 3)
+        else:
+            self.scroll_to(self.offset + 3)
+        return 'break'
+
+    def _on_key(self, direction):
+        # move the selection, scrolling the window at its edges
+        sel = self.listbox.curselection()
+        index = (sel[0] if sel else -1) + direction
+        if 0 <= index < self.listbox.size():
+            self.listbox.selection_clear(0, 'end')
+            self.listbox.selection_set(index)
+            self.listbox.activate(index)
+        elif index < 0 < self.offset or index >= self.listbox.size():
+            self.scroll_to(self.offset + direction)
+            self.listbox.selection_clear(0, 'end')
+            edge = 0 if direction < 0 else self.listbox.size() - 1
+            self.listbox.selection_set(edge)
+            self.listbox.activate(edge)
+        return 'break'
@@ -1,27 +1,27 @@
 import os
-import subprocess
-import threading
+import re
 import tkinter as tk
-from tkinter import scrolledtext, messagebox
-import time
-from datetime import datetime
-
-from deps import (
-    SPEECH_RECOGNITION_AVAILABLE,
-    PYAUDIO_AVAILABLE,
-    TTS_AVAILABLE,
-    TOAST_AVAILABLE,
-    sr,
-    pyttsx3,
-    ToastNotifier,
-    psutil,
-)
-
-
-class HighAccuracyVoiceCMD:
+from tkinter import scrolledtext, messagebox, filedialog, ttk
+
+from deps import sr
+from output_pane import OutputPane
+from virtual_list import VirtualList
+from engines import available_backends
+from shell_core import ShellCore
+from startup import PROFILE
+from client import DaemonError, RemoteHistory
+from metrics import LatencyMetrics
+from preprocess import AudioPreprocessor
+from resultcache import ResultCache
+from vad import VoiceActivityDetector
+from wakeword import DEFAULT_PHRASE, WakeWordSpotter
+
+
+class HighAccuracyVoiceCMD(ShellCore):
     """
     Voice CMD Terminal (moved from single-file project). Logic and
-    behavior are preserved; this module only houses the main class.
+    behavior are preserved; this module only houses the Tk front end
+    (command handling lives in shell_core.py).
     """
     def __init__(self):
         self.root = tk.Tk()
@@ -38,67 +38,35 @@ class HighAccuracyVoiceCMD:
         self.ok_fg = '#00FF00'
 
         self.root.configure(bg=self.bg_color)
+        PROFILE.mark('tk root')
 
-        # Recognizer
-        self.recognizer = None
-        self.microphone = None
-
-        self.voice_enabled = SPEECH_RECOGNITION_AVAILABLE and PYAUDIO_AVAILABLE
-        if self.voice_enabled and sr is not None:
-            self.recognizer = sr.Recognizer()
-            # tuned parameters
-            self.recognizer.energy_threshold = 300
-            self.recognizer.dynamic_energy_threshold = True
-            # these attributes may not exist on all versions; guard
-            try:
-                self.recognizer.dynamic_energy_adjustment_damping = 0.15
-                self.recognizer.dynamic_energy_ratio = 1.5
-            except Exception:
-                pass
-            self.recognizer.pause_threshold = 0.8
-            self.recognizer.operation_timeout = None
-            # phrase and non_speaking are optional
-            try:
-                self.recognizer.phrase_threshold = 0.3
-                self.recognizer.non_speaking_duration = 0.5
-            except Exception:
-                pass
-
-        # TTS
-        self.tts_enabled = TTS_AVAILABLE
-        try:
-            self.tts_engine = pyttsx3.init() if (TTS_AVAILABLE and pyttsx3 is not None) else None
-        except Exception:
-            self.tts_engine = None
-
-        # Toast
-        self.toaster = ToastNotifier() if (TOAST_AVAILABLE and ToastNotifier is not None) else None
-
-        self.is_listening = False
-
-        self.command_history = []
-        self.activity_log = []
+        super().__init__()
+        PROFILE.mark('core init')
+        # open sessions in tab order; voice and typed commands go to the active one
+        self.sessions = [self]
+        self.active = self
 
-        # Enhanced voice control parameters (exposed in UI)
-        self.phrase_time_limit = 7
-        self.listen_timeout = 10
-        self.energy_threshold = 300
-        # recognition engine: 'google' or 'sphinx' (if available)
-        self.recognition_engine = 'google'
-
-        # Track current working directory for navigation
-        self.cwd = os.getcwd()
+        self.activity_listbox_max = 500
+        # scrollback kept in the output pane (oldest lines are dropped)
+        self.output_max_lines = 5000
 
         self.create_simple_gui()
+        PROFILE.mark('widgets')
+        # optional dependencies load once the window is drawn and idle
+        self.root.after_idle(self._on_first_idle)
 
-    def create_simple_gui(self):
-        # Build a richer UI: menu, toolbar, output pane, history pane and controls
-        self.root.configure(bg=self.bg_color)
+    def _on_first_idle(self):
+        PROFILE.ready()
+        self.warm_up(on_done=lambda: self.call_soon(PROFILE.print_report))
 
+    def create_simple_gui(self):
         # Menu
         menubar = tk.Menu(self.root)
         file_menu = tk.Menu(menubar, tearoff=0)
         file_menu.add_command(label="Save Log", command=self.save_log)
+        file_menu.add_command(label="Run Script...", command=self._on_run_script)
+        file_menu.add_command(label="New Tab", command=self.new_tab, accelerator="Ctrl+T")
+        file_menu.add_command(label="Close Tab", command=lambda: self.close_tab(self.active), accelerator="Ctrl+W")
         file_menu.add_separator()
         file_menu.add_command(label="Exit", command=self.root.destroy)
         menubar.add_cascade(label="File", menu=file_menu)
@@ -122,25 +90,30 @@ class HighAccuracyVoiceCMD:
         self.stop_btn = tk.Button(toolbar, text="Stop Listening", command=self.stop_listening, bg=self.button_bg, fg='#FF5555', state='disabled')
         self.stop_btn.pack(side='left', padx=4)
         tk.Button(toolbar, text="Calibrate Mic", command=self.calibrate_mic, bg=self.button_bg, fg=self.button_fg).pack(side='left', padx=4)
-        tk.Button(toolbar, text="Clear", command=self.clear_screen, bg=self.button_bg, fg=self.button_fg).pack(side='left', padx=4)
+        tk.Button(toolbar, text="Clear", command=lambda: self.active.clear_screen(), bg=self.button_bg, fg=self.button_fg).pack(side='left', padx=4)
         tk.Button(toolbar, text="Save Log", command=self.save_log, bg=self.button_bg, fg=self.button_fg).pack(side='left', padx=4)
+        tk.Button(toolbar, text="Cancel Jobs", command=lambda: self.active.cancel_jobs(), bg=self.button_bg, fg=self.err_fg).pack(side='left', padx=4)
+        tk.Button(toolbar, text="New Tab", command=self.new_tab, bg=self.button_bg, fg=self.button_fg).pack(side='left', padx=4)
+        self.tts_var = tk.BooleanVar(value=self.voice_feedback)
+        tk.Checkbutton(toolbar, text="Voice feedback", variable=self.tts_var, command=self._on_tts_toggle, bg=self.bg_color, fg=self.text_color, selectcolor=self.button_bg, activebackground=self.bg_color).pack(side='left', padx=4)
 
         # Engine selector and sliders
         engine_frame = tk.Frame(toolbar, bg=self.bg_color)
         engine_frame.pack(side='right')
         tk.Label(engine_frame, text="Engine:", bg=self.bg_color, fg=self.text_color).pack(side='left')
         self.engine_var = tk.StringVar(value=self.recognition_engine)
-        engines = ['google']
-        if sr is not None and hasattr(sr, 'Recognizer') and hasattr(sr, 'Recognizer') and hasattr(sr, 'AudioFile'):
-            # pocketsphinx detection heuristic
-            try:
-                import pocketsphinx  # type: ignore
-                engines.append('sphinx')
-            except Exception:
-                pass
-        self.engine_menu = tk.OptionMenu(engine_frame, self.engine_var, *engines)
+        # registered backends whose packages are installed (see engines.py)
+        engine_names = available_backends() or ['google']
+        self.engine_menu = tk.OptionMenu(engine_frame, self.engine_var, *engine_names)
         self.engine_menu.config(bg=self.button_bg, fg=self.button_fg)
         self.engine_menu.pack(side='left', padx=4)
+        self.constrained_var = tk.BooleanVar(value=self.constrained_decoding)
+        tk.Checkbutton(engine_frame, text="Commands only", variable=self.constrained_var, command=self._on_constrained_toggle, bg=self.bg_color, fg=self.text_color, selectcolor=self.button_bg, activebackground=self.bg_color).pack(side='left', padx=4)
+        self.preprocess_var = tk.BooleanVar(value=self.preprocessor.enabled)
+        self.preprocess_check = tk.Checkbutton(engine_frame, text="Clean audio", variable=self.preprocess_var, command=self._on_preprocess_toggle, bg=self.bg_color, fg=self.text_color, selectcolor=self.button_bg, activebackground=self.bg_color)
+        if not self.preprocessor.available:
+            self.preprocess_check.config(state='disabled')
+        self.preprocess_check.pack(side='left', padx=4)
 
         # Main panes
         content = tk.Frame(self.root, bg=self.bg_color)
@@ -150,8 +123,14 @@ class HighAccuracyVoiceCMD:
         left = tk.Frame(content, bg=self.bg_color)
         left.pack(side='left', fill='both', expand=True)
 
-        self.output_text = scrolledtext.ScrolledText(left, wrap='word', font=('Consolas', 11), bg=self.bg_color, fg=self.text_color, insertbackground=self.text_color, relief='flat', padx=8, pady=8)
-        self.output_text.pack(fill='both', expand=True)
+        # one tab per session; the window itself is the first (see SessionTab)
+        self.notebook = ttk.Notebook(left)
+        self.notebook.pack(fill='both', expand=True)
+        self.notebook.enable_traversal()
+        self.frame = tk.Frame(self.notebook, bg=self.bg_color)
+        self.output_text, self.output = self._make_output(self.frame)
+        self.notebook.add(self.frame, text=self._tab_title(self))
+        self.notebook.bind('<<NotebookTabChanged>>', self._on_tab_changed)
 
         input_frame = tk.Frame(left, bg=self.bg_color)
         input_frame.pack(fill='x', pady=(6,0))
@@ -159,16 +138,30 @@ class HighAccuracyVoiceCMD:
         self.input_entry = tk.Entry(input_frame, font=('Consolas', 12), bg=self.bg_color, fg=self.text_color, insertbackground=self.text_color, relief='flat', bd=0)
         self.input_entry.pack(side='left', fill='x', expand=True)
         self.input_entry.bind('<Return>', lambda e: self.execute_input())
+        # inline completion from the saved history (history.py)
+        self.input_entry.bind('<KeyRelease>', self._on_input_key)
+        self.input_entry.bind('<Tab>', self._accept_completion)
+        self.input_entry.bind('<Up>', lambda e: self._cycle_completion(-1))
+        self.input_entry.bind('<Down>', lambda e: self._cycle_completion(1))
+        self._completions = []
+        self._completion_index = 0
         tk.Button(input_frame, text="Execute", command=self.execute_input, bg=self.button_bg, fg=self.button_fg).pack(side='left', padx=6)
 
         # Right: history & activity
         right = tk.Frame(content, width=320, bg=self.bg_color)
         right.pack(side='right', fill='y')
 
-        tk.Label(right, text="History", bg=self.bg_color, fg=self.warn_fg, font=('Consolas', 11, 'bold')).pack(anchor='nw', padx=6, pady=(2,0))
-        self.history_listbox = tk.Listbox(right, height=10, bg='#111111', fg='#AAAAAA', activestyle='dotbox')
-        self.history_listbox.pack(fill='x', padx=6, pady=(0,6))
-        self.history_listbox.bind('<Double-1>', self._on_history_double)
+        history_head = tk.Frame(right, bg=self.bg_color)
+        history_head.pack(fill='x', padx=6, pady=(2,0))
+        tk.Label(history_head, text="History", bg=self.bg_color, fg=self.warn_fg, font=('Consolas', 11, 'bold')).pack(side='left')
+        self.tab_history_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(history_head, text="This tab only", variable=self.tab_history_var, command=lambda: self.history_list.scroll_to(0), bg=self.bg_color, fg=self.text_color, selectcolor=self.button_bg, activebackground=self.bg_color).pack(side='right')
+        # most recent first; only the visible rows are loaded (virtual_list.py)
+        self.history_list = VirtualList(right, fetch=self._history_rows, size=self._history_size, height=10,
+                                        bg='#111111', fg='#AAAAAA', activestyle='dotbox')
+        self.history_list.pack(fill='x', padx=6, pady=(0,6))
+        self.history_list.bind('<Double-1>', self._on_history_double)
+        self.history_list.refresh()
 
         tk.Label(right, text="Activity Log", bg=self.bg_color, fg=self.text_color, font=('Consolas', 10, 'bold')).pack(anchor='nw', padx=6)
         self.activity_listbox = tk.Listbox(right, height=12, bg='#111111', fg='#CCCCCC')
@@ -181,6 +174,12 @@ class HighAccuracyVoiceCMD:
         self.status_label.pack(side='left', padx=6)
         self.cwd_label = tk.Label(status, text=f"CWD: {self.cwd}", font=('Consolas', 9), bg=self.bg_color, fg='#00CED1')
         self.cwd_label.pack(side='right', padx=6)
+        # rolling per-stage latency (metrics.py); empty until the first command finishes
+        self.latency_label = tk.Label(status, text="", font=('Consolas', 9), bg=self.bg_color, fg='#888888')
+        self.latency_label.pack(side='right', padx=6)
+        # reused query results (resultcache.py)
+        self.cache_label = tk.Label(status, text=self.results.stats_text(), font=('Consolas', 9), bg=self.bg_color, fg='#888888')
+        self.cache_label.pack(side='right', padx=6)
 
         # welcome
         welcome = """
@@ -190,7 +189,7 @@ Speak Shell — type commands or use voice. Use the toolbar to calibrate mic or
         self.output_text.see('end')
 
         # expose controls
-        self.engine_var.trace_add('write', lambda *a: setattr(self, 'recognition_engine', self.engine_var.get()))
+        self.engine_var.trace_add('write', lambda *a: self._on_engine_change(self.engine_var.get()))
 
         # sliders for advanced tuning
         tuning = tk.Frame(right, bg=self.bg_color)
@@ -203,6 +202,40 @@ Speak Shell — type commands or use voice. Use the toolbar to calibrate mic or
         self.phrase_slider = tk.Scale(tuning, from_=2, to=12, orient='horizontal', bg=self.bg_color, fg=self.text_color, troughcolor='#222222', command=self._on_phrase_change)
         self.phrase_slider.set(self.phrase_time_limit)
         self.phrase_slider.pack(fill='x')
+        tk.Label(tuning, text="VAD level (0=off)", bg=self.bg_color, fg=self.text_color).pack(anchor='w')
+        self.vad_slider = tk.Scale(tuning, from_=0, to=3, orient='horizontal', bg=self.bg_color, fg=self.text_color, troughcolor='#222222', command=self._on_vad_level_change)
+        self.vad_slider.set(self.vad.level)
+        self.vad_slider.pack(fill='x')
+        tk.Label(tuning, text="Min speech (ms)", bg=self.bg_color, fg=self.text_color).pack(anchor='w')
+        self.min_speech_slider = tk.Scale(tuning, from_=30, to=600, resolution=30, orient='horizontal', bg=self.bg_color, fg=self.text_color, troughcolor='#222222', command=self._on_min_speech_change)
+        self.min_speech_slider.set(self.vad.min_speech_ms)
+        self.min_speech_slider.pack(fill='x')
+        self.vad_label = tk.Label(tuning, text=self.vad.stats_text(), bg=self.bg_color, fg='#888888', font=('Consolas', 8), anchor='w', justify='left', wraplength=300)
+        self.vad_label.pack(fill='x')
+        wake_row = tk.Frame(tuning, bg=self.bg_color)
+        wake_row.pack(fill='x')
+        self.wake_var = tk.BooleanVar(value=self.wake.enabled)
+        self.wake_check = tk.Checkbutton(wake_row, text="Wake word", variable=self.wake_var, command=self._on_wake_toggle, bg=self.bg_color, fg=self.text_color, selectcolor=self.button_bg, activebackground=self.bg_color)
+        if not self.wake.available:
+            self.wake_check.config(state='disabled')
+        self.wake_check.pack(side='left')
+        self.wake_entry = tk.Entry(wake_row, width=12, bg=self.bg_color, fg=self.text_color, insertbackground=self.text_color)
+        self.wake_entry.insert(0, self.wake.phrase)
+        self.wake_entry.bind('<Return>', lambda e: self._on_wake_toggle())
+        self.wake_entry.pack(side='left', fill='x', expand=True, padx=4)
+        self.wake_label = tk.Label(tuning, text=self.wake.stats_text(), bg=self.bg_color, fg='#888888', font=('Consolas', 8), anchor='w', justify='left', wraplength=300)
+        self.wake_label.pack(fill='x')
+        tk.Label(tuning, text="Scrollback (lines)", bg=self.bg_color, fg=self.text_color).pack(anchor='w')
+        self.scrollback_slider = tk.Scale(tuning, from_=500, to=20000, resolution=500, orient='horizontal', bg=self.bg_color, fg=self.text_color, troughcolor='#222222', command=self._on_scrollback_change)
+        self.scrollback_slider.set(self.output_max_lines)
+        self.scrollback_slider.pack(fill='x')
+        tk.Label(tuning, text="Recognizer workers (next start)", bg=self.bg_color, fg=self.text_color).pack(anchor='w')
+        self.pool_slider = tk.Scale(tuning, from_=1, to=8, orient='horizontal', bg=self.bg_color, fg=self.text_color, troughcolor='#222222', command=self._on_pool_change)
+        self.pool_slider.set(self.recognizer_pool_size)
+        self.pool_slider.pack(fill='x')
+
+        self.root.bind('<Control-t>', lambda e: self.new_tab())
+        self.root.bind('<Control-w>', lambda e: self.close_tab(self.active))
 
         # ensure focus
         self.input_entry.focus_set()
@@ -226,35 +259,32 @@ Speak Shell — type commands or use voice. Use the toolbar to calibrate mic or
             self.ok_fg = '#00FF00'
         # Apply to some widgets
         try:
-            self.output_text.config(bg=self.bg_color, fg=self.text_color, insertbackground=self.text_color)
+            for session in self.sessions:
+                session.output_text.config(bg=self.bg_color, fg=self.text_color, insertbackground=self.text_color)
+                session.frame.config(bg=self.bg_color)
             self.input_entry.config(bg=self.bg_color, fg=self.text_color)
             self.status_label.config(bg=self.bg_color, fg=self.ok_fg)
             self.cwd_label.config(bg=self.bg_color)
+            self.latency_label.config(bg=self.bg_color)
+            self.cache_label.config(bg=self.bg_color)
         except Exception:
             pass
 
     def calibrate_mic(self):
-        if sr is None or self.recognizer is None:
+        if not sr or not self.voice_enabled:
             messagebox.showinfo("Calibrate", "SpeechRecognition not available")
             return
-        # Run a short calibration on a background thread to avoid blocking UI
-        def _cal():
-            try:
-                with sr.Microphone(sample_rate=16000) as src:
-                    self.root.after(0, self.print_output, "[Calibrate] Listening to ambient noise for 2s...")
-                    self.recognizer.adjust_for_ambient_noise(src, duration=2)
-                    # update energy threshold in UI
-                    self.energy_threshold = getattr(self.recognizer, 'energy_threshold', self.energy_threshold)
-                    self.root.after(0, lambda: self.energy_slider.set(self.energy_threshold))
-                    self.root.after(0, self.print_output, f"[Calibrate] Done. energy_threshold={self.energy_threshold}")
-            except Exception as e:
-                self.root.after(0, self.print_output, f"[Calibrate] Error: {e}")
-        threading.Thread(target=_cal, daemon=True).start()
+        super().calibrate_mic()
+
+    def _on_calibrated(self):
+        # update energy threshold in UI
+        self.energy_slider.set(self.energy_threshold)
 
     def _on_energy_change(self, val):
         try:
             v = int(val)
             self.energy_threshold = v
+            self.vad.energy_threshold = v
             if self.recognizer:
                 try:
                     self.recognizer.energy_threshold = v
@@ -263,179 +293,233 @@ Speak Shell — type commands or use voice. Use the toolbar to calibrate mic or
         except Exception:
             pass
 
-    def _on_phrase_change(self, val):
+    def _on_preprocess_toggle(self):
+        self.preprocessor.enabled = bool(self.preprocess_var.get()) and self.preprocessor.available
+
+    def _on_vad_level_change(self, val):
         try:
-            v = int(val)
-            self.phrase_time_limit = v
+            self.vad.set_level(int(val))
         except Exception:
             pass
 
-    def _on_history_double(self, event):
+    def _on_min_speech_change(self, val):
         try:
-            sel = self.history_listbox.curselection()
-            if sel:
-                cmd = self.history_listbox.get(sel[0])
-                # run the command again
-                self.input_entry.delete(0, tk.END)
-                self.input_entry.insert(0, cmd)
-                self.execute_input()
+            self.vad.min_speech_ms = int(val)
         except Exception:
             pass
 
-    def speak(self, text):
-        if getattr(self, 'tts_var', None) and self.tts_var.get() and self.tts_engine:
-            try:
-                self.tts_engine.say(text)
-                self.tts_engine.runAndWait()
-            except Exception:
-                pass
-
-    def toast(self, title, msg, duration=4):
+    def _update_vad_stats(self):
         try:
-            if self.toaster:
-                self.toaster.show_toast(title, msg, duration=duration, threaded=True)
+            self.vad_label.config(text=self.vad.stats_text())
         except Exception:
             pass
 
-    def print_output(self, text, newline=True):
-        self.output_text.insert('end', text)
-        if newline:
-            self.output_text.insert('end', '\n')
-        self.output_text.see('end')
+    def _on_wake_toggle(self):
+        self.wake_var.set(self.set_wake_word(bool(self.wake_var.get()), self.wake_entry.get()))
 
-    def update_cwd(self, new_path=None):
-        if new_path:
-            self.cwd = new_path
-        self.cwd_label.config(text=f"CWD: {self.cwd}")
+    def _update_wake_stats(self):
+        # also follows "wake word on/off" typed or spoken in any tab
+        try:
+            self.wake_label.config(text=self.wake.stats_text())
+            self.wake_var.set(self.wake.enabled)
+        except Exception:
+            pass
 
-    def start_listening(self):
-        if not self.voice_enabled or self.is_listening:
-            return
-        self.is_listening = True
-        self.status_label.config(text="Status: LISTENING | Speak clearly for best accuracy", fg=self.warn_fg)
-        self.start_btn.config(state='disabled')
-        self.stop_btn.config(state='normal')
+    def _update_latency_stats(self):
+        try:
+            self.latency_label.config(text=self.latency.status_text())
+        except Exception:
+            pass
 
-        self.listen_thread = threading.Thread(target=self.high_accuracy_listen_loop, daemon=True)
-        self.listen_thread.start()
+    def _update_cache_stats(self):
+        try:
+            self.cache_label.config(text=self.results.stats_text())
+        except Exception:
+            pass
 
-        self.print_output("\n[Voice] High accuracy mode activated")
-        self.print_output("[Voice] Listening started with 90%+ accuracy settings...")
-        self.log_activity("VOICE", "High accuracy listening started")
+    def _on_phrase_change(self, val):
+        try:
+            v = int(val)
+            self.phrase_time_limit = v
+        except Exception:
+            pass
 
-    def stop_listening(self):
-        self.is_listening = False
-        self.status_label.config(text="Status: Ready ", fg=self.ok_fg)
-        if hasattr(self, 'start_btn'):
-            self.start_btn.config(state='normal')
-        if hasattr(self, 'stop_btn'):
-            self.stop_btn.config(state='disabled')
-        self.print_output("[Voice] Listening stopped.")
-        self.log_activity("VOICE", "Listening stopped")
+    def _on_constrained_toggle(self):
+        self.constrained_decoding = bool(self.constrained_var.get())
 
-    def high_accuracy_listen_loop(self):
-        if sr is None:
-            return
-        with sr.Microphone(sample_rate=16000) as source:
-            self.root.after(0, self.print_output, "[Voice] Calibrating for ambient noise...")
-            self.root.after(0, self.status_label.config, {"text": "Status: CALIBRATING (Please wait 2 seconds)...", "fg": "#00FFFF"})
-            try:
-                self.recognizer.adjust_for_ambient_noise(source, duration=2)
-            except Exception:
-                pass
-            self.root.after(0, self.print_output, "[Voice] Calibration complete!")
-            self.root.after(0, self.print_output, "[Voice] Ready! Speak your commands clearly...")
-            self.root.after(0, self.status_label.config, {"text": "Status: LISTENING | Speak now!", "fg": "#00FF00"})
-
-            while self.is_listening:
-                try:
-                    self.root.after(0, self.status_label.config, {"text": "Status: LISTENING | Speak clearly...", "fg": self.warn_fg})
-                    audio = self.recognizer.listen(source, timeout=getattr(self, 'listen_timeout', 10), phrase_time_limit=getattr(self, 'phrase_time_limit', 7))
-                    self.root.after(0, self.status_label.config, {"text": "Status: PROCESSING with high accuracy...", "fg": "#00FFFF"})
-
-                    # Choose recognition engine dynamically
-                    recognized = None
-                    try:
-                        if getattr(self, 'recognition_engine', 'google') == 'sphinx' and hasattr(self.recognizer, 'recognize_sphinx'):
-                            recognized = self.recognizer.recognize_sphinx(audio)
-                        else:
-                            recognized = self.recognizer.recognize_google(audio, language='en-US', show_all=False)
-                    except Exception as recog_err:
-                        # Pass through to outer handlers
-                        raise recog_err
-
-                    text = recognized
-                    if text and len(text) > 0:
-                        self.root.after(0, self.print_output, f"[Voice] Recognized: {text}")
-                        self.root.after(0, self.process_command, text, "voice")
-                except sr.WaitTimeoutError:
-                    continue
-                except sr.UnknownValueError:
-                    self.root.after(0, self.print_output, "[Voice] Could not understand - please speak more clearly")
-                    self.root.after(0, self.print_output, "[Voice] Tips: Speak at normal pace, reduce background noise")
-                    time.sleep(0.5)
-                except sr.RequestError as e:
-                    self.root.after(0, self.print_output, f"[Voice] ERROR: Google API error - {e}")
-                    self.root.after(0, self.print_output, "[Voice] Check internet connection")
-                    self.root.after(0, self.print_output, "[Voice] Use manual text input as backup")
-                    break
-                except Exception as e:
-                    self.root.after(0, self.print_output, f"[Voice] ERROR: {str(e)}")
-                    break
+    def _on_tts_toggle(self):
+        self.voice_feedback = bool(self.tts_var.get())
+        if not self.voice_feedback and self.tts:
+            self.tts.interrupt()
 
-    def execute_input(self):
-        command = self.input_entry.get().strip()
-        if command:
-            self.input_entry.delete(0, tk.END)
-            self.process_command(command, "manual")
+    def _on_scrollback_change(self, val):
+        try:
+            self.output_max_lines = int(val)
+            for session in self.sessions:
+                session.output.set_max_lines(self.output_max_lines)
+        except Exception:
+            pass
 
-    def process_command(self, command, source="manual"):
-        command = command.strip()
-        self.print_output(f"\n> {command}")
-        # record to history UI
+    def _on_run_script(self):
+        session = self.active
+        path = filedialog.askopenfilename(title="Run SpeakShell script", initialdir=session.cwd,
+                                          filetypes=[("Scripts", "*.txt"), ("All files", "*.*")])
+        if path:
+            session.run_script(path)
+
+    def _on_pool_change(self, val):
         try:
-            self.command_history.append(command)
-            if hasattr(self, 'history_listbox'):
-                self.history_listbox.insert('end', command)
+            self.recognizer_pool_size = int(val)
         except Exception:
             pass
-        self.log_activity(source.upper(), command)
 
-        # Exit flow
-        if any(w in command.lower() for w in ['exit', 'quit', 'close']):
-            self.print_output("Exiting...")
-            self.save_log()
-            self.root.after(700, self.root.destroy)
-            return
+    def _on_history_double(self, event):
+        try:
+            cmd = self.history_list.selected()
+            if cmd:
+                # run the command again
+                self.input_entry.delete(0, tk.END)
+                self.input_entry.insert(0, cmd)
+                self.execute_input()
+        except Exception:
+            pass
 
-        # Local interpreted meta-commands
-        if command.lower() == 'save log':
-            self.save_log()
+    def _history_rows(self, start, count):
+        if not self.tab_history_var.get():
+            return self.history.rows(start, count)
+        commands = self.active.session_history
+        end = len(commands) - start
+        return commands[max(0, end - count):end][::-1] if end > 0 and count > 0 else []
+
+    def _history_size(self):
+        return len(self.active.session_history) if self.tab_history_var.get() else len(self.history)
+
+    # --- sessions (tabs) ---
+    def _make_output(self, parent):
+        output_text = scrolledtext.ScrolledText(parent, wrap='word', font=('Consolas', 11), bg=self.bg_color, fg=self.text_color, insertbackground=self.text_color, relief='flat', padx=8, pady=8)
+        output_text.pack(fill='both', expand=True)
+        output = OutputPane(output_text, max_lines=self.output_max_lines, frame_ms=16,
+                            on_flush=lambda seconds: self.latency.observe('render', seconds))
+        return output_text, output
+
+    def _tab_title(self, session):
+        number = self.sessions.index(session) + 1 if session in getattr(self, 'sessions', ()) else 1
+        return f"{number}: {os.path.basename(session.cwd.rstrip(os.sep)) or session.cwd}"
+
+    def _retitle_tabs(self):
+        for session in self.sessions:
+            self.notebook.tab(session.frame, text=self._tab_title(session))
+
+    def new_tab(self, cwd=None):
+        """Open a session in a new tab, starting in the active session's folder."""
+        session = self._make_session(cwd or self.active.cwd)
+        self.sessions.append(session)
+        self.notebook.add(session.frame, text=self._tab_title(session))
+        self.notebook.select(session.frame)
+        session.print_output(f"Session {len(self.sessions)} - {session.cwd}\n")
+        self.log_activity("TAB", f"Opened tab {len(self.sessions)} in {session.cwd}")
+        return session
+
+    def _make_session(self, cwd):
+        return SessionTab(self, cwd)
+
+    def close_tab(self, session, ask=True):
+        if session is self:
+            self.print_output("The first tab cannot be closed (use 'exit' to quit)")
+            return False
+        if session not in self.sessions:
+            return False
+        busy = self._busy_jobs(session)
+        if ask and busy and not self.confirm("Close tab", f"{busy} job(s) are still running in this tab.\nCancel them and close it?"):
+            return False
+        number = self.sessions.index(session) + 1
+        session.close_session()
+        self.sessions.remove(session)
+        self.notebook.forget(session.frame)
+        session.frame.destroy()
+        self._retitle_tabs()
+        self.log_activity("TAB", f"Closed tab {number}")
+        return True
+
+    def _busy_jobs(self, session):
+        return len(session.executor.running_jobs()) + len(session.fileops.running())
+
+    def select_tab(self, index):
+        if self.sessions:
+            self.notebook.select(self.sessions[index % len(self.sessions)].frame)
+
+    def _on_tab_changed(self, event=None):
+        try:
+            index = self.notebook.index('current')
+        except tk.TclError:
             return
-        if command.lower().startswith('clear'):
-            self.clear_screen()
+        if not 0 <= index < len(self.sessions):
             return
+        self.active = self.sessions[index]
+        self.cwd_label.config(text=f"CWD: {self.active.cwd}")
+        # the decoder grammar follows the focused session's folder
+        self._grammar_dirty = True
+        if self.tab_history_var.get():
+            self.history_list.scroll_to(0)
+
+    def _on_session_cwd(self, session):
+        self._retitle_tabs()
+        if session is self.active:
+            self.cwd_label.config(text=f"CWD: {session.cwd}")
+            self._grammar_dirty = True
+
+    def run_tab_command(self, command):
+        """Handle 'new tab', 'close tab', 'next tab', 'previous tab' and 'tab N'; True if handled."""
+        low = ' '.join(command.lower().split())
+        if low in ('new tab', 'open tab', 'new session'):
+            self.new_tab()
+            return True
+        if low in ('close tab', 'close session'):
+            self.close_tab(self.active)
+            return True
+        if low == 'next tab':
+            self.select_tab(self.sessions.index(self.active) + 1)
+            return True
+        if low in ('previous tab', 'prev tab', 'last tab'):
+            self.select_tab(self.sessions.index(self.active) - 1)
+            return True
+        m = re.match(r'(?:switch to |go to )?tab (\d+)$', low)
+        if m:
+            index = int(m.group(1)) - 1
+            if 0 <= index < len(self.sessions):
+                self.select_tab(index)
+            else:
+                self.active.print_output(f"No tab {index + 1} (there are {len(self.sessions)})")
+            return True
+        return False
 
-        # Map then execute
-        system_cmd, is_shell = self.map_to_cmd(command)
-        if not system_cmd:
-            self.print_output("ERROR: Command not recognized. Type 'help' for commands.")
-            self.speak("Command not recognized")
-            return
+    def _run_hypotheses(self, hypotheses, trace=None):
+        # speech goes to the tab that has focus when it is recognized
+        if self.active is not self:
+            return self.active._run_hypotheses(hypotheses, trace)
+        return super()._run_hypotheses(hypotheses, trace)
 
-        self.print_output(f"Executing: {system_cmd}")
-        self.log_activity("EXECUTE", system_cmd)
-        self.run_cmd(system_cmd, is_shell=is_shell)
+    def cwd_names(self):
+        if self.active is not self:
+            return self.active.cwd_names()
+        return super().cwd_names()
 
-    def sanitize_filename(self, name):
-        # Reduce path traversal and strip quotes
-        name = name.strip().strip('"').strip("'")
-        # If it's a relative simple name, allow; otherwise normalize
-        # Keep spaces intact; forbid redirection/special shell chars
-        forbidden = ['&', '|', ';', '>', '<', '`']
-        for ch in forbidden:
-            name = name.replace(ch, '')
-        return name
+    # --- ShellCore hooks ---
+    def call_soon(self, fn, *args):
+        self.root.after(0, fn, *args)
+
+    def print_output(self, text, newline=True):
+        # queued and rendered once per frame (see output_pane.py)
+        self.output.write(text, newline)
+
+    def voice_output(self, text):
+        self.active.print_output(text)
+
+    def clear_output(self):
+        self.output.clear()
+
+    def set_status(self, text, fg=None):
+        self.status_label.config(text=text, fg=fg or self.ok_fg)
 
     def confirm(self, title, message):
         try:
@@ -443,460 +527,456 @@ Speak Shell — type commands or use voice. Use the toolbar to calibrate mic or
         except Exception:
             return False
 
-    def run_cmd(self, cmd, is_shell=True):
-        """
-        Execute a command in current working directory.
-        If launching apps (start/explorer), use Popen; else run and capture.
-        """
-        try:
-            # Built-in launchers
-            if isinstance(cmd, str) and (cmd.startswith('start ') or cmd.startswith('explorer ')):
-                subprocess.Popen(cmd, shell=True, cwd=self.cwd)
-                self.print_output("OK - Application launched")
-                self.toast("Voice CMD", "Application launched")
-                self.speak("Application launched")
-                return
-
-            result = subprocess.run(
-                cmd,
-                capture_output=True, text=True,
-                shell=is_shell, timeout=60, cwd=self.cwd
-            )
-
-            if result.stdout:
-                output = result.stdout.strip()
-                if len(output) > 12000:
-                    output = output[:12000] + "\n... (output truncated)"
-                self.print_output(output)
-
-            if result.returncode == 0:
-                self.print_output("OK")
-                self.toast("Voice CMD", "Command executed successfully")
-                self.speak("Command executed successfully")
-            else:
-                self.print_output(f"ERROR: Exit code {result.returncode}")
-                if result.stderr:
-                    self.print_output(result.stderr.strip())
-                self.toast("Voice CMD", "Command failed")
-                self.speak("Command failed")
-
-        except subprocess.TimeoutExpired:
-            self.print_output("ERROR: Command timed out")
-            self.toast("Voice CMD", "Command timed out")
-            self.speak("Command timed out")
-        except Exception as e:
-            self.print_output(f"ERROR: {str(e)}")
-            self.toast("Voice CMD", "Unexpected error")
-            self.speak("Unexpected error")
-
-    def map_to_cmd(self, voice):
-        """
-        Map human or voice command to an actual command string.
-        Returns (cmd_string, is_shell_bool).
-        """
-        v = voice.lower().strip()
-
-        # Help
-        if v == 'help':
-            self.print_output("""
-Available Commands:
-  File ops:
-    create file <name>           - Create a file (adds .txt if no extension)
-    open file <name>             - Open a file with default app
-    delete file <name>           - Delete a file (with confirmation)
-    rename <old> to <new>        - Rename a file or folder
-    move <src> to <dst>          - Move file/folder
-    copy <src> to <dst>          - Copy file/folder
-  Directory ops:
-    list files                   - dir
-    show files                   - dir
-    create directory <name>      - mkdir
-    make folder <name>           - mkdir
-    go to desktop/downloads/docs - quick jump
-    go to <path or folder>       - change directory if exists
-    cd <path>                    - change directory
-    go up                        - cd ..
-  System info:
-    show processes               - tasklist
-    kill process <name>          - taskkill /f /im <name>.exe (confirm)
-    task manager                 - start taskmgr
-    system information           - systeminfo (filtered)
-    memory usage                 - wmic OS get FreePhysicalMemory,TotalVisibleMemorySize /value
-    disk space                   - wmic logicaldisk get caption,freespace,size
-    battery status               - wmic path Win32_Battery get EstimatedChargeRemaining,Status
-    network info                 - ipconfig /all
-  Apps:
-    calculator/notepad/paint     - launch
-  Time/date:
-    what time is it              - time /t
-    what is the date             - date /t
-  Misc:
-    save log, clear screen, exit
-  Raw CMD:
-    say any Windows command listed in Microsoft docs; it will be passed through safely.
-""")
-            return None, True
-
-        # Quick exits
-        if any(k in v for k in ['exit', 'quit', 'close']):
-            return 'echo Exiting...', True
-
-        # Time/date phrases
-        if 'what time' in v or 'current time' in v or 'show time' in v:
-            return 'time /t', True
-        if 'what date' in v or 'current date' in v or 'show date' in v or 'what is the date' in v:
-            return 'date /t', True
-        if v == 'what time is it':
-            return 'time /t', True
-
-        # Directory navigation
-        if v.startswith('cd '):
-            path = v[3:].strip().strip('"')
-            resolved = self.resolve_path(path)
-            if os.path.isdir(resolved):
-                self.update_cwd(resolved)
-                self.print_output(f"Directory changed to: {self.cwd}")
-                self.speak("Directory changed")
-                return 'dir', True
-            else:
-                self.print_output("ERROR: Directory not found")
-                self.speak("Directory not found")
-                return None, True
-
-        if v == 'go up' or v == 'cd ..' or v == 'go back':
-            parent = os.path.abspath(os.path.join(self.cwd, '..'))
-            if os.path.isdir(parent):
-                self.update_cwd(parent)
-                self.print_output(f"Directory changed to: {self.cwd}")
-                self.speak("Directory changed")
-                return 'dir', True
-            else:
-                self.print_output("ERROR: Could not go up")
-                self.speak("Could not go up")
-                return None, True
-
-        # "go to <path or folder>"
-        if v.startswith('go to '):
-            name = v[6:].strip().strip('"')
-            resolved = self.resolve_path(name)
-            if os.path.isdir(resolved):
-                self.update_cwd(resolved)
-                self.print_output(f"Directory changed to: {self.cwd}")
-                self.speak("Directory changed")
-                return 'dir', True
-            else:
-                # try relative in cwd
-                maybe = os.path.join(self.cwd, name)
-                if os.path.isdir(maybe):
-                    self.update_cwd(os.path.abspath(maybe))
-                    self.print_output(f"Directory changed to: {self.cwd}")
-                    self.speak("Directory changed")
-                    return 'dir', True
-                self.print_output("ERROR: Target directory not found")
-                self.speak("Target directory not found")
-                return None, True
-
-        # Quick jumps
-        if 'go to desktop' in v:
-            return self.change_dir_quick('%USERPROFILE%\\Desktop')
-        if 'go to downloads' in v:
-            return self.change_dir_quick('%USERPROFILE%\\Downloads')
-        if 'go to documents' in v or 'go to docs' in v:
-            return self.change_dir_quick('%USERPROFILE%\\Documents')
-
-        # File ops
-        if 'create file' in v or 'make file' in v:
-            filename = self.extract_param(v, ['create file', 'make file'])
-            if filename:
-                filename = self.sanitize_filename(filename)
-                if '.' not in filename:
-                    filename += '.txt'
-                # Create safely using Python instead of shell
-                try:
-                    open(os.path.join(self.cwd, filename), 'a', encoding='utf-8').close()
-                    self.print_output(f"Created file: {filename}")
-                    self.speak("File created")
-                    return 'dir', True
-                except Exception as e:
-                    self.print_output(f"ERROR: {e}")
-                    self.speak("Failed to create file")
-                    return None, True
-            return None, True
-
-        if 'open file' in v:
-            filename = self.extract_param(v, ['open file'])
-            if filename:
-                filename = self.sanitize_filename(filename)
-                full = os.path.join(self.cwd, filename)
-                if os.path.exists(full):
-                    return f'start "" "{full}"', True
-                else:
-                    self.print_output("ERROR: File not found")
-                    self.speak("File not found")
-                    return None, True
-            return None, True
-
-        if 'delete file' in v or 'remove file' in v:
-            filename = self.extract_param(v, ['delete file', 'remove file'])
-            if filename:
-                filename = self.sanitize_filename(filename)
-                full = os.path.join(self.cwd, filename)
-                if os.path.exists(full) and os.path.isfile(full):
-                    if self.confirm("Confirm Delete", f"Delete file '{filename}'?"):
-                        try:
-                            os.remove(full)
-                            self.print_output(f"Deleted file: {filename}")
-                            self.speak("File deleted")
-                            return 'dir', True
-                        except Exception as e:
-                            self.print_output(f"ERROR: {e}")
-                            self.speak("Failed to delete file")
-                            return None, True
-                    else:
-                        self.print_output("Delete cancelled")
-                        return None, True
-                else:
-                    self.print_output("ERROR: File not found")
-                    self.speak("File not found")
-                    return None, True
-            return None, True
-
-        # Rename/move/copy using phrases
-        if v.startswith('rename '):
-            # Expect "rename old to new"
-            parts = v.replace('  ', ' ').split()
-            if ' to ' in v:
-                old, new = v[len('rename '):].split(' to ', 1)
-            else:
-                # fallback two names
-                toks = v.split()
-                if len(toks) >= 3:
-                    old, new = toks[1], toks[2]
-                else:
-                    old, new = None, None
-            if old and new:
-                old = self.sanitize_filename(old.strip().strip('"'))
-                new = self.sanitize_filename(new.strip().strip('"'))
-                src = os.path.join(self.cwd, old)
-                dst = os.path.join(self.cwd, new)
-                if os.path.exists(src):
-                    try:
-                        os.replace(src, dst)
-                        self.print_output(f"Renamed '{old}' to '{new}'")
-                        self.speak("Rename completed")
-                        return 'dir', True
-                    except Exception as e:
-                        self.print_output(f"ERROR: {e}")
-                        self.speak("Rename failed")
-                        return None, True
-                else:
-                    self.print_output("ERROR: Source not found")
-                    self.speak("Source not found")
-                    return None, True
-            self.print_output("Usage: rename <old> to <new>")
-            return None, True
-
-        if v.startswith('move '):
-            # "move src to dst"
-            if ' to ' in v:
-                rest = v[len('move '):]
-                src, dst = rest.split(' to ', 1)
-            else:
-                toks = v.split()
-                src = toks[1] if len(toks) >= 3 else None
-                dst = toks[2] if len(toks) >= 3 else None
-            if src and dst:
-                src = self.sanitize_filename(src.strip().strip('"'))
-                dst = self.sanitize_filename(dst.strip().strip('"'))
-                srcp = os.path.join(self.cwd, src)
-                dstp = os.path.join(self.cwd, dst)
-                if os.path.exists(srcp):
-                    try:
-                        os.replace(srcp, dstp)
-                        self.print_output(f"Moved '{src}' to '{dst}'")
-                        self.speak("Move completed")
-                        return 'dir', True
-                    except Exception as e:
-                        self.print_output(f"ERROR: {e}")
-                        self.speak("Move failed")
-                        return None, True
-                else:
-                    self.print_output("ERROR: Source not found")
-                    self.speak("Source not found")
-                    return None, True
-            self.print_output("Usage: move <src> to <dst>")
-            return None, True
-
-        if v.startswith('copy '):
-            # "copy src to dst"
-            import shutil
-            if ' to ' in v:
-                rest = v[len('copy '):]
-                src, dst = rest.split(' to ', 1)
-            else:
-                toks = v.split()
-                src = toks[1] if len(toks) >= 3 else None
-                dst = toks[2] if len(toks) >= 3 else None
-            if src and dst:
-                src = self.sanitize_filename(src.strip().strip('"'))
-                dst = self.sanitize_filename(dst.strip().strip('"'))
-                srcp = os.path.join(self.cwd, src)
-                dstp = os.path.join(self.cwd, dst)
-                if os.path.exists(srcp):
-                    try:
-                        if os.path.isdir(srcp):
-                            shutil.copytree(srcp, dstp, dirs_exist_ok=True)
-                        else:
-                            os.makedirs(os.path.dirname(dstp), exist_ok=True) if os.path.dirname(dstp) else None
-                            shutil.copy2(srcp, dstp)
-                        self.print_output(f"Copied '{src}' to '{dst}'")
-                        self.speak("Copy completed")
-                        return 'dir', True
-                    except Exception as e:
-                        self.print_output(f"ERROR: {e}")
-                        self.speak("Copy failed")
-                        return None, True
-                else:
-                    self.print_output("ERROR: Source not found")
-                    self.speak("Source not found")
-                    return None, True
-            self.print_output("Usage: copy <src> to <dst>")
-            return None, True
-
-        # Directory ops
-        if any(p in v for p in ['list files', 'show files', 'list directory']):
-            return 'dir', True
-
-        if 'create directory' in v or 'make folder' in v or v.startswith('mkdir '):
-            dirname = self.extract_param(v, ['create directory', 'make folder'])
-            if not dirname and v.startswith('mkdir '):
-                dirname = v[len('mkdir '):].strip().strip('"')
-            if dirname:
-                dirname = self.sanitize_filename(dirname)
-                try:
-                    os.makedirs(os.path.join(self.cwd, dirname), exist_ok=True)
-                    self.print_output(f"Directory created: {dirname}")
-                    self.speak("Directory created")
-                    return 'dir', True
-                except Exception as e:
-                    self.print_output(f"ERROR: {e}")
-                    self.speak("Failed to create directory")
-                    return None, True
-            return None, True
-
-        # System operations
-        if 'show processes' in v or 'list processes' in v or v == 'tasklist':
-            return 'tasklist', True
-
-        if 'kill process' in v or 'terminate process' in v:
-            process = self.extract_param(v, ['kill process', 'terminate process'])
-            if process:
-                process = self.sanitize_filename(process)
-                procname = process if process.lower().endswith('.exe') else f"{process}.exe"
-                if self.confirm("Confirm Kill", f"Terminate process '{procname}'?"):
-                    return f'taskkill /f /im "{procname}"', True
-                else:
-                    self.print_output("Kill cancelled")
-                    return None, True
-            return None, True
-
-        if 'task manager' in v:
-            return 'start taskmgr', True
-
-        if 'system information' in v or 'system info' in v:
-            return 'systeminfo | findstr /C:"Host Name" /C:"OS Name" /C:"System Type" /C:"Total Physical Memory"', True
-
-        if 'memory usage' in v or 'ram usage' in v:
-            return 'wmic OS get FreePhysicalMemory,TotalVisibleMemorySize /value', True
-
-        if 'disk space' in v or 'storage' in v:
-            return 'wmic logicaldisk get caption,freespace,size', True
-
-        if 'battery status' in v:
-            # Guard: some desktops have no battery -> command may output nothing
-            return 'wmic path Win32_Battery get EstimatedChargeRemaining,Status', True
-
-        if 'network info' in v or v == 'ipconfig':
-            return 'ipconfig /all', True
-
-        # Applications
-        if 'calculator' in v or v == 'calc':
-            return 'start calc', True
-        if 'notepad' in v:
-            return 'start notepad', True
-        if 'paint' in v or 'mspaint' in v:
-            return 'start mspaint', True
-
-        # Raw Windows command passthrough (safe-ish)
-        forbidden = ['&', '|', ';', '>', '<', '`']
-        if not any(ch in v for ch in forbidden):
-            return v, True
-
-        return None, True
-
-    def change_dir_quick(self, env_path):
-        path = os.path.expandvars(env_path)
-        if os.path.isdir(path):
-            self.update_cwd(path)
-            self.print_output(f"Directory changed to: {self.cwd}")
-            self.speak("Directory changed")
-            return 'dir', True
+    def quit(self):
+        self.root.after(700, self.root.destroy)
+
+    def update_cwd(self, new_path=None):
+        super().update_cwd(new_path)
+        self._on_session_cwd(self)
+
+    def _on_listening_changed(self):
+        if not hasattr(self, 'start_btn'):
+            return
+        if self.is_listening:
+            self.start_btn.config(state='disabled')
+            self.stop_btn.config(state='normal')
         else:
-            self.print_output("ERROR: Target folder not found")
-            self.speak("Target folder not found")
-            return None, True
-
-    def resolve_path(self, name_or_path):
-        # If absolute or has drive, expand and normalize
-        p = os.path.expanduser(os.path.expandvars(name_or_path))
-        if os.path.isabs(p):
-            return os.path.abspath(p)
-        # Otherwise relative to cwd
-        return os.path.abspath(os.path.join(self.cwd, p))
-
-    def extract_param(self, text, phrases):
-        text_l = text.lower()
-        for phrase in phrases:
-            if phrase in text_l:
-                pos = text_l.find(phrase) + len(phrase)
-                original_tail = text[pos:].strip()
-                # remove filler words
-                cleaned = original_tail.replace('called', '').replace('named', '').strip()
-                cleaned = cleaned.replace(' dot ', '.').replace(' dot', '.').replace('dot ', '.').strip()
-                return cleaned if cleaned else None
-        return None
+            self.start_btn.config(state='normal')
+            self.stop_btn.config(state='disabled')
+
+    def _on_history_added(self, command):
+        self.history_list.scroll_to(0)
+
+    def _on_history_loaded(self):
+        if hasattr(self, 'history_list'):
+            self.history_list.refresh()
+
+    def _on_input_key(self, event):
+        # complete what was typed; the suggested rest stays selected so
+        # typing on replaces it, Tab/Enter accept it
+        if event.keysym in ('BackSpace', 'Delete', 'Left', 'Right', 'Home', 'End', 'Up', 'Down', 'Tab',
+                            'Return', 'Escape') or not event.char:
+            if event.keysym in ('BackSpace', 'Delete', 'Escape'):
+                self._completions = []
+            return
+        typed = self.input_entry.get()[:self.input_entry.index('insert')]
+        low = typed.lower()
+        self._completions = [c for c in self.history.complete(typed)
+                             if len(c) > len(typed) and c.lower().startswith(low)] if typed.strip() else []
+        self._completion_index = 0
+        self._show_completion(typed)
+
+    def _show_completion(self, typed):
+        entry = self.input_entry
+        entry.delete(len(typed), tk.END)
+        if not self._completions:
+            return
+        suggestion = self._completions[self._completion_index]
+        # keep the user's own characters; fill in the stored remainder
+        entry.insert(tk.END, suggestion[len(typed):])
+        entry.select_range(len(typed), tk.END)
+        entry.icursor(len(typed))
+
+    def _cycle_completion(self, step):
+        if not self._completions:
+            return 'break'
+        typed = self.input_entry.get()[:self.input_entry.index('insert')]
+        self._completion_index = (self._completion_index + step) % len(self._completions)
+        self._show_completion(typed)
+        return 'break'
+
+    def _accept_completion(self, event=None):
+        self.input_entry.select_clear()
+        self.input_entry.icursor(tk.END)
+        self._completions = []
+        return 'break'
 
     def log_activity(self, activity_type, message):
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.activity_log.append(f"[{timestamp}] [{activity_type}] {message}")
+        super().log_activity(activity_type, message)
+        self._show_activity(activity_type, message)
+
+    def _show_activity(self, activity_type, message):
         # also mirror into activity listbox if present
         try:
             if hasattr(self, 'activity_listbox'):
                 self.activity_listbox.insert('end', f"[{activity_type}] {message}")
+                excess = self.activity_listbox.size() - self.activity_listbox_max
+                if excess > 0:
+                    self.activity_listbox.delete(0, excess - 1)
                 # keep bottom visible
                 self.activity_listbox.yview_moveto(1.0)
         except Exception:
             pass
 
+    def execute_input(self):
+        command = self.input_entry.get().strip()
+        self._completions = []
+        if command:
+            self.input_entry.delete(0, tk.END)
+            self.active.process_command(command, "manual")
+
+    def shutdown(self):
+        for session in self.sessions[1:]:
+            session.close_session()
+        super().shutdown()
+
+    def run(self):
+        try:
+            self.root.mainloop()
+        finally:
+            self.shutdown()
+
+
+class SessionTab(ShellCore):
+    """
+    A further session in its own tab of HighAccuracyVoiceCMD: its own cwd,
+    shell session and executor, output pane and session history. The
+    microphone, recognizer and TTS stay with the window, as do the stores
+    in ShellCore.SHARED (history, journal, folder index, command table,
+    result cache, metrics, macros).
+    """
+    def __init__(self, window, cwd=None):
+        self.window = window
+        self.closed = False
+        super().__init__(shared=window)
+        if cwd:
+            self.cwd = cwd
+            if self.shell_session is not None:
+                self.shell_session.cwd = cwd
+        self.frame = tk.Frame(window.notebook, bg=window.bg_color)
+        self.output_text, self.output = window._make_output(self.frame)
+
+    # the window owns the voice side
+    @property
+    def is_listening(self):
+        return self.window.is_listening
+
+    def start_listening(self):
+        self.window.start_listening()
+
+    def stop_listening(self):
+        self.window.stop_listening()
+
+    def calibrate_mic(self):
+        self.window.calibrate_mic()
+
+    def speak(self, text, interrupt=False):
+        self.window.speak(text, interrupt)
+
+    def toast(self, title, msg, duration=4):
+        self.window.toast(title, msg, duration)
+
+    # --- ShellCore hooks ---
+    def call_soon(self, fn, *args):
+        self.window.call_soon(fn, *args)
+
+    def print_output(self, text, newline=True):
+        # job output can still arrive after the tab was closed
+        if not self.closed:
+            self.output.write(text, newline)
+
+    def clear_output(self):
+        self.output.clear()
+
+    def set_status(self, text, fg=None):
+        if self.window.active is self:
+            self.window.set_status(text, fg)
+
+    def confirm(self, title, message):
+        return self.window.confirm(title, message)
+
+    def quit(self):
+        # 'exit' in a tab closes the tab
+        self.window.root.after(700, lambda: self.window.close_tab(self, ask=False))
+
+    def update_cwd(self, new_path=None):
+        super().update_cwd(new_path)
+        self.window._on_session_cwd(self)
+
+    def _on_history_added(self, command):
+        self.window._on_history_added(command)
+
+    def _on_history_loaded(self):
+        self.window._on_history_loaded()
+
+    def _update_latency_stats(self):
+        self.window._update_latency_stats()
+
+    def _update_cache_stats(self):
+        self.window._update_cache_stats()
+
+    def _update_wake_stats(self):
+        self.window._update_wake_stats()
+
+    def log_activity(self, activity_type, message):
+        self.window.log_activity(activity_type, message)
+
+    def run_tab_command(self, command):
+        return self.window.run_tab_command(command)
+
+    def close_session(self):
+        self.closed = True
+        super().close_session()
+
+
+class RemoteSessionMixin:
+    """Runs a session's commands in its daemon session (daemon.py) instead of in this process."""
+    remote_sid = 0
+
+    def _init_session(self):
+        # the daemon session owns the shell, executor, copies and macros
+        self.toaster = None
+        self.session_history = []
+        self.shell_session = self.executor = self.fileops = None
+        self.macro_runs = []
+        self.macro_recording = None
+
+    def _post(self, op, **fields):
+        try:
+            self.client.post(op, **fields)
+        except DaemonError as e:
+            self.print_output(f"[Daemon] {e}")
+
+    def process_command(self, command, source="manual", trace=None):
+        command = command.strip()
+        # tabs belong to this window; everything else runs in the daemon,
+        # which echoes the command and records it in the history
+        if command and not self.run_tab_command(command):
+            self._post('submit', command=command, session=self.remote_sid, source=source)
+
+    def cancel_jobs(self, which=None):
+        self._post('cancel', session=self.remote_sid, which=which or 'all')
+
+    def run_script(self, path, name=None):
+        self.process_command(f"run script {path}")
+
     def save_log(self):
+        self.process_command("save log")
+
+
+class RemoteSessionTab(RemoteSessionMixin, SessionTab):
+    def __init__(self, window, cwd, remote_sid):
+        self.client = window.client
+        self.remote_sid = remote_sid
+        super().__init__(window, cwd)
+
+    def close_session(self):
+        self._post('close_session', session=self.remote_sid)
+        self.closed = True
+
+
+class RemoteVoiceCMD(RemoteSessionMixin, HighAccuracyVoiceCMD):
+    """
+    The window as a front end of the daemon (``speak_shell.py --connect``):
+    typed commands, the microphone buttons and the tuning controls go over
+    the socket (client.py), and output, status and statistics come back as
+    events. Each tab is a daemon session; the recognizer, shells, history
+    and journal stay in the daemon, so closing the window loses none of them.
+    The window itself only holds the daemon's settings for its controls.
+    """
+    def __init__(self, client):
+        self.client = client
+        super().__init__()
+        self.root.title(f"{self.root.title()} - daemon {client.state['pid']}")
+        client.on_event = lambda event: self.call_soon(self._on_daemon_event, event)
+
+    def _open_history(self):
+        return RemoteHistory(self.client)
+
+    def _init_shared(self, voice_feedback):
+        # No journal, shells, folder index, TTS or macros here: the widgets
+        # only need the daemon's settings, held in the same objects the
+        # local window reads them from
+        state = self.client.state
+        settings = state['settings']
+        self._settings = dict(settings)
+        self.history = self._open_history()
+        self.journal = self.dir_index = self.intents = self.grammar = self.macros = self.tts = None
+        self.activity_log = []
+        self.latency = LatencyMetrics()   # this window's render times only
+        self.metrics_interval = None
+        self.results = ResultCache()
+        self.energy_threshold = settings['energy_threshold']
+        self.phrase_time_limit = settings['phrase_time_limit']
+        self.recognizer_pool_size = settings['recognizer_pool_size']
+        self.vad = VoiceActivityDetector(level=settings['vad_level'], min_speech_ms=settings['min_speech_ms'],
+                                         energy_threshold=self.energy_threshold)
+        self.wake = WakeWordSpotter(settings['wake_word'] or DEFAULT_PHRASE, settings['wake_threshold'] or None)
+        self.wake.enabled = bool(settings['wake_word'])
+        self.preprocessor = AudioPreprocessor()
+        self.preprocessor.enabled = settings['clean_audio']
+        self.recognition_engine = settings['engine']
+        self.constrained_decoding = settings['constrained_decoding']
+        self.voice_feedback = settings['voice_feedback']
+        self.voice_enabled = state['voice_enabled']
+        self.is_listening = state['listening']
+
+    def _init_session(self):
+        super()._init_session()
+        self.cwd = self.client.state['sessions'][0]['cwd']
+
+    def warm_up(self, on_done=None):
+        # nothing to load here: the daemon has the recognizer, index and metrics
+        self._subscribe()
+        stats = self.client.state['stats']
+        for kind in ('vad', 'wake', 'latency', 'cache'):
+            self._on_daemon_stats({'kind': kind, 'text': stats[kind]})
+        self._on_listening_changed()
+        if on_done:
+            on_done()
+
+    def _subscribe(self):
+        # events of this window's sessions, plus those that belong to none
+        self._post('subscribe', events=None, sessions=[s.remote_sid for s in self.sessions])
+
+    def shutdown(self):
+        # the daemon keeps running; only this window's tabs are closed there
         try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"voice_cmd_log_{timestamp}.txt"
-            with open(filename, 'w', encoding='utf-8') as f:
-                f.write("VOICE CMD TERMINAL - HIGH ACCURACY MODE - ACTIVITY LOG\n")
-                f.write("="*80 + "\n\n")
-                for entry in self.activity_log:
-                    f.write(entry + "\n")
-            self.print_output(f"\nLog saved: {filename}")
-            self.toast("Voice CMD", f"Log saved: {filename}")
-            self.speak("Log saved")
-        except Exception as e:
-            self.print_output(f"ERROR: Could not save log - {str(e)}")
-            self.speak("Failed to save log")
-
-    def clear_screen(self):
-        self.output_text.delete('1.0', 'end')
-        self.print_output("Screen cleared. Type 'help' for commands.\n")
+            for session in self.sessions[1:]:
+                session.close_session()
+        finally:
+            self.client.close()
 
-    def run(self):
-        self.root.mainloop()
+    def _busy_jobs(self, session):
+        # closing the daemon session cancels its jobs (daemon.py)
+        return 0
+
+    # --- tabs are daemon sessions ---
+    def _make_session(self, cwd):
+        opened = self.client.request('open_session', cwd=cwd)
+        return RemoteSessionTab(self, opened['cwd'], opened['session'])
+
+    def new_tab(self, cwd=None):
+        try:
+            session = super().new_tab(cwd)
+        except DaemonError as e:
+            self.active.print_output(f"[Daemon] Could not open a session: {e}")
+            return None
+        self._subscribe()
+        return session
+
+    def close_tab(self, session, ask=True):
+        closed = super().close_tab(session, ask)
+        if closed:
+            self._subscribe()
+        return closed
+
+    def _on_tab_changed(self, event=None):
+        super()._on_tab_changed(event)
+        # recognized speech goes to the selected tab
+        self._post('focus', session=self.active.remote_sid)
+
+    def _session_for(self, sid):
+        for session in self.sessions:
+            if session.remote_sid == sid:
+                return session
+        return None
+
+    # --- the voice side is the daemon's ---
+    def start_listening(self):
+        self._post('focus', session=self.active.remote_sid)
+        self._post('listen', on=True)
+
+    def stop_listening(self):
+        self._post('listen', on=False)
+
+    def calibrate_mic(self):
+        self._post('calibrate')
+
+    def _set(self, name, value):
+        # Scale and Checkbutton callbacks also fire when the UI is built or
+        # updated from a daemon event: only real changes are sent
+        if self._settings.get(name) == value:
+            return
+        self._settings[name] = value
+        self._post('set', name=name, value=value)
+
+    def _on_energy_change(self, val):
+        self._set('energy_threshold', int(float(val)))
+
+    def _on_phrase_change(self, val):
+        self._set('phrase_time_limit', int(float(val)))
+
+    def _on_vad_level_change(self, val):
+        self._set('vad_level', int(float(val)))
+
+    def _on_min_speech_change(self, val):
+        self._set('min_speech_ms', int(float(val)))
+
+    def _on_wake_toggle(self):
+        on = bool(self.wake_var.get())
+        self._set('wake_word', (self.wake_entry.get().strip() or DEFAULT_PHRASE) if on else '')
+
+    def _on_pool_change(self, val):
+        self._set('recognizer_pool_size', int(float(val)))
+
+    def _on_engine_change(self, name):
+        self._set('engine', name)
+
+    def _on_constrained_toggle(self):
+        self._set('constrained_decoding', bool(self.constrained_var.get()))
+
+    def _on_preprocess_toggle(self):
+        self._set('clean_audio', bool(self.preprocess_var.get()))
+
+    def _on_tts_toggle(self):
+        self._set('voice_feedback', bool(self.tts_var.get()))
+
+    def log_activity(self, activity_type, message):
+        # the daemon writes the journal; its entries arrive as events
+        self._show_activity(activity_type, message)
+
+    # --- daemon events (on the Tk thread) ---
+    def _on_daemon_event(self, event):
+        kind = event['event']
+        session = self._session_for(event.get('session'))
+        if kind == 'output' and session is not None:
+            session.output.write(event['text'], event.get('newline', True))
+        elif kind == 'clear' and session is not None:
+            session.output.clear()
+        elif kind == 'status':
+            self.set_status(event['text'], event.get('color'))
+        elif kind == 'cwd' and session is not None:
+            session.cwd = event['cwd']
+            self._on_session_cwd(session)
+        elif kind == 'listening':
+            self.is_listening = event['on']
+            self._on_listening_changed()
+        elif kind == 'history':
+            if session is not None and event.get('command'):
+                session.session_history.append(event['command'])
+                if len(session.session_history) > 2000:
+                    del session.session_history[:-1000]
+            self.history_list.scroll_to(0)
+        elif kind == 'activity':
+            self._show_activity(event['type'], event['message'])
+        elif kind == 'stats':
+            self._on_daemon_stats(event)
+        elif kind == 'confirm' and session is not None and not event.get('answered'):
+            answer = self.confirm(event['title'], event['message'])
+            self._post('confirm_reply', confirm=event['confirm'], answer=answer)
+        elif kind == 'exit' and session is not None:
+            # 'exit' leaves the window (the daemon keeps running) or closes a tab
+            if session is self:
+                self.quit()
+            else:
+                self.close_tab(session, ask=False)
+        elif kind == 'session' and event.get('closed') and session not in (None, self):
+            self.close_tab(session, ask=False)
+        elif kind == 'disconnected':
+            self.print_output("[Daemon] Connection lost - restart the window to reconnect")
+            self.set_status("Status: DISCONNECTED", self.err_fg)
+
+    def _on_daemon_stats(self, event):
+        labels = {'vad': 'vad_label', 'wake': 'wake_label', 'latency': 'latency_label', 'cache': 'cache_label'}
+        try:
+            if event['kind'] == 'energy':
+                self._settings['energy_threshold'] = event['value']
+                self.energy_slider.set(event['value'])
+            if 'on' in event:
+                self.wake_var.set(event['on'])
+                self._settings['wake_word'] = (self.wake_entry.get().strip() or DEFAULT_PHRASE) if event['on'] else ''
+            if event['kind'] in labels:
+                getattr(self, labels[event['kind']]).config(text=event['text'])
+        except Exception:
+            pass
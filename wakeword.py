@@ -0,0 +1,225 @@
+"""
+Wake-word gate between VAD and the recognizer.
+
+While listening, every phrase the VAD keeps used to go to the main
+engine, so background conversation cost a full decode (or an upload) and
+could end up run as a raw command. With the gate on, a phrase reaches the
+recognizer only if it starts with the wake word ("shell, list files"):
+
+    - pocketsphinx keyword spotting runs on the first ``window_s`` seconds
+      of each phrase, so its cost stays small whatever the phrase length
+    - when the wake word is found, only the audio after it is submitted
+    - a bare wake word ("shell" ... pause) lets the next phrase within
+      ``follow_s`` seconds through whole
+    - anything else is dropped before it is decoded
+
+Streaming engines decode during capture, so for them the gate can only
+check the transcript (``gate_text``); it keeps background speech from
+running but saves no decode time.
+
+The spotting threshold trades misses for false wakes. A short phrase
+matches background speech easily and needs a strict threshold (about 1e-5
+for one syllable); a long one needs a looser one. Unless one is given
+(``--wake-threshold``, ``set wake threshold``), it follows the phrase's
+syllable count (``default_threshold``).
+
+The counters show how many phrases were ignored and estimate the decode
+time saved from the mean decode time of the phrases that did get through.
+"""
+import importlib.util
+import re
+import time
+
+from engines import make_pocketsphinx_decoder
+
+DEFAULT_PHRASE = 'shell'
+# pocketsphinx's default frame rate (-frate): segment positions are frame indices
+FRAMES_PER_SECOND = 100
+
+
+def _words(text):
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+
+def default_threshold(phrase):
+    """Keyword threshold for ``phrase``: 1e-5 per (estimated) syllable, down to 1e-40."""
+    syllables = sum(max(1, len(re.findall(r'[aeiouy]+', w))) for w in _words(phrase))
+    return 10.0 ** -min(40, 5 * max(1, syllables))
+
+
+def _segment_end(segment, frame_rate=FRAMES_PER_SECOND):
+    """End of a pocketsphinx word segment in seconds (0.1.x end_frame or 5.x start + duration, both in frames)."""
+    end = getattr(segment, 'end_frame', None)
+    if end is not None:
+        return (end + 1) / float(frame_rate)
+    start, duration = getattr(segment, 'start', None), getattr(segment, 'duration', None)
+    if start is not None and duration is not None:
+        return (start + duration) / float(frame_rate)
+    return None
+
+
+class WakeWordSpotter:
+    def __init__(self, phrase=DEFAULT_PHRASE, threshold=None, window_s=2.0, follow_s=6.0,
+                 min_command_s=0.3, clock=time.monotonic):
+        # None: follow the phrase (default_threshold)
+        self.threshold = threshold
+        self.window_s = window_s
+        self.follow_s = follow_s
+        self.min_command_s = min_command_s
+        self.clock = clock
+        self.enabled = False
+        self.phrase = DEFAULT_PHRASE
+        self._decoder = None
+        self._decoder_rate = None
+        self._awake_until = 0.0
+        self.set_phrase(phrase)
+        self.reset_stats()
+
+    @property
+    def available(self):
+        try:
+            return importlib.util.find_spec('pocketsphinx') is not None
+        except Exception:
+            return False
+
+    def set_phrase(self, phrase):
+        words = _words(phrase or '')
+        self.phrase = ' '.join(words) or DEFAULT_PHRASE
+        # the keyphrase search is rebuilt on the next phrase
+        self._decoder = None
+
+    @property
+    def kws_threshold(self):
+        return self.threshold or default_threshold(self.phrase)
+
+    def set_threshold(self, threshold):
+        """Use ``threshold`` for keyword spotting; None or 0 goes back to the phrase's default."""
+        if threshold is not None and not 0 <= threshold < 1:
+            raise ValueError("the wake threshold must be between 0 and 1")
+        self.threshold = threshold or None
+        self._decoder = None
+
+    def reset_stats(self):
+        self.phrases = 0
+        self.wakes = 0
+        self.followed = 0
+        self.rejected = 0
+        self.seconds_rejected = 0.0
+        self.decodes_skipped = 0
+        self.spot_seconds = 0.0
+        self._decode_sum = 0.0
+        self._decode_count = 0
+
+    @property
+    def awake(self):
+        return self._awake_until > self.clock()
+
+    def load(self, sample_rate=16000):
+        """Build the keyphrase search; ValueError if a word of the phrase cannot be spotted."""
+        if self._decoder is None or self._decoder_rate != sample_rate:
+            decoder = make_pocketsphinx_decoder(sample_rate, keyphrase=self.phrase,
+                                                kws_threshold=float(self.kws_threshold))
+            # an unknown word would make the search silently match nothing
+            unknown = [w for w in self.phrase.split() if decoder.lookup_word(w) is None]
+            if unknown:
+                raise ValueError(f"'{' '.join(unknown)}' is not in the pronunciation dictionary")
+            self._decoder = decoder
+            self._decoder_rate = sample_rate
+        return self._decoder
+
+    def spot(self, pcm, sample_rate, sample_width=2):
+        """
+        Look for the wake word at the start of ``pcm``. Returns the byte
+        offset just after it, or None if it was not heard.
+        """
+        window = pcm[:int(self.window_s * sample_rate) * sample_width]
+        decoder = self.load(sample_rate)
+        decoder.start_utt()
+        decoder.process_raw(window, False, True)
+        decoder.end_utt()
+        hyp = decoder.hyp()
+        if hyp is None or not hyp.hypstr.strip():
+            return None
+        end = None
+        try:
+            for segment in decoder.seg():
+                word = getattr(segment, 'word', None) or getattr(segment, 'text', '')
+                if _words(word)[-1:] == self.phrase.split()[-1:]:
+                    end = _segment_end(segment)
+                    break
+        except Exception:
+            pass
+        if end is None:
+            return len(window)
+        return min(len(pcm), int(end * sample_rate) * sample_width)
+
+    def gate(self, pcm, sample_rate, sample_width=2):
+        """
+        The part of ``pcm`` to decode: the command after the wake word, the
+        whole phrase while awake, or None to drop it.
+        """
+        self.phrases += 1
+        seconds = len(pcm) / float(sample_rate * sample_width)
+        if self.awake:
+            self._awake_until = 0.0
+            self.followed += 1
+            return pcm
+        started = time.perf_counter()
+        try:
+            offset = self.spot(pcm, sample_rate, sample_width)
+        finally:
+            self.spot_seconds += time.perf_counter() - started
+        if offset is None:
+            self.rejected += 1
+            self.decodes_skipped += 1
+            self.seconds_rejected += seconds
+            return None
+        self.wakes += 1
+        rest = pcm[offset:]
+        if len(rest) < self.min_command_s * sample_rate * sample_width:
+            # wake word on its own: the command is the next phrase
+            self._awake_until = self.clock() + self.follow_s
+            return None
+        return rest
+
+    def strip(self, text):
+        """``text`` without a leading wake word (unchanged if it has none)."""
+        words = self.phrase.split()
+        tokens = text.split()
+        if [w for t in tokens[:len(words)] for w in _words(t)] == words:
+            return ' '.join(tokens[len(words):]).lstrip(',.;: ')
+        return text
+
+    def gate_text(self, text):
+        """Transcript check for streaming engines: the command, or None to ignore it."""
+        self.phrases += 1
+        command = self.strip(text)
+        if command != text:
+            self.wakes += 1
+            if not command:
+                self._awake_until = self.clock() + self.follow_s
+                return None
+            return command
+        if self.awake:
+            self._awake_until = 0.0
+            self.followed += 1
+            return text
+        self.rejected += 1
+        return None
+
+    def note_decode(self, seconds):
+        """Decode time of one phrase that got through (for the savings estimate)."""
+        self._decode_sum += seconds
+        self._decode_count += 1
+
+    def seconds_saved(self):
+        if not self._decode_count:
+            return 0.0
+        return self.decodes_skipped * self._decode_sum / self._decode_count
+
+    def stats_text(self):
+        if not self.enabled:
+            return f"Wake word off ('{self.phrase}')"
+        return (f"Wake '{self.phrase}': {self.wakes} wakes, {self.rejected} phrases ignored "
+                f"({self.seconds_rejected:.1f}s), ~{self.seconds_saved():.1f}s decode saved, "
+                f"spotter {self.spot_seconds:.2f}s")